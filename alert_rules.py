@@ -0,0 +1,481 @@
+"""
+Alert Rule Engine
+User rules such as "RSI < 30 and price in golden_zone" compiled once into
+vectorized predicates and evaluated on every closed bar against incremental
+per-symbol state (indicators, Fibonacci swing levels, open FVGs)
+"""
+
+import os
+import re
+import json
+import logging
+import threading
+import numpy as np
+import pandas as pd
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Tuple
+
+from shared_store import file_lock
+
+logger = logging.getLogger(__name__)
+
+ALERT_RULES_FILE = "alert_rules.json"
+
+# Fields a rule can reference - names follow ClassicAnalyzer.calculate_indicators,
+# FibonacciAnalyzer.analyze and ICTAnalyzer.find_fair_value_gaps
+FIELDS = (
+    'price', 'open', 'high', 'low', 'volume', 'change_pct',
+    'RSI', 'MACD', 'MACD_Signal', 'MACD_Histogram',
+    'SMA_20', 'SMA_50', 'EMA_20', 'BB_Upper', 'BB_Middle', 'BB_Lower',
+    'fib_trend', 'fib_swing_high', 'fib_swing_low', 'fib_382', 'fib_500', 'fib_618', 'fib_golden_zone',
+    'bullish_fvg_touched', 'bearish_fvg_touched', 'unfilled_bullish_fvg', 'unfilled_bearish_fvg',
+)
+FIELD_INDEX = {name.lower(): k for k, name in enumerate(FIELDS)}
+FIELD_ALIASES = {
+    'close': 'price',
+    'golden_zone': 'fib_golden_zone',
+    'fvg_bullish_touched': 'bullish_fvg_touched',
+    'fvg_bearish_touched': 'bearish_fvg_touched',
+}
+VALUE_WORDS = {'bullish': 1.0, 'bearish': -1.0, 'true': 1.0, 'false': 0.0}
+
+OPERATORS = ('<', '<=', '>', '>=', '==', '!=')
+_TOKEN = re.compile(r'\s*(<=|>=|==|!=|<|>|[A-Za-z_][A-Za-z0-9_]*|-?\d+(?:\.\d*)?|\S)')
+
+
+@dataclass
+class AlertRule:
+    rule_id: int
+    user_id: int
+    symbol: str
+    timeframe: str
+    expression: str
+
+
+# ============================================
+# INCREMENTAL FIELD STATE
+# ============================================
+
+class FieldState:
+    """Streaming values of FIELDS for one symbol/timeframe, updated one closed bar at a time"""
+    
+    def __init__(self, max_gaps: int = 100):
+        self.closes = deque(maxlen=50)
+        self.highs = deque(maxlen=50)
+        self.lows = deque(maxlen=50)
+        self.gains = deque(maxlen=14)
+        self.losses = deque(maxlen=14)
+        self.ema = {12: None, 26: None, 20: None}
+        self.macd_signal = None
+        self.prev_bars = deque(maxlen=2)  # (high, low) of the two previous bars, for FVG detection
+        self.max_gaps = max_gaps
+        self.bull_gaps = np.empty((0, 2))  # (low, high) of unfilled bullish FVGs
+        self.bear_gaps = np.empty((0, 2))
+        self.values = np.full(len(FIELDS), np.nan)
+        self.last_time = None
+    
+    def _ema(self, span: int, previous: Optional[float], x: float) -> float:
+        # Same recursion as pandas ewm(span=..., adjust=False)
+        if previous is None:
+            return x
+        alpha = 2 / (span + 1)
+        return alpha * x + (1 - alpha) * previous
+    
+    def _mean(self, values: deque, window: int) -> float:
+        if len(values) < window:
+            return np.nan
+        return sum(list(values)[-window:]) / window
+    
+    def update(self, open_: float, high: float, low: float, close: float, volume: float) -> np.ndarray:
+        v = self.values
+        previous_close = self.closes[-1] if self.closes else None
+        
+        self.closes.append(close)
+        self.highs.append(high)
+        self.lows.append(low)
+        n = len(self.closes)
+        
+        v[FIELD_INDEX['price']] = close
+        v[FIELD_INDEX['open']] = open_
+        v[FIELD_INDEX['high']] = high
+        v[FIELD_INDEX['low']] = low
+        v[FIELD_INDEX['volume']] = volume
+        v[FIELD_INDEX['change_pct']] = (close / previous_close - 1) * 100 if previous_close else np.nan
+        
+        # RSI (rolling means of gains/losses, first bar counts as a zero change)
+        delta = close - previous_close if previous_close is not None else 0.0
+        self.gains.append(max(delta, 0.0))
+        self.losses.append(max(-delta, 0.0))
+        if len(self.gains) == 14:
+            gain = sum(self.gains) / 14
+            loss = sum(self.losses) / 14
+            with np.errstate(divide='ignore', invalid='ignore'):
+                v[FIELD_INDEX['rsi']] = 100 - 100 / (1 + np.float64(gain) / loss)
+        else:
+            v[FIELD_INDEX['rsi']] = np.nan
+        
+        # MACD / EMA
+        for span in self.ema:
+            self.ema[span] = self._ema(span, self.ema[span], close)
+        macd = self.ema[12] - self.ema[26]
+        self.macd_signal = self._ema(9, self.macd_signal, macd)
+        v[FIELD_INDEX['macd']] = macd
+        v[FIELD_INDEX['macd_signal']] = self.macd_signal
+        v[FIELD_INDEX['macd_histogram']] = macd - self.macd_signal
+        v[FIELD_INDEX['ema_20']] = self.ema[20]
+        
+        # Moving averages and Bollinger Bands
+        sma20 = self._mean(self.closes, 20)
+        v[FIELD_INDEX['sma_20']] = sma20
+        v[FIELD_INDEX['sma_50']] = self._mean(self.closes, 50)
+        std = np.std(list(self.closes)[-20:], ddof=1) if n >= 20 else np.nan
+        v[FIELD_INDEX['bb_upper']] = sma20 + 2 * std
+        v[FIELD_INDEX['bb_middle']] = sma20
+        v[FIELD_INDEX['bb_lower']] = sma20 - 2 * std
+        
+        self._update_fibonacci(close, n, sma20)
+        self._update_fvgs(high, low)
+        return v
+    
+    def _update_fibonacci(self, close: float, n: int, sma20: float):
+        """FibonacciAnalyzer._find_swing_points / _calculate_retracement on the last 50 bars"""
+        v = self.values
+        names = ('fib_trend', 'fib_swing_high', 'fib_swing_low', 'fib_382', 'fib_500', 'fib_618', 'fib_golden_zone')
+        if n < 5:
+            for name in names:
+                v[FIELD_INDEX[name]] = np.nan
+            return
+        
+        swing_high = max(self.highs)
+        swing_low = min(self.lows)
+        mid = (swing_high + swing_low) / 2
+        sma10 = self._mean(self.closes, 10)
+        
+        if close > mid and sma10 > sma20:
+            bullish = True
+        elif close < mid and sma10 < sma20:
+            bullish = False
+        else:
+            bullish = close > self.closes[-5]
+        
+        diff = swing_high - swing_low
+        if bullish:
+            levels = [round(swing_high - diff * r, 4) for r in (0.382, 0.5, 0.618)]
+        else:
+            levels = [round(swing_low + diff * r, 4) for r in (0.382, 0.5, 0.618)]
+        
+        v[FIELD_INDEX['fib_trend']] = 1.0 if bullish else -1.0
+        v[FIELD_INDEX['fib_swing_high']] = swing_high
+        v[FIELD_INDEX['fib_swing_low']] = swing_low
+        v[FIELD_INDEX['fib_382']], v[FIELD_INDEX['fib_500']], v[FIELD_INDEX['fib_618']] = levels
+        v[FIELD_INDEX['fib_golden_zone']] = float(min(levels[0], levels[2]) <= close <= max(levels[0], levels[2]))
+    
+    def _update_fvgs(self, high: float, low: float):
+        """Touch/fill of open gaps by this bar, then the gap this bar completes (ICT 3-candle FVG)"""
+        v = self.values
+        bull = self.bull_gaps
+        bear = self.bear_gaps
+        
+        v[FIELD_INDEX['bullish_fvg_touched']] = float(bool(len(bull)) and bool(np.any(low < bull[:, 1])))
+        v[FIELD_INDEX['bearish_fvg_touched']] = float(bool(len(bear)) and bool(np.any(high > bear[:, 0])))
+        bull = bull[low > bull[:, 0]]
+        bear = bear[high < bear[:, 1]]
+        
+        if len(self.prev_bars) == 2:
+            first_high, first_low = self.prev_bars[0]
+            if low > first_high:
+                bull = np.vstack([bull, (first_high, low)])[-self.max_gaps:]
+            if high < first_low:
+                bear = np.vstack([bear, (high, first_low)])[-self.max_gaps:]
+        self.prev_bars.append((high, low))
+        
+        self.bull_gaps = bull
+        self.bear_gaps = bear
+        v[FIELD_INDEX['unfilled_bullish_fvg']] = len(bull)
+        v[FIELD_INDEX['unfilled_bearish_fvg']] = len(bear)
+
+
+# ============================================
+# RULE COMPILATION
+# ============================================
+
+def _field(name: str) -> int:
+    key = FIELD_ALIASES.get(name.lower(), name.lower())
+    if key not in FIELD_INDEX:
+        raise ValueError(f"Unknown field: {name}")
+    return FIELD_INDEX[key]
+
+
+def parse_rule(expression: str) -> List[List[Tuple[int, str, object]]]:
+    """
+    Parse into OR-of-ANDs: [[(field, op, rhs), ...], ...]
+    rhs is a float constant or ('field', index). A bare field means "!= 0",
+    "price in golden_zone" means the golden-zone flag.
+    """
+    tokens = [t for t in _TOKEN.findall(expression) if t]
+    if not tokens:
+        raise ValueError("Empty rule")
+    
+    clauses = [[]]
+    k = 0
+    while k < len(tokens):
+        token = tokens[k]
+        if token.lower() == 'or':
+            clauses.append([])
+            k += 1
+            continue
+        if token.lower() == 'and':
+            k += 1
+            continue
+        
+        if token.lower() == 'price' and k + 1 < len(tokens) and tokens[k + 1].lower() == 'in':
+            if k + 2 >= len(tokens):
+                raise ValueError("Expected a zone after 'in'")
+            clauses[-1].append((_field(tokens[k + 2]), '!=', 0.0))
+            k += 3
+            continue
+        
+        lhs = _field(token)
+        if k + 1 < len(tokens) and tokens[k + 1] in OPERATORS:
+            if k + 2 >= len(tokens):
+                raise ValueError(f"Missing value after {tokens[k + 1]}")
+            op, rhs = tokens[k + 1], tokens[k + 2]
+            if rhs.lower() in VALUE_WORDS:
+                value = VALUE_WORDS[rhs.lower()]
+            else:
+                try:
+                    value = float(rhs)
+                except ValueError:
+                    value = ('field', _field(rhs))
+            clauses[-1].append((lhs, op, value))
+            k += 3
+        else:
+            clauses[-1].append((lhs, '!=', 0.0))
+            k += 1
+    
+    if any(not clause for clause in clauses):
+        raise ValueError("Dangling 'and' / 'or'")
+    return clauses
+
+
+class CompiledRuleSet:
+    """
+    All rules of one timeframe as flat atom arrays over a single value vector:
+    [symbol slot 0 fields | slot 1 fields | ... | constants]
+    """
+    
+    def __init__(self, rules: List[AlertRule], slots: Dict[str, int]):
+        self.rules = rules
+        nf = len(FIELDS)
+        self.n_values = len(slots) * nf
+        
+        lhs, rhs, ops, constants = [], [], [], []
+        clause_starts, rule_starts = [], []
+        clause_count = 0
+        for rule in rules:
+            rule_starts.append(clause_count)
+            base = slots[rule.symbol] * nf
+            for clause in parse_rule(rule.expression):
+                clause_starts.append(len(lhs))
+                clause_count += 1
+                for field_idx, op, value in clause:
+                    lhs.append(base + field_idx)
+                    if isinstance(value, tuple):
+                        rhs.append(base + value[1])
+                    else:
+                        rhs.append(self.n_values + len(constants))
+                        constants.append(value)
+                    ops.append(OPERATORS.index(op))
+        
+        self.lhs = np.array(lhs, dtype=np.int64)
+        self.rhs = np.array(rhs, dtype=np.int64)
+        self.op_atoms = [np.flatnonzero(np.array(ops, dtype=np.int64) == k) for k in range(len(OPERATORS))]
+        self.constants = np.array(constants, dtype=float)
+        self.clause_starts = np.array(clause_starts, dtype=np.int64)
+        self.rule_starts = np.array(rule_starts, dtype=np.int64)
+        self.state = np.zeros(len(rules), dtype=bool)
+    
+    def evaluate(self, values: np.ndarray) -> np.ndarray:
+        """Truth of every rule for the flat field vector (NaN compares False)"""
+        if not self.rules:
+            return np.zeros(0, dtype=bool)
+        
+        ext = np.concatenate([values, self.constants])
+        left = ext[self.lhs]
+        right = ext[self.rhs]
+        
+        atoms = np.zeros(len(self.lhs), dtype=bool)
+        with np.errstate(invalid='ignore'):
+            for k, compare in enumerate((np.less, np.less_equal, np.greater, np.greater_equal, np.equal, np.not_equal)):
+                idx = self.op_atoms[k]
+                if len(idx):
+                    atoms[idx] = compare(left[idx], right[idx])
+        # NaN is never a valid match, even for !=
+        atoms &= ~np.isnan(left)
+        
+        clauses = np.logical_and.reduceat(atoms, self.clause_starts)
+        return np.logical_or.reduceat(clauses, self.rule_starts)
+    
+    def fired(self, values: np.ndarray) -> np.ndarray:
+        """Rules that turned true on this evaluation (edge-triggered)"""
+        now = self.evaluate(values)
+        rising = now & ~self.state
+        self.state = now
+        return np.flatnonzero(rising)
+
+
+# ============================================
+# ENGINE
+# ============================================
+
+class AlertRuleEngine:
+    """Stores user rules, keeps per-symbol field state and evaluates rules on closed bars"""
+    
+    def __init__(self, path: str = ALERT_RULES_FILE):
+        self.path = path
+        self._mtime: Optional[int] = None
+        self.rules: Dict[int, AlertRule] = self._load()
+        self.next_id = max(self.rules, default=0) + 1
+        self.states: Dict[Tuple[str, str], FieldState] = {}
+        self._compiled: Dict[str, CompiledRuleSet] = {}
+        self._slots: Dict[str, Dict[str, int]] = {}
+        self._dirty = set()  # timeframes whose rules changed since compilation
+        # Rules change on the bot's event loop while the scanner evaluates them in a worker thread
+        self._lock = threading.RLock()
+    
+    def _load(self) -> Dict[int, AlertRule]:
+        try:
+            if os.path.exists(self.path):
+                self._mtime = os.stat(self.path).st_mtime_ns
+                with open(self.path, 'r') as f:
+                    return {r['rule_id']: AlertRule(**r) for r in json.load(f)}
+        except Exception as e:
+            logger.error(f"Error loading alert rules: {e}")
+        return {}
+    
+    def refresh(self, force: bool = False):
+        """
+        Reload if another worker process saved since (sharded mode); field state is kept
+        force: reload regardless of the mtime (under file_lock, before a change is saved)
+        """
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        if force or mtime != self._mtime:
+            with self._lock:
+                self._dirty |= {r.timeframe for r in self.rules.values()} | set(self._compiled)
+                self.rules = self._load()
+                self.next_id = max(self.rules, default=0) + 1
+                self._dirty |= {r.timeframe for r in self.rules.values()}
+    
+    def save(self):
+        try:
+            # Write then rename, so other processes never read a half-written file
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, 'w') as f:
+                json.dump([asdict(r) for r in self.rules.values()], f)
+            os.replace(tmp, self.path)
+            self._mtime = os.stat(self.path).st_mtime_ns
+        except Exception as e:
+            logger.error(f"Error saving alert rules: {e}")
+    
+    def add_rule(self, user_id: int, symbol: str, timeframe: str, expression: str) -> AlertRule:
+        parse_rule(expression)  # raises ValueError on a bad rule
+        # Locked from reload to save: next_id is unique and no other worker's rule is lost
+        with file_lock(self.path), self._lock:
+            self.refresh(force=True)
+            rule = AlertRule(self.next_id, user_id, symbol.upper(), timeframe, expression)
+            self.rules[rule.rule_id] = rule
+            self.next_id += 1
+            self._dirty.add(timeframe)
+            self.save()
+        return rule
+    
+    def remove_rule(self, user_id: int, rule_id: int) -> bool:
+        with file_lock(self.path), self._lock:
+            self.refresh(force=True)
+            rule = self.rules.get(rule_id)
+            if rule is None or rule.user_id != user_id:
+                return False
+            del self.rules[rule_id]
+            self._dirty.add(rule.timeframe)
+            self.save()
+        return True
+    
+    def rules_for(self, user_id: int) -> List[AlertRule]:
+        self.refresh()
+        with self._lock:
+            return [r for r in self.rules.values() if r.user_id == user_id]
+    
+    def symbols(self, timeframe: str) -> List[str]:
+        with self._lock:
+            return sorted({r.symbol for r in self.rules.values() if r.timeframe == timeframe})
+    
+    def timeframes(self) -> List[str]:
+        self.refresh()
+        with self._lock:
+            return sorted({r.timeframe for r in self.rules.values()})
+    
+    def _ruleset(self, timeframe: str) -> CompiledRuleSet:
+        if timeframe not in self._compiled or timeframe in self._dirty:
+            rules = sorted((r for r in self.rules.values() if r.timeframe == timeframe), key=lambda r: r.rule_id)
+            slots = {symbol: k for k, symbol in enumerate(sorted({r.symbol for r in rules}))}
+            ruleset = CompiledRuleSet(rules, slots)
+            
+            # Rules that were already true must not fire again after a recompile
+            old = self._compiled.get(timeframe)
+            if old is not None:
+                was_true = {r.rule_id for r, s in zip(old.rules, old.state) if s}
+                ruleset.state = np.array([r.rule_id in was_true for r in rules], dtype=bool)
+            
+            self._slots[timeframe] = slots
+            self._compiled[timeframe] = ruleset
+            self._dirty.discard(timeframe)
+        return self._compiled[timeframe]
+    
+    def _values(self, timeframe: str) -> np.ndarray:
+        slots = self._slots[timeframe]
+        nf = len(FIELDS)
+        values = np.full(len(slots) * nf, np.nan)
+        for symbol, slot in slots.items():
+            state = self.states.get((symbol, timeframe))
+            if state is not None:
+                values[slot * nf:(slot + 1) * nf] = state.values
+        return values
+    
+    def push_bars(self, symbol: str, timeframe: str, df: pd.DataFrame, times: pd.Series) -> int:
+        """Feed closed bars newer than the last one seen; returns how many were new"""
+        state = self.states.setdefault((symbol, timeframe), FieldState())
+        # Bars are in time order: a binary search finds the first new one (usually the last row)
+        k = int(times.searchsorted(state.last_time, side='right')) if state.last_time is not None else 0
+        if k >= len(df):
+            return 0
+        # Column views sliced before conversion: only the new rows are copied
+        columns = [df[name].to_numpy()[k:].tolist() for name in ('Open', 'High', 'Low', 'Close', 'Volume')]
+        for o, h, l, c, vol in zip(*columns):
+            state.update(o, h, l, c, vol)
+        state.last_time = times.iloc[-1]
+        return len(df) - k
+    
+    def on_bar_close(self, timeframe: str, frames: Dict[str, pd.DataFrame],
+                     times: Dict[str, pd.Series]) -> List[AlertRule]:
+        """
+        Update every symbol with its newly closed bars and evaluate all rules of the
+        timeframe in one vectorized pass. Rules that become true fire once.
+        Symbols seen for the first time are warmed up from history without firing.
+        """
+        self.refresh()
+        with self._lock:
+            ruleset = self._ruleset(timeframe)
+            warming = set()
+            for symbol, df in frames.items():
+                if symbol not in self._slots[timeframe]:
+                    continue
+                first = (symbol, timeframe) not in self.states
+                if self.push_bars(symbol, timeframe, df, times[symbol]) and first:
+                    warming.add(symbol)
+            
+            fired = [ruleset.rules[k] for k in ruleset.fired(self._values(timeframe))]
+        return [r for r in fired if r.symbol not in warming]
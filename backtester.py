@@ -0,0 +1,415 @@
+"""
+Vectorized Backtesting Engine
+Replays history, generates each engine's signal at every bar and resolves
+whether the first target or the stop loss is hit first
+"""
+
+import sys
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from classic_analysis import ClassicAnalyzer, SignalType
+from harmonic_patterns import HarmonicAnalyzer, PatternDirection
+from ict_analysis import ICTAnalyzer
+from parameter_profiles import ParameterProfile
+from range_extremes import RangeExtremeIndex
+
+
+@dataclass
+class TradeSignals:
+    """One candidate trade per signalling bar"""
+    engine: str
+    bars: np.ndarray  # signal bar positions (entry at that bar's close)
+    direction: np.ndarray  # +1 long, -1 short
+    entry: np.ndarray
+    stop: np.ndarray
+    targets: np.ndarray  # shape (trades, 3): TP1, TP2, TP3
+
+
+@dataclass
+class BacktestReport:
+    """Performance of one engine on one timeframe"""
+    engine: str
+    timeframe: str
+    trades: int
+    wins: int  # TP1 before stop
+    losses: int
+    open_trades: int  # neither hit within the horizon
+    hit_rate: float  # wins / (wins + losses), in %
+    tp2_rate: float  # TP2 before stop, in % of resolved trades
+    tp3_rate: float
+    expectancy: float  # average result in R (multiples of the initial risk)
+    avg_bars_held: float
+
+
+class Backtester:
+    """Bar-by-bar replay of the bot's signal engines with vectorized TP/SL resolution"""
+    
+    ENGINES = ('targets', 'classic', 'harmonic', 'ict', 'fibonacci')
+    
+    def __init__(self, horizon: int = 50, warmup: int = 50, profile: Optional[ParameterProfile] = None):
+        self.horizon = horizon  # maximum bars a trade stays open
+        self.warmup = warmup  # bars needed before the first signal (MA50)
+        self.profile = profile or ParameterProfile()
+        self.classic_analyzer = ClassicAnalyzer()
+        self.harmonic_analyzer = HarmonicAnalyzer()
+        self.ict_analyzer = ICTAnalyzer()
+        
+        # Pivots and range indexes depend only on the prices (and lookback),
+        # so they are reused across parameter sets on the same frame
+        self._cache_frame = None
+        self._cache = {}
+    
+    def _cached(self, df: pd.DataFrame, key, build):
+        if self._cache_frame is not df:
+            self._cache_frame = df
+            self._cache = {}
+        if key not in self._cache:
+            self._cache[key] = build()
+        return self._cache[key]
+    
+    def _indexes(self, df: pd.DataFrame):
+        high_index = self._cached(df, 'high_index', lambda: RangeExtremeIndex(df['High'].values))
+        low_index = self._cached(df, 'low_index', lambda: RangeExtremeIndex(df['Low'].values))
+        return high_index, low_index
+    
+    # ============================================
+    # SIGNAL GENERATION (causal, one value per bar)
+    # ============================================
+    
+    def _atr(self, df: pd.DataFrame) -> np.ndarray:
+        """ATR(14) as seen at each bar by ChartDrawer.get_targets_text"""
+        high = df['High'].values
+        low = df['Low'].values
+        close = df['Close'].values
+        
+        # get_targets_text passes the third term as np.maximum's `out` argument,
+        # so its true range is max(high - low, |high - prev close|); replay it as published
+        tr = np.full(len(df), np.nan)
+        tr[1:] = np.maximum(high[1:] - low[1:], np.abs(high[1:] - close[:-1]))
+        return pd.Series(tr).rolling(14, min_periods=1).mean().values
+    
+    def _atr_levels(self, close: np.ndarray, atr: np.ndarray, direction: np.ndarray):
+        stop = close - direction * atr * self.profile.atr_stop
+        targets = np.column_stack([close + direction * atr * m for m in self.profile.atr_targets])
+        return stop, targets
+    
+    def _signal_bars(self, df: pd.DataFrame) -> np.ndarray:
+        # The last bar has no future to resolve against
+        return np.arange(min(self.warmup, len(df)), len(df) - 1)
+    
+    def _targets_signals(self, df: pd.DataFrame) -> TradeSignals:
+        """ChartDrawer.get_targets_text: MA20/MA50 direction with ATR targets"""
+        close = df['Close'].values
+        ma20 = df['Close'].rolling(20).mean().values
+        ma50 = df['Close'].rolling(50).mean().values
+        
+        bars = self._signal_bars(df)
+        bullish = (close[bars] > ma20[bars]) & (ma20[bars] > ma50[bars])
+        direction = np.where(bullish, 1, -1)
+        
+        stop, targets = self._atr_levels(close[bars], self._atr(df)[bars], direction)
+        return TradeSignals('targets', bars, direction, close[bars], stop, targets)
+    
+    def _classic_signals(self, df: pd.DataFrame) -> TradeSignals:
+        """ClassicAnalyzer._determine_signal scored at every bar, ATR targets"""
+        analyzer = self.classic_analyzer
+        closes = df['Close']
+        n = len(df)
+        
+        buy_score = np.zeros(n)
+        sell_score = np.zeros(n)
+        
+        # الاتجاه
+        slope = analyzer.trend_slope_series(df).values
+        buy_score += 2 * (slope > 0.1)
+        sell_score += 2 * (slope < -0.1)
+        
+        # النماذج: نفس النوافذ الثابتة التي يفحصها detect_patterns عند كل شمعة
+        highs = df['High'].values
+        lows = df['Low'].values
+        high_index, low_index = self._indexes(df)
+        scans = []
+        for window, scan in ((30, lambda s, e, w: analyzer._scan_double_tops(highs, high_index, s, e, w)),
+                             (30, lambda s, e, w: analyzer._scan_double_bottoms(lows, low_index, s, e, w)),
+                             (40, lambda s, e, w: analyzer._scan_head_shoulders(highs, high_index, low_index, s, e, w)),
+                             (20, lambda s, e, w: analyzer._scan_triangles(highs, lows, closes.values, s, e, w))):
+            if n >= window:
+                ends = np.arange(window, n + 1)
+                scans.append(scan(ends - window, ends, window))
+        for columns in scans:
+            buy = columns['signal'] == analyzer._enum_code(SignalType.BUY)
+            sell = columns['signal'] == analyzer._enum_code(SignalType.SELL)
+            np.add.at(buy_score, columns['detected'][buy], 3)
+            np.add.at(sell_score, columns['detected'][sell], 3)
+        
+        # RSI
+        delta = closes.diff()
+        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
+        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+        rsi = (100 - (100 / (1 + gain / loss))).values
+        buy_score += 2 * (rsi < 30)
+        sell_score += 2 * (rsi > 70)
+        
+        # MACD
+        macd = closes.ewm(span=12, adjust=False).mean() - closes.ewm(span=26, adjust=False).mean()
+        macd_hist = (macd - macd.ewm(span=9, adjust=False).mean()).values
+        buy_score += macd_hist > 0
+        sell_score += ~(macd_hist > 0)
+        
+        bars = self._signal_bars(df)
+        direction = np.where(buy_score[bars] > sell_score[bars] + 2, 1,
+                             np.where(sell_score[bars] > buy_score[bars] + 2, -1, 0))
+        bars = bars[direction != 0]
+        direction = direction[direction != 0]
+        
+        close = closes.values
+        stop, targets = self._atr_levels(close[bars], self._atr(df)[bars], direction)
+        return TradeSignals('classic', bars, direction, close[bars], stop, targets)
+    
+    def _ict_structure(self, df: pd.DataFrame, lookback: int) -> np.ndarray:
+        """
+        Market structure at each bar (+1 bullish, -1 bearish, 0 ranging), identical to
+        ICTAnalyzer.analyze_market_structure on the prefix ending at that bar.
+        A swing at i is only known once bar i + lookback has closed.
+        """
+        high_index, low_index = self._indexes(df)
+        swings = self._cached(df, ('ict_swings', lookback),
+                              lambda: self.ict_analyzer.identify_swing_points(df, lookback, high_index, low_index))
+        structure = np.zeros(len(df), dtype=np.int64)
+        
+        last_price = {'high': None, 'low': None}
+        recent = []
+        state = 0
+        for count, swing in enumerate(swings, 1):
+            previous = last_price[swing['type']]
+            if previous is not None:
+                # HH / HL count as bullish points, LH / LL as bearish
+                recent.append(1 if swing['price'] > previous else -1)
+                recent = recent[-6:]
+            last_price[swing['type']] = swing['price']
+            
+            if count < 4:
+                state = 0
+            else:
+                bullish_score = recent.count(1)
+                bearish_score = recent.count(-1)
+                state = 1 if bullish_score > bearish_score + 1 else -1 if bearish_score > bullish_score + 1 else 0
+            
+            confirmed = swing['idx'] + lookback
+            if confirmed < len(df):
+                structure[confirmed:] = state
+        
+        return structure
+    
+    def _ict_signals(self, df: pd.DataFrame) -> TradeSignals:
+        """ICTAnalyzer.find_optimal_trade_entry direction and targets, ATR stop"""
+        close = df['Close'].values
+        high20 = df['High'].rolling(20, min_periods=1).max().values
+        low20 = df['Low'].rolling(20, min_periods=1).min().values
+        
+        bars = self._signal_bars(df)
+        direction = self._ict_structure(df, self.profile.ict_lookback)[bars]
+        bars = bars[direction != 0]
+        direction = direction[direction != 0]
+        
+        c = close[bars]
+        h = high20[bars]
+        l = low20[bars]
+        long_targets = np.column_stack([c + (c - l) * 0.5, h, h * 1.02])
+        short_targets = np.column_stack([c - (h - c) * 0.5, l, l * 0.98])
+        targets = np.where((direction > 0)[:, None], long_targets, short_targets)
+        
+        # Order-block stops are not known per bar; the published ATR stop is used instead
+        stop, _ = self._atr_levels(c, self._atr(df)[bars], direction)
+        return TradeSignals('ict', bars, direction, c, stop, targets)
+    
+    def _harmonic_signals(self, df: pd.DataFrame) -> TradeSignals:
+        """
+        Every pattern found by HarmonicAnalyzer, entered once its D point is confirmed
+        (lookback bars later) with the pattern's own targets and stop.
+        Patterns come from the full-history pivots, so a D later replaced by a
+        stronger pivot of the same type is not replayed.
+        """
+        analyzer = self.harmonic_analyzer
+        analyzer.tolerance = self.profile.harmonic_tolerance
+        lookback = self.profile.harmonic_lookback
+        points = self._cached(df, ('harmonic_points', lookback), lambda: analyzer.find_swing_points(df, lookback))
+        
+        patterns = []
+        for detect in (analyzer.detect_abcd, analyzer.detect_gartley, analyzer.detect_butterfly,
+                       analyzer.detect_bat, analyzer.detect_crab):
+            patterns.extend(detect(points))
+        
+        bars = np.array([p.points['D'][0] + lookback for p in patterns], dtype=np.int64)
+        keep = (bars >= min(self.warmup, len(df))) & (bars < len(df) - 1)
+        patterns = [p for p, k in zip(patterns, keep) if k]
+        bars = bars[keep]
+        
+        order = np.argsort(bars, kind='stable')
+        bars = bars[order]
+        patterns = [patterns[k] for k in order]
+        
+        direction = np.array([1 if p.direction == PatternDirection.BULLISH else -1 for p in patterns], dtype=np.int64)
+        stop = np.array([p.stop_loss for p in patterns], dtype=float)
+        # Harmonic patterns publish two targets; the second doubles as TP3
+        targets = np.array([(p.target_1, p.target_2, p.target_2) for p in patterns], dtype=float).reshape(-1, 3)
+        
+        return TradeSignals('harmonic', bars, direction, df['Close'].values[bars], stop, targets)
+    
+    def _fibonacci_signals(self, df: pd.DataFrame) -> TradeSignals:
+        """FibonacciAnalyzer._find_swing_points + _calculate_targets_sl at every bar"""
+        close = df['Close'].values
+        swing_high = df['High'].rolling(50, min_periods=1).max().values
+        swing_low = df['Low'].rolling(50, min_periods=1).min().values
+        sma10 = df['Close'].rolling(10).mean().values
+        sma20 = df['Close'].rolling(20).mean().values
+        
+        bars = self._signal_bars(df)
+        c = close[bars]
+        high = swing_high[bars]
+        low = swing_low[bars]
+        mid = (high + low) / 2
+        
+        bullish = (c > mid) & (sma10[bars] > sma20[bars])
+        bearish = (c < mid) & (sma10[bars] < sma20[bars])
+        momentum = c > close[bars - 4]
+        direction = np.where(bullish, 1, np.where(bearish, -1, np.where(momentum, 1, -1)))
+        
+        diff = high - low
+        long_targets = np.column_stack([np.round(low + diff * r, 4) for r in (1.272, 1.618, 2.618)])
+        short_targets = np.column_stack([np.round(high - diff * r, 4) for r in (1.272, 1.618, 2.618)])
+        targets = np.where((direction > 0)[:, None], long_targets, short_targets)
+        stop = np.where(direction > 0, np.round(high - diff * 0.786, 4), np.round(low + diff * 0.786, 4))
+        
+        return TradeSignals('fibonacci', bars, direction, c, stop, targets)
+    
+    def generate_signals(self, df: pd.DataFrame, engine: str) -> TradeSignals:
+        generators = {
+            'targets': self._targets_signals,
+            'classic': self._classic_signals,
+            'harmonic': self._harmonic_signals,
+            'ict': self._ict_signals,
+            'fibonacci': self._fibonacci_signals,
+        }
+        if engine not in generators:
+            raise ValueError(f"Unknown engine: {engine}")
+        return generators[engine](df)
+    
+    # ============================================
+    # OUTCOME RESOLUTION (vectorized first passage)
+    # ============================================
+    
+    def resolve(self, df: pd.DataFrame, signals: TradeSignals, timeframe: str = '',
+                start: int = 0, end: Optional[int] = None) -> BacktestReport:
+        """
+        Find which of TP1/TP2/TP3/stop is reached first for every trade.
+        Only signals in bars [start, end) are taken and no bar at or after end is looked at,
+        so separate ranges of one frame can be scored independently (walk-forward).
+        """
+        high_index, low_index = self._indexes(df)
+        close = df['Close'].values
+        limit = len(df) if end is None else min(end, len(df))
+        
+        # Levels on the wrong side of the entry cannot be traded
+        risk = (signals.entry - signals.stop) * signals.direction
+        reward = (signals.targets[:, 0] - signals.entry) * signals.direction
+        valid = (risk > 0) & (reward > 0) & (signals.bars >= start) & (signals.bars < limit - 1)
+        
+        bars = signals.bars[valid]
+        direction = signals.direction[valid]
+        entry = signals.entry[valid]
+        stop = signals.stop[valid]
+        targets = signals.targets[valid]
+        risk = risk[valid]
+        
+        first = bars + 1
+        last = np.minimum(first + self.horizon, limit)
+        long = direction > 0
+        
+        def first_hit(levels, favourable):
+            hits = np.full(len(bars), -1, dtype=np.int64)
+            up = long if favourable else ~long
+            if up.any():
+                hits[up] = high_index.first_at_or_above(first[up], levels[up], last[up])
+            if (~up).any():
+                hits[~up] = low_index.first_at_or_below(first[~up], levels[~up], last[~up])
+            return hits
+        
+        stop_hit = first_hit(stop, favourable=False)
+        
+        def before_stop(hit):
+            # On the same bar the stop is assumed to come first
+            return (hit >= 0) & ((stop_hit < 0) | (hit < stop_hit))
+        
+        tp_before = [before_stop(first_hit(targets[:, k], favourable=True)) for k in range(3)]
+        tp1_hit = first_hit(targets[:, 0], favourable=True)
+        
+        wins = tp_before[0]
+        losses = ~wins & (stop_hit >= 0)
+        still_open = ~wins & ~losses
+        
+        exit_bar = np.where(wins, tp1_hit, np.where(losses, stop_hit, last - 1))
+        result = np.where(wins, (targets[:, 0] - entry) * direction / risk,
+                          np.where(losses, -1.0, (close[exit_bar] - entry) * direction / risk))
+        
+        trades = len(bars)
+        resolved = int(wins.sum() + losses.sum())
+        return BacktestReport(
+            engine=signals.engine,
+            timeframe=timeframe,
+            trades=trades,
+            wins=int(wins.sum()),
+            losses=int(losses.sum()),
+            open_trades=int(still_open.sum()),
+            hit_rate=100 * wins.sum() / resolved if resolved else 0.0,
+            tp2_rate=100 * tp_before[1].sum() / resolved if resolved else 0.0,
+            tp3_rate=100 * tp_before[2].sum() / resolved if resolved else 0.0,
+            expectancy=float(result.mean()) if trades else 0.0,
+            avg_bars_held=float((exit_bar - bars).mean()) if trades else 0.0
+        )
+    
+    def run(self, df: pd.DataFrame, timeframe: str = '', engines: Optional[List[str]] = None,
+            start: int = 0, end: Optional[int] = None) -> List[BacktestReport]:
+        """Backtest the selected engines on one price history"""
+        engines = engines or list(self.ENGINES)
+        if len(df) <= self.warmup + 1:
+            return []
+        
+        return [self.resolve(df, self.generate_signals(df, engine), timeframe, start, end)
+                for engine in engines]
+    
+    def run_many(self, frames: Dict[str, pd.DataFrame], engines: Optional[List[str]] = None) -> List[BacktestReport]:
+        """Backtest every timeframe in {timeframe: DataFrame}"""
+        reports = []
+        for timeframe, df in frames.items():
+            reports.extend(self.run(df, timeframe, engines))
+        return reports
+    
+    def get_report_text(self, reports: List[BacktestReport]) -> str:
+        """Compact text table of backtest results"""
+        text = "📊 **BACKTEST RESULTS**\n\n"
+        text += f"{'TF':<5} {'Engine':<10} {'Trades':>7} {'Hit%':>6} {'TP2%':>6} {'TP3%':>6} {'Exp(R)':>7}\n"
+        for r in reports:
+            text += (f"{r.timeframe:<5} {r.engine:<10} {r.trades:>7} {r.hit_rate:>6.1f} "
+                     f"{r.tp2_rate:>6.1f} {r.tp3_rate:>6.1f} {r.expectancy:>+7.2f}\n")
+        return text
+
+
+def main():
+    """Backtest a local OHLCV CSV file: python backtester.py prices.csv [timeframe]"""
+    if len(sys.argv) < 2:
+        print("Usage: python backtester.py prices.csv [timeframe]")
+        return
+    
+    df = pd.read_csv(sys.argv[1], index_col=0, parse_dates=True)
+    timeframe = sys.argv[2] if len(sys.argv) > 2 else '1d'
+    
+    backtester = Backtester()
+    print(backtester.get_report_text(backtester.run(df, timeframe)))
+
+
+if __name__ == '__main__':
+    main()
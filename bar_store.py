@@ -0,0 +1,259 @@
+"""
+Shared Bar Store
+OHLCV frames for process-pool workers without pickling: the parent writes
+each frame once into a memory-mapped file (in /dev/shm where available) as
+one contiguous float64 block plus int64 timestamps, and workers receive a
+small descriptor and map the same pages read-only.
+Frames are reference counted; released ones stay cached (LRU, bounded by
+bytes) and are unlinked on eviction or when the store closes.
+"""
+
+import os
+import atexit
+import shutil
+import tempfile
+import threading
+import itertools
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Hashable, Optional, Tuple
+
+from bars import Bars
+
+# Released frames kept mapped for reuse by the next job on the same bars
+MAX_CACHED_BYTES = 256 * 1024 * 1024
+
+# Mappings a worker keeps open between jobs
+WORKER_MAPPINGS = 64
+
+
+@dataclass(frozen=True)
+class BarDescriptor:
+    """What a worker needs to map a frame: pickles to a few hundred bytes"""
+    path: str
+    rows: int
+    columns: Tuple[str, ...]  # float64 columns, stored column after column
+    time_column: Optional[str] = None  # datetime column (int64 ns UTC, after the float block)
+    tz: Optional[str] = None
+    
+    @property
+    def nbytes(self) -> int:
+        return self.rows * 8 * (len(self.columns) + (1 if self.time_column else 0))
+
+
+def _shm_dir() -> str:
+    # tmpfs keeps the pages in memory; elsewhere the page cache does the same job
+    base = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return tempfile.mkdtemp(prefix='bars-', dir=base)
+
+
+def frame_identity(df: pd.DataFrame) -> Tuple:
+    """Same length, last bar and last close: the same bars"""
+    if df.empty:
+        return (0,)
+    return (len(df), str(df.iloc[-1, 0]), float(df['Close'].iloc[-1]))
+
+
+# ============================================
+# PARENT SIDE
+# ============================================
+
+class SharedBarStore:
+    """Writes frames to shared pages and tracks who still uses them"""
+    
+    def __init__(self, max_cached_bytes: int = MAX_CACHED_BYTES):
+        self.max_cached_bytes = max_cached_bytes
+        self._dir: Optional[str] = None
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._entries: Dict[Hashable, Tuple[Tuple, BarDescriptor]] = {}  # key -> (identity, descriptor)
+        self._refs: Dict[str, int] = {}  # path -> leases
+        self._idle: OrderedDict = OrderedDict()  # path -> bytes, released frames (LRU)
+        self._retired = set()  # replaced paths still leased: unlinked on last release
+        self.hits = 0
+        self.misses = 0
+        atexit.register(self.close)
+    
+    # ---------- writing ----------
+    
+    def _write(self, df: pd.DataFrame, directory: str) -> BarDescriptor:
+        time_column = tz = None
+        first = df.columns[0] if len(df.columns) else None
+        if first is not None and pd.api.types.is_datetime64_any_dtype(df[first]):
+            time_column = first
+            tz = str(df[first].dt.tz) if df[first].dt.tz is not None else None
+        columns = tuple(c for c in df.columns if c != time_column and pd.api.types.is_numeric_dtype(df[c]))
+        
+        descriptor = BarDescriptor(path=os.path.join(directory, f"{next(self._ids)}.bars"), rows=len(df),
+                                   columns=columns, time_column=time_column, tz=tz)
+        if descriptor.nbytes == 0:
+            open(descriptor.path, 'wb').close()
+            return descriptor
+        out = np.memmap(descriptor.path, dtype=np.float64, mode='w+', shape=(descriptor.nbytes // 8,))
+        n = len(df)
+        for k, column in enumerate(columns):
+            out[k * n:(k + 1) * n] = df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+        if time_column is not None:
+            times = df[time_column]
+            if tz is not None:
+                times = times.dt.tz_convert('UTC').dt.tz_localize(None)
+            out.view(np.int64)[len(columns) * n:] = times.to_numpy(dtype='datetime64[ns]').view(np.int64)
+        out.flush()
+        del out
+        return descriptor
+    
+    def put(self, key: Hashable, df: pd.DataFrame) -> BarDescriptor:
+        """
+        Descriptor of `df` under `key` with one lease taken; release() it when
+        the job is done. Unchanged bars reuse the pages already written.
+        """
+        identity = frame_identity(df)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == identity:
+                self.hits += 1
+                descriptor = entry[1]
+                self._lease(descriptor.path)
+                return descriptor
+            if self._dir is None:
+                self._dir = _shm_dir()
+            directory = self._dir
+        
+        descriptor = self._write(df, directory)
+        with self._lock:
+            self.misses += 1
+            old = self._entries.get(key)
+            self._entries[key] = (identity, descriptor)
+            self._lease(descriptor.path)
+            if old is not None:
+                self._retire(old[1].path)
+        return descriptor
+    
+    # ---------- reference counting ----------
+    
+    def _lease(self, path: str):
+        self._refs[path] = self._refs.get(path, 0) + 1
+        self._idle.pop(path, None)
+    
+    def _retire(self, path: str):
+        if self._refs.get(path, 0) > 0:
+            self._retired.add(path)
+        else:
+            self._idle.pop(path, None)
+            self._unlink(path)
+    
+    def release(self, descriptor: BarDescriptor):
+        with self._lock:
+            path = descriptor.path
+            count = self._refs.get(path, 0) - 1
+            if count > 0:
+                self._refs[path] = count
+                return
+            self._refs.pop(path, None)
+            if path in self._retired:
+                self._retired.discard(path)
+                self._unlink(path)
+                return
+            self._idle[path] = descriptor.nbytes
+            self._evict()
+    
+    def _evict(self):
+        total = sum(self._idle.values())
+        while self._idle and total > self.max_cached_bytes:
+            path, nbytes = self._idle.popitem(last=False)
+            total -= nbytes
+            for key, (_, descriptor) in list(self._entries.items()):
+                if descriptor.path == path:
+                    del self._entries[key]
+            self._unlink(path)
+    
+    def _unlink(self, path: str):
+        # Workers that still map the file keep their pages until they unmap
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    
+    @contextmanager
+    def lease(self, key: Hashable, df: pd.DataFrame):
+        descriptor = self.put(key, df)
+        try:
+            yield descriptor
+        finally:
+            self.release(descriptor)
+    
+    # ---------- state ----------
+    
+    @property
+    def leased(self) -> int:
+        return len(self._refs)
+    
+    @property
+    def cached_bytes(self) -> int:
+        return sum(self._idle.values())
+    
+    def close(self):
+        """Unlink every frame; later put() calls start a new directory"""
+        with self._lock:
+            if self._dir is not None:
+                shutil.rmtree(self._dir, ignore_errors=True)
+            self._dir = None
+            self._entries.clear()
+            self._refs.clear()
+            self._idle.clear()
+            self._retired.clear()
+
+
+# ============================================
+# WORKER SIDE
+# ============================================
+
+_mappings: OrderedDict = OrderedDict()  # path -> read-only memmap, per process
+
+
+def _map(descriptor: BarDescriptor) -> np.ndarray:
+    data = _mappings.get(descriptor.path)
+    if data is None:
+        data = np.memmap(descriptor.path, dtype=np.float64, mode='r', shape=(descriptor.nbytes // 8,))
+        _mappings[descriptor.path] = data
+        while len(_mappings) > WORKER_MAPPINGS:
+            _mappings.popitem(last=False)  # unmapped once no frame views it any more
+    else:
+        _mappings.move_to_end(descriptor.path)
+    return data
+
+
+def attach(descriptor: BarDescriptor) -> pd.DataFrame:
+    """DataFrame over the shared pages: the float columns are read-only views, not copies"""
+    n = descriptor.rows
+    if descriptor.nbytes == 0:
+        columns = ([descriptor.time_column] if descriptor.time_column else []) + list(descriptor.columns)
+        return pd.DataFrame(columns=columns)
+    data = _map(descriptor)
+    block = np.asarray(data[:len(descriptor.columns) * n]).reshape(len(descriptor.columns), n)
+    # pandas keeps a 2D block as (columns, rows), so the transposed view is adopted as is
+    df = pd.DataFrame(block.T, columns=list(descriptor.columns), copy=False)
+    if descriptor.time_column is not None:
+        times = pd.DatetimeIndex(np.asarray(data[len(descriptor.columns) * n:]).view('datetime64[ns]'))
+        if descriptor.tz is not None:
+            times = times.tz_localize('UTC').tz_convert(descriptor.tz)
+        df.insert(0, descriptor.time_column, times)
+    return df
+
+
+def attach_bars(descriptor: BarDescriptor) -> Bars:
+    """Bars over the shared pages: every column is a read-only view, no DataFrame is built"""
+    n = descriptor.rows
+    if descriptor.nbytes == 0:
+        return Bars(*(np.empty(0) for _ in range(5)))
+    data = _map(descriptor)
+    block = np.asarray(data[:len(descriptor.columns) * n]).reshape(len(descriptor.columns), n)
+    columns = {name: block[k] for k, name in enumerate(descriptor.columns)}
+    time = None
+    if descriptor.time_column is not None:
+        time = np.asarray(data[len(descriptor.columns) * n:]).view(np.int64)
+    return Bars(columns['Open'], columns['High'], columns['Low'], columns['Close'], columns.get('Volume'),
+                time=time, tz=descriptor.tz)
@@ -0,0 +1,115 @@
+"""
+Bar Container
+OHLCV as contiguous float64 NumPy columns with int64 timestamps. The
+analyzers and ChartDrawer read bars through this instead of a DataFrame:
+column access and scalar reads are plain array indexing, and slicing
+returns views. Built from a DataFrame without copying float64 columns.
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Optional, Union
+
+COLUMNS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+
+class Bars:
+    """
+    open / high / low / close / volume: float64 arrays of equal length
+    time: int64 nanoseconds since the epoch (UTC) or None
+    index: labels of the source frame when they are not simply 0..n-1
+    """
+    
+    __slots__ = ('open', 'high', 'low', 'close', 'volume', 'time', 'tz', 'index')
+    
+    def __init__(self, open: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                 volume: Optional[np.ndarray] = None, time: Optional[np.ndarray] = None,
+                 tz: Optional[str] = None, index: Optional[pd.Index] = None):
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume if volume is not None else np.zeros(len(close))
+        self.time = time
+        self.tz = tz
+        self.index = index
+    
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> 'Bars':
+        """Float64 columns are taken as views; other dtypes are converted once"""
+        columns = [np.ascontiguousarray(df[c].to_numpy(dtype=np.float64, na_value=np.nan))
+                   if c in df.columns else None for c in COLUMNS]
+        
+        # Timestamps come from a DatetimeIndex or the first column (after reset_index)
+        times = None
+        if isinstance(df.index, pd.DatetimeIndex):
+            times = df.index
+        elif len(df.columns) and df[df.columns[0]].dtype.kind == 'M':
+            times = df[df.columns[0]]
+        time = tz = None
+        if times is not None:
+            # .values of tz-aware data is already UTC; only the zone name is kept
+            tz = getattr(times.dtype, 'tz', None)
+            tz = str(tz) if tz is not None else None
+            time = times.values.astype('datetime64[ns]', copy=False).view(np.int64)
+        
+        index = df.index
+        if isinstance(index, pd.RangeIndex) and index.start == 0 and index.step == 1:
+            index = None
+        return cls(*columns, time=time, tz=tz, index=index)
+    
+    def to_frame(self) -> pd.DataFrame:
+        """DataFrame adapter for code that still needs one (Date column when times are known)"""
+        df = pd.DataFrame({'Open': self.open, 'High': self.high, 'Low': self.low,
+                           'Close': self.close, 'Volume': self.volume}, index=self.index)
+        if self.time is not None:
+            dates = pd.DatetimeIndex(self.time.view('datetime64[ns]'))
+            if self.tz is not None:
+                dates = dates.tz_localize('UTC').tz_convert(self.tz)
+            df.insert(0, 'Date', dates)
+        return df
+    
+    # ---------- access ----------
+    
+    def __len__(self) -> int:
+        return len(self.close)
+    
+    @property
+    def empty(self) -> bool:
+        return len(self.close) == 0
+    
+    def __getitem__(self, key: slice) -> 'Bars':
+        """Row slice: views of every column, no copy"""
+        if not isinstance(key, slice):
+            raise TypeError("Bars only support slicing; read columns as attributes (bars.close[i])")
+        return Bars(self.open[key], self.high[key], self.low[key], self.close[key], self.volume[key],
+                    self.time[key] if self.time is not None else None, self.tz,
+                    self.index[key] if self.index is not None else None)
+    
+    def tail(self, n: int) -> 'Bars':
+        return self[max(len(self) - n, 0):]
+    
+    def head(self, n: int) -> 'Bars':
+        return self[:n]
+    
+    def label(self, i: int):
+        """Row label like df.index[i]"""
+        return self.index[i] if self.index is not None else i
+    
+    def labels(self) -> pd.Index:
+        return self.index if self.index is not None else pd.RangeIndex(len(self))
+
+
+BarsLike = Union[Bars, pd.DataFrame]
+
+
+def as_bars(data: BarsLike) -> Bars:
+    """Entry point of every analyzer: Bars pass through, DataFrames are wrapped"""
+    return data if isinstance(data, Bars) else Bars.from_frame(data)
+
+
+def rolling_mean_last(values: np.ndarray, window: int) -> float:
+    """Last value of a `window`-bar simple moving average (NaN while too short)"""
+    if len(values) < window:
+        return float('nan')
+    return float(values[-window:].mean())
@@ -0,0 +1,386 @@
+"""
+Benchmark Suite
+Times the analyzers and chart rendering on deterministic synthetic OHLCV
+(trend / range / volatile regimes) at 100 to 100k bars, stores the results
+as JSON and compares a run against a saved baseline. Runs fully offline.
+
+    python benchmarks.py run [--sizes 100,1000] [--regimes trend] [--out results.json]
+    python benchmarks.py compare baseline.json results.json [--threshold 0.2]
+    python benchmarks.py ipc [--sizes 1000,100000] [--jobs 50]
+    python benchmarks.py bars [--sizes 1000,100000] [--repeats 20]
+"""
+
+import sys
+import json
+import pickle
+import time
+import platform
+import argparse
+import statistics
+import numpy as np
+import pandas as pd
+import matplotlib
+import matplotlib.pyplot as plt
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from elliott_waves import ElliottWaveAnalyzer
+from classic_analysis import ClassicAnalyzer
+from harmonic_patterns import HarmonicAnalyzer
+from ict_analysis import ICTAnalyzer
+from fibonacci_analysis import FibonacciAnalyzer
+from chart_drawer import ChartDrawer
+from bar_store import SharedBarStore, BarDescriptor, attach, attach_bars
+from bars import Bars, as_bars
+
+SIZES = (100, 1000, 10000, 100000)
+REGIMES = ('trend', 'range', 'volatile')
+RESULTS_FILE = "benchmark_results.json"
+
+
+def synthetic_ohlcv(n: int, regime: str = 'trend', seed: int = 0) -> pd.DataFrame:
+    """
+    Deterministic OHLCV bars
+    trend: drifting random walk | range: mean-reverting around 100 |
+    volatile: volatility clusters (GARCH-like) with occasional gaps
+    """
+    rng = np.random.default_rng(seed)
+    shocks = rng.standard_normal(n)
+    
+    if regime == 'trend':
+        returns = 0.0008 + 0.01 * shocks
+        close = 100 * np.exp(np.cumsum(returns))
+    elif regime == 'range':
+        log_price = np.empty(n)
+        level = 0.0
+        for k in range(n):
+            level += -0.05 * level + 0.01 * shocks[k]
+            log_price[k] = level
+        close = 100 * np.exp(log_price)
+    elif regime == 'volatile':
+        variance = np.empty(n)
+        returns = np.empty(n)
+        var = 1e-4
+        for k in range(n):
+            variance[k] = var
+            returns[k] = np.sqrt(var) * shocks[k]
+            var = 2e-6 + 0.12 * returns[k] ** 2 + 0.86 * var
+        gaps = (rng.random(n) < 0.01) * rng.normal(0, 0.03, n)
+        close = 100 * np.exp(np.cumsum(returns + gaps))
+    else:
+        raise ValueError(f"Unknown regime: {regime}")
+    
+    open_ = np.r_[close[0], close[:-1]] * (1 + rng.normal(0, 0.001, n))
+    spread = np.abs(rng.normal(0, 0.004, n)) * close
+    return pd.DataFrame({
+        'Date': pd.date_range('2020-01-01', periods=n, freq='h'),
+        'Open': open_,
+        'High': np.maximum(open_, close) + spread,
+        'Low': np.minimum(open_, close) - spread,
+        'Close': close,
+        'Volume': rng.uniform(1e5, 1e6, n).round(),
+    })
+
+
+def _chart(drawer: ChartDrawer):
+    def run(df):
+        buf = drawer.generate_chart(df, 'BENCH', 'Daily', ['all'])
+        plt.close('all')
+        return buf
+    return run
+
+
+def default_targets() -> Dict[str, Callable[[pd.DataFrame], object]]:
+    drawer = ChartDrawer()
+    return {
+        'ElliottWaveAnalyzer.analyze': ElliottWaveAnalyzer().analyze,
+        'ClassicAnalyzer.analyze': ClassicAnalyzer().analyze,
+        'HarmonicAnalyzer.analyze': HarmonicAnalyzer().analyze,
+        'ICTAnalyzer.analyze': ICTAnalyzer().analyze,
+        'FibonacciAnalyzer.analyze': FibonacciAnalyzer().analyze,
+        'ChartDrawer.calculate_volume_profile': drawer.calculate_volume_profile,
+        'ChartDrawer.generate_chart': _chart(drawer),
+    }
+
+
+def time_call(func: Callable, df: pd.DataFrame, repeats: int, min_seconds: float) -> List[float]:
+    """Run at least `repeats` times, or until `min_seconds` of samples for fast calls"""
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < repeats or (time.perf_counter() - started < min_seconds and len(samples) < 1000):
+        t0 = time.perf_counter()
+        func(df)
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def run_suite(sizes=SIZES, regimes=REGIMES, targets: Optional[List[str]] = None,
+              repeats: int = 3, min_seconds: float = 0.5, budget: float = 120.0,
+              log=print) -> Dict:
+    """
+    Time every target on every regime and size
+    A target whose single run exceeds `budget` seconds is skipped at larger sizes
+    """
+    all_targets = default_targets()
+    names = targets or list(all_targets)
+    results = []
+    
+    for regime in regimes:
+        frames = {n: synthetic_ohlcv(n, regime) for n in sizes}
+        for name in names:
+            func = all_targets[name]
+            func(frames[min(sizes)])  # warm-up (imports, caches, fonts)
+            skipped = False
+            for n in sizes:
+                row = {'target': name, 'regime': regime, 'bars': n}
+                if skipped:
+                    row['skipped'] = True
+                    results.append(row)
+                    continue
+                
+                samples = time_call(func, frames[n], repeats if n < 100000 else 1, min_seconds)
+                row.update({
+                    'runs': len(samples),
+                    'best_ms': min(samples) * 1000,
+                    'median_ms': statistics.median(samples) * 1000,
+                })
+                results.append(row)
+                log(f"{regime:<9} {name:<38} {n:>7} bars  {row['median_ms']:>10.2f} ms  ({len(samples)} runs)")
+                skipped = min(samples) > budget
+    
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'matplotlib': matplotlib.__version__,
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+        },
+        'results': results,
+    }
+
+
+def compare(baseline: Dict, current: Dict, threshold: float = 0.2, floor_ms: float = 1.0) -> List[Dict]:
+    """
+    Rows present in both runs with their ratio; `status` is 'regression' when
+    the median is more than `threshold` slower (and above `floor_ms` of noise)
+    """
+    index = {(r['target'], r['regime'], r['bars']): r for r in baseline['results'] if not r.get('skipped')}
+    rows = []
+    for r in current['results']:
+        base = index.get((r['target'], r['regime'], r['bars']))
+        if base is None or r.get('skipped'):
+            continue
+        ratio = r['median_ms'] / base['median_ms'] if base['median_ms'] else float('inf')
+        status = 'ok'
+        if ratio > 1 + threshold and r['median_ms'] - base['median_ms'] > floor_ms:
+            status = 'regression'
+        elif ratio < 1 / (1 + threshold) and base['median_ms'] - r['median_ms'] > floor_ms:
+            status = 'improved'
+        rows.append({'target': r['target'], 'regime': r['regime'], 'bars': r['bars'],
+                     'baseline_ms': base['median_ms'], 'current_ms': r['median_ms'],
+                     'ratio': ratio, 'status': status})
+    return rows
+
+
+def get_comparison_text(rows: List[Dict]) -> str:
+    marks = {'ok': '', 'regression': '  << REGRESSION', 'improved': '  improved'}
+    text = f"{'Target':<38} {'Regime':<9} {'Bars':>7} {'Base ms':>10} {'Now ms':>10} {'Ratio':>6}\n"
+    for r in rows:
+        text += (f"{r['target']:<38} {r['regime']:<9} {r['bars']:>7} {r['baseline_ms']:>10.2f} "
+                 f"{r['current_ms']:>10.2f} {r['ratio']:>6.2f}{marks[r['status']]}\n")
+    regressions = sum(r['status'] == 'regression' for r in rows)
+    text += f"\n{regressions} regression(s) in {len(rows)} comparisons"
+    return text
+
+
+def _last_close(df: pd.DataFrame) -> float:
+    return float(df['Close'].iloc[-1])
+
+
+def _last_close_shared(descriptor: BarDescriptor) -> float:
+    return float(attach(descriptor)['Close'].iloc[-1])
+
+
+def measure_ipc(sizes=SIZES, jobs: int = 50) -> List[Dict]:
+    """
+    Round trip of one pool job that reads the last close: frame pickled into
+    the job vs a shared bar store descriptor (written once, mapped by workers)
+    """
+    rows = []
+    store = SharedBarStore()
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        pool.submit(_last_close, synthetic_ohlcv(10)).result()  # worker start-up
+        for n in sizes:
+            df = synthetic_ohlcv(n)
+            
+            pickled = []
+            for _ in range(jobs):
+                t0 = time.perf_counter()
+                pool.submit(_last_close, df).result()
+                pickled.append(time.perf_counter() - t0)
+            
+            t0 = time.perf_counter()
+            descriptor = store.put(('BENCH', n), df)
+            write = time.perf_counter() - t0
+            shared = []
+            for _ in range(jobs):
+                t0 = time.perf_counter()
+                pool.submit(_last_close_shared, descriptor).result()
+                shared.append(time.perf_counter() - t0)
+            store.release(descriptor)
+            
+            rows.append({
+                'bars': n,
+                'pickle_bytes': len(pickle.dumps(df)),
+                'descriptor_bytes': len(pickle.dumps(descriptor)),
+                'pickle_ms': statistics.median(pickled) * 1000,
+                'shared_ms': statistics.median(shared) * 1000,
+                'write_ms': write * 1000,
+            })
+    store.close()
+    return rows
+
+
+def get_ipc_text(rows: List[Dict]) -> str:
+    text = f"{'Bars':>7} {'Pickled':>10} {'Desc':>6} {'Pickle ms':>10} {'Shared ms':>10} {'Write ms':>9}\n"
+    for r in rows:
+        text += (f"{r['bars']:>7} {r['pickle_bytes']:>10} {r['descriptor_bytes']:>6} {r['pickle_ms']:>10.3f} "
+                 f"{r['shared_ms']:>10.3f} {r['write_ms']:>9.3f}\n")
+    text += "\nPer-job round trip (median); the shared frame is written once and reused by every job"
+    return text
+
+
+def _request_targets() -> List[Callable]:
+    """What one full chart request runs on its bars, without the PNG encode"""
+    drawer = ChartDrawer()
+    return [ElliottWaveAnalyzer().analyze, ClassicAnalyzer().analyze, HarmonicAnalyzer().analyze,
+            ICTAnalyzer().analyze, FibonacciAnalyzer().analyze,
+            drawer.get_targets_text, drawer.prepare_chart_data]
+
+
+def _median_ms(func: Callable, repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples) * 1000
+
+
+def measure_bars(sizes=SIZES, repeats: int = 20) -> List[Dict]:
+    """
+    Per-request overhead of the bar container: the engines of one chart request
+    fed the DataFrame (each wraps it) vs one Bars shared by all of them, plus
+    the worker-side attach as a DataFrame vs as Bars and a few hot accessors
+    """
+    targets = _request_targets()
+    store = SharedBarStore()
+    rows = []
+    for n in sizes:
+        df = synthetic_ohlcv(n)
+        bars = as_bars(df)
+        for target in targets:
+            target(bars)  # warm-up
+        reps = repeats if n < 100000 else max(1, repeats // 10)
+        
+        def with_frame():
+            for target in targets:
+                target(df)
+        
+        def with_bars():
+            shared = as_bars(df)
+            for target in targets:
+                target(shared)
+        
+        descriptor = store.put(('BENCH', n), df)
+        rows.append({
+            'bars': n,
+            'frame_ms': _median_ms(with_frame, reps),
+            'bars_ms': _median_ms(with_bars, reps),
+            'convert_us': _median_ms(lambda: Bars.from_frame(df), 200) * 1000,
+            'attach_us': _median_ms(lambda: attach(descriptor), 200) * 1000,
+            'attach_bars_us': _median_ms(lambda: attach_bars(descriptor), 200) * 1000,
+            'last_frame_us': _median_ms(lambda: df['Close'].iloc[-1], 200) * 1000,
+            'last_bars_us': _median_ms(lambda: bars.close[-1], 200) * 1000,
+            'tail_frame_us': _median_ms(lambda: df.tail(120), 200) * 1000,
+            'tail_bars_us': _median_ms(lambda: bars.tail(120), 200) * 1000,
+        })
+        store.release(descriptor)
+    store.close()
+    return rows
+
+
+def get_bars_text(rows: List[Dict]) -> str:
+    text = (f"{'Bars':>7} {'Frame ms':>9} {'Bars ms':>9} {'Convert us':>11} {'Attach us':>10} {'->Bars us':>10} "
+            f"{'close[-1] us':>13} {'tail us':>12}\n")
+    for r in rows:
+        text += (f"{r['bars']:>7} {r['frame_ms']:>9.2f} {r['bars_ms']:>9.2f} {r['convert_us']:>11.1f} "
+                 f"{r['attach_us']:>10.1f} {r['attach_bars_us']:>10.1f} "
+                 f"{r['last_frame_us']:>6.2f}/{r['last_bars_us']:<6.2f} {r['tail_frame_us']:>5.1f}/{r['tail_bars_us']:<6.1f}\n")
+    text += "\nFrame/Bars: all engines of one request (median); accessors: DataFrame/Bars"
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyzer and chart benchmarks on synthetic OHLCV")
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    run = commands.add_parser('run')
+    run.add_argument('--sizes', default=','.join(map(str, SIZES)))
+    run.add_argument('--regimes', default=','.join(REGIMES))
+    run.add_argument('--targets', default='', help="comma-separated target names (default: all)")
+    run.add_argument('--repeats', type=int, default=3)
+    run.add_argument('--budget', type=float, default=120.0, help="seconds per run before larger sizes are skipped")
+    run.add_argument('--out', default=RESULTS_FILE)
+    
+    cmp = commands.add_parser('compare')
+    cmp.add_argument('baseline')
+    cmp.add_argument('current')
+    cmp.add_argument('--threshold', type=float, default=0.2)
+    
+    ipc = commands.add_parser('ipc')
+    ipc.add_argument('--sizes', default=','.join(map(str, SIZES)))
+    ipc.add_argument('--jobs', type=int, default=50)
+    
+    bars = commands.add_parser('bars')
+    bars.add_argument('--sizes', default='100,1000,10000')
+    bars.add_argument('--repeats', type=int, default=20)
+    
+    args = parser.parse_args()
+    
+    if args.command == 'run':
+        results = run_suite(
+            sizes=tuple(int(n) for n in args.sizes.split(',')),
+            regimes=tuple(args.regimes.split(',')),
+            targets=[t for t in args.targets.split(',') if t] or None,
+            repeats=args.repeats,
+            budget=args.budget,
+        )
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved {len(results['results'])} results to {args.out}")
+        return
+    
+    if args.command == 'ipc':
+        print(get_ipc_text(measure_ipc(tuple(int(n) for n in args.sizes.split(',')), args.jobs)))
+        return
+    
+    if args.command == 'bars':
+        print(get_bars_text(measure_bars(tuple(int(n) for n in args.sizes.split(',')), args.repeats)))
+        return
+    
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    rows = compare(baseline, current, args.threshold)
+    print(get_comparison_text(rows))
+    sys.exit(1 if any(r['status'] == 'regression' for r in rows) else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -6,14 +6,27 @@ With Access Request System and Chart Drawing
 All text in English
 """
 
+import io
 import os
+import copy
 import json
+import asyncio
+import time
+import pstats
+import cProfile
 import logging
 import tempfile
+import threading
+from collections import OrderedDict
+from functools import partial
+from dataclasses import dataclass, astuple
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler, MessageHandler, filters, ContextTypes
 import yfinance as yf
+import numpy as np
 import pandas as pd
 
 # Import analysis engines
@@ -22,7 +35,17 @@ from classic_analysis import ClassicAnalyzer
 from harmonic_patterns import HarmonicAnalyzer
 from ict_analysis import ICTAnalyzer
 from fibonacci_analysis import FibonacciAnalyzer
-from chart_drawer import ChartDrawer
+from bars import as_bars
+from chart_drawer import ChartDrawer, OUTPUT_PROFILES
+from parameter_profiles import ParameterProfile, load_profiles, get_profile
+from watchlist import WatchlistManager, WatchlistScanner, BAR_SECONDS
+from alert_rules import AlertRuleEngine, FIELDS
+from screener import Screener, load_universe, universe_path, list_universes, SORT_KEYS
+from mtf_analysis import MultiTimeframeAnalyzer
+from metrics import metrics
+from job_scheduler import JobScheduler
+from cancellation import JobCancelled
+from shared_store import SharedStore, SharedDict, SharedSet
 
 # Settings
 logging.basicConfig(level=logging.INFO)
@@ -70,8 +93,20 @@ TIMEFRAMES = {
 }
 
 user_states = {}
+
+# Last chart per user for the full-resolution / HD buttons: bars and rendered images stay
+# in this process (a user is always routed to the same worker), never in the session store
+last_charts: OrderedDict = OrderedDict()
+LAST_CHARTS_MAX = 200
+
 chart_drawer = ChartDrawer()
 
+# Chart jobs go through a bounded priority queue, one per user (a newer request replaces the older one)
+job_scheduler = JobScheduler(concurrency=2, max_queued=20, max_wait=8.0, metrics=metrics)
+
+# Analyzers and matplotlib are shared and not thread-safe: one thread runs all CPU stages
+analysis_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='analysis')
+
 # Initialize analyzers
 elliott_analyzer = ElliottWaveAnalyzer()
 classic_analyzer = ClassicAnalyzer()
@@ -79,51 +114,156 @@ harmonic_analyzer = HarmonicAnalyzer()
 ict_analyzer = ICTAnalyzer()
 fibonacci_analyzer = FibonacciAnalyzer()
 
+# Tuned parameters per symbol class / timeframe (written by optimizer.py)
+parameter_profiles = load_profiles()
+
+
+@dataclass(frozen=True)
+class Engines:
+    """
+    The analyzers and chart drawer configured for one parameter profile
+    Built once per profile and never modified, so concurrent jobs can share them
+    """
+    chart_drawer: ChartDrawer
+    elliott: ElliottWaveAnalyzer
+    classic: ClassicAnalyzer
+    harmonic: HarmonicAnalyzer
+    ict: ICTAnalyzer
+    fibonacci: FibonacciAnalyzer
+
+
+default_engines = Engines(chart_drawer, elliott_analyzer, classic_analyzer, harmonic_analyzer,
+                          ict_analyzer, fibonacci_analyzer)
+_profile_engines = {astuple(ParameterProfile()): default_engines}
+_profile_engines_lock = threading.Lock()
+
+# Watchlists and alert rules (scanner is created in main once the data helpers exist)
+watchlists = WatchlistManager()
+alert_rules = AlertRuleEngine()
+
+# Universe screener for /scan (bars cached for one bar per timeframe; fetch resolved at call time)
+screener = Screener(lambda symbols, timeframe: get_stocks_data(symbols, timeframe))
+metrics.register_cache('screener_bars', screener.cache)
+
+# All timeframes from two base downloads for the MTF summary
+mtf_analyzer = MultiTimeframeAnalyzer(
+    lambda symbol, interval, period: get_base_data(symbol, interval, period),
+    periods={tf: config['period'] for tf, config in TIMEFRAMES.items()}
+)
+
+# Sharded mode (BOT_SHARDS > 1): sessions, access lists and the bars / analysis / chart
+# caches live in a SQLite store every worker process shares; None keeps them in-process
+shared_store = None
+
+# Seconds cached entries stay valid: bars and quotes are refetched after BARS_CACHE_TTL,
+# analysis lines and charts are keyed by the bars they were computed from
+BARS_CACHE_TTL = 120
+INFO_CACHE_TTL = 60
+RESULT_CACHE_TTL = 900
+
+# Sharded mode: sessions are mirrored in this process and written to the store by one
+# ordered thread, approvals are re-read at most every APPROVAL_CACHE_TTL seconds,
+# so handlers on the event loop do not wait on SQLite
+state_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='state')
+_sessions = {}
+_approvals = {}  # user_id -> (approved, expires)
+APPROVAL_CACHE_TTL = 30
+
 # ============================================
 # HELPER FUNCTIONS
 # ============================================
 
+def use_shared_store(store: SharedStore):
+    """Move session state and the access lists into `store` (once per worker process)"""
+    global shared_store, user_states, pending_requests, approved_users
+    shared_store = store
+    user_states = SharedDict(store, 'session')
+    pending_requests = SharedDict(store, 'pending')
+    approved_users = SharedSet(store, 'approved')
+    metrics.register_cache('shared_store', store)
+
+def session(user_id: int) -> dict:
+    """The user's session (read from a shared store once per process, then from the mirror)"""
+    if shared_store is None:
+        return user_states.get(user_id, {})
+    state = _sessions.get(user_id)
+    if state is None:
+        state = _sessions[user_id] = user_states.get(user_id, {})
+    return state
+
+def update_state(user_id: int, **fields):
+    """Merge fields into the user's session; assigned back so a shared store sees the change"""
+    state = dict(session(user_id))
+    state.update(fields)
+    if shared_store is None:
+        user_states[user_id] = state
+    else:
+        _sessions[user_id] = state
+        state_writer.submit(user_states.__setitem__, user_id, state)
+
+def remember_chart(user_id: int, chart: dict):
+    last_charts[user_id] = chart
+    last_charts.move_to_end(user_id)
+    while len(last_charts) > LAST_CHARTS_MAX:
+        last_charts.popitem(last=False)
+
+def engines_for(symbol: str, timeframe: str) -> Engines:
+    """Engines with the symbol class / timeframe profile applied (copies, the defaults stay untouched)"""
+    profile = get_profile(parameter_profiles, symbol, timeframe)
+    key = astuple(profile)
+    with _profile_engines_lock:
+        engines = _profile_engines.get(key)
+        if engines is None:
+            # Shallow copies: the analyzers keep no per-call state, only these parameters differ
+            engines = Engines(**{name: copy.copy(engine) for name, engine in vars(default_engines).items()})
+            profile.apply(chart_drawer=engines.chart_drawer, classic=engines.classic,
+                          harmonic=engines.harmonic, ict=engines.ict)
+            _profile_engines[key] = engines
+    return engines
+
 def is_approved(user_id: int) -> bool:
-    return user_id in approved_users or user_id == ADMIN_ID
+    if user_id == ADMIN_ID:
+        return True
+    if shared_store is None:
+        return user_id in approved_users
+    approved, expires = _approvals.get(user_id, (False, 0.0))
+    if expires < time.monotonic():
+        approved = user_id in approved_users
+        _approvals[user_id] = (approved, time.monotonic() + APPROVAL_CACHE_TTL)
+    return approved
 
 def is_admin(user_id: int) -> bool:
     return user_id == ADMIN_ID
 
+def resample_timeframe(df: pd.DataFrame, timeframe: str) -> pd.DataFrame:
+    """Build custom timeframes from the downloaded base interval"""
+    if df.empty:
+        return df
+    
+    ohlcv = {
+        'Open': 'first',
+        'High': 'max',
+        'Low': 'min',
+        'Close': 'last',
+        'Volume': 'sum'
+    }
+    if timeframe == '4h':
+        df = df.resample('4h').agg(ohlcv).dropna()
+    elif timeframe == '7m':
+        # Approximate 7m by taking every 7/5 candles
+        df = df.iloc[::1]  # Keep as 5m for now, closest available
+    elif timeframe == '10m':
+        df = df.resample('10min').agg(ohlcv).dropna()
+    return df
+
 def get_stock_data(symbol: str, timeframe: str) -> pd.DataFrame:
     try:
         tf_config = TIMEFRAMES.get(timeframe, TIMEFRAMES['1d'])
         stock = yf.Ticker(symbol)
         
-        # Handle custom timeframes that need resampling
-        if timeframe == '4h':
-            df = stock.history(period='3mo', interval='1h')
-            if not df.empty:
-                df = df.resample('4h').agg({
-                    'Open': 'first',
-                    'High': 'max',
-                    'Low': 'min',
-                    'Close': 'last',
-                    'Volume': 'sum'
-                }).dropna()
-        elif timeframe == '7m':
-            # Get 5m data and resample to ~7m (using 5m as base)
-            df = stock.history(period='3d', interval='5m')
-            if not df.empty:
-                # Approximate 7m by taking every 7/5 candles
-                df = df.iloc[::1]  # Keep as 5m for now, closest available
-        elif timeframe == '10m':
-            # Get 5m data and resample to 10m
-            df = stock.history(period='4d', interval='5m')
-            if not df.empty:
-                df = df.resample('10min').agg({
-                    'Open': 'first',
-                    'High': 'max',
-                    'Low': 'min',
-                    'Close': 'last',
-                    'Volume': 'sum'
-                }).dropna()
-        else:
-            df = stock.history(period=tf_config['period'], interval=tf_config['interval'])
+        # Custom timeframes (7m, 10m, 4h) are resampled from their base interval
+        df = stock.history(period=tf_config['period'], interval=tf_config['interval'])
+        df = resample_timeframe(df, timeframe)
         
         df = df.reset_index()
         return df
@@ -131,6 +271,31 @@ def get_stock_data(symbol: str, timeframe: str) -> pd.DataFrame:
         logger.error(f"Error fetching {symbol}: {e}")
         return pd.DataFrame()
 
+def get_base_data(symbol: str, interval: str, period: str) -> pd.DataFrame:
+    """Raw download (DatetimeIndex) that several timeframes are derived from"""
+    return yf.Ticker(symbol).history(period=period, interval=interval)
+
+def get_stocks_data(symbols: list, timeframe: str) -> dict:
+    """Fetch many symbols in one download - {symbol: DataFrame like get_stock_data}"""
+    frames = {}
+    try:
+        tf_config = TIMEFRAMES.get(timeframe, TIMEFRAMES['1d'])
+        data = yf.download(symbols, period=tf_config['period'], interval=tf_config['interval'],
+                           group_by='ticker', auto_adjust=True, threads=True, progress=False)
+        
+        for symbol in symbols:
+            if isinstance(data.columns, pd.MultiIndex):
+                if symbol not in data.columns.get_level_values(0):
+                    continue
+                df = data[symbol]
+            else:
+                df = data
+            df = resample_timeframe(df.dropna(how='all'), timeframe)
+            frames[symbol] = df.reset_index()
+    except Exception as e:
+        logger.error(f"Error fetching {len(symbols)} symbols: {e}")
+    return frames
+
 def get_stock_info(symbol: str) -> dict:
     try:
         stock = yf.Ticker(symbol)
@@ -144,6 +309,33 @@ def get_stock_info(symbol: str) -> dict:
     except:
         return {'name': symbol, 'price': 0, 'change': 0, 'volume': 0}
 
+def frame_key(df: pd.DataFrame) -> str:
+    """Identifies a bar set: length, last bar time and close"""
+    return f"{len(df)}:{df.iloc[-1, 0]}:{df['Close'].iloc[-1]:.6f}"
+
+def fetch_stock_data(symbol: str, timeframe: str) -> pd.DataFrame:
+    """get_stock_data through the shared cache, so every worker reuses one download"""
+    if shared_store is None:
+        return get_stock_data(symbol, timeframe)
+    key = f"{symbol}:{timeframe}"
+    df = shared_store.get('bars', key)
+    if df is None:
+        df = get_stock_data(symbol, timeframe)
+        if not df.empty:
+            shared_store.set('bars', key, df, ttl=min(BARS_CACHE_TTL, BAR_SECONDS.get(timeframe, 86400)))
+    return df
+
+def fetch_stock_info(symbol: str) -> dict:
+    """get_stock_info through the shared cache"""
+    if shared_store is None:
+        return get_stock_info(symbol)
+    info = shared_store.get('info', symbol)
+    if info is None:
+        info = get_stock_info(symbol)
+        if info['price']:
+            shared_store.set('info', symbol, info, ttl=INFO_CACHE_TTL)
+    return info
+
 # ============================================
 # BOT COMMANDS
 # ============================================
@@ -244,10 +436,42 @@ async def admin_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "/users - View users\n"
         "/pending - View pending requests\n"
         "/remove [ID] - Remove user\n"
+        "/stats [timeframe|analysis|prom] - Latency stats\n"
+        "/profile [SYMBOL] [TF] [TYPE] - Profile one chart\n"
     )
     
+    overall, recent = metrics.throughput()
+    stages = metrics.stages()
+    total = stages.get(('total', ''))
+    if total is not None:
+        text += (f"\n**Charts:** {total.count} | p50 {total.percentile(50):.2f}s | "
+                 f"p95 {total.percentile(95):.2f}s | {recent:.2f} req/min\n")
+    wait = stages.get(('queue_wait', ''))
+    text += f"**Queue:** {job_scheduler.depth} waiting | {job_scheduler.running} running"
+    if wait is not None:
+        text += f" | wait p95 {wait.percentile(95):.2f}s"
+    text += "\n"
+    
     await update.message.reply_text(text, parse_mode='Markdown')
 
+async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user_id = update.effective_user.id
+    
+    if not is_admin(user_id):
+        await update.message.reply_text("❌ Admin only command.")
+        return
+    
+    arg = context.args[0].lower() if context.args else ''
+    
+    if arg == 'prom':
+        path = metrics.dump_prometheus()
+        with open(path, 'rb') as f:
+            await update.message.reply_document(document=f, filename=os.path.basename(path))
+        return
+    
+    by_tag = arg if arg in ('timeframe', 'analysis') else None
+    await update.message.reply_text(metrics.get_stats_text(by_tag=by_tag)[:4096], parse_mode='Markdown')
+
 async def users_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
     
@@ -305,6 +529,7 @@ async def remove_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
         if target_id in approved_users:
             approved_users.discard(target_id)
+            _approvals.pop(target_id, None)
             save_approved_users(approved_users)
             await update.message.reply_text(f"✅ Removed `{target_id}`", parse_mode='Markdown')
         else:
@@ -312,6 +537,249 @@ async def remove_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     except ValueError:
         await update.message.reply_text("❌ Invalid ID.")
 
+async def watch_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user_id = update.effective_user.id
+    
+    if not is_approved(user_id):
+        await update.message.reply_text("🔒 Send /start to request access.")
+        return
+    
+    if not context.args:
+        await update.message.reply_text("Usage: /watch [SYMBOL] [TIMEFRAME]\nExample: /watch AAPL 1h")
+        return
+    
+    symbol = context.args[0].upper()
+    timeframe = context.args[1].lower() if len(context.args) > 1 else '1d'
+    if timeframe not in TIMEFRAMES:
+        await update.message.reply_text(f"❌ Invalid timeframe. Use: {', '.join(TIMEFRAMES)}")
+        return
+    
+    if watchlists.add(user_id, symbol, timeframe):
+        await update.message.reply_text(
+            f"👁 Watching **{symbol}** ({TIMEFRAMES[timeframe]['name']})\n\n"
+            "You will be alerted at bar close on:\n"
+            "• New harmonic pattern\n"
+            "• BOS / CHoCH structure break\n"
+            "• TP / Stop Loss crossing",
+            parse_mode='Markdown'
+        )
+    else:
+        await update.message.reply_text(f"ℹ️ {symbol} ({timeframe}) is already on your watchlist.")
+
+async def unwatch_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user_id = update.effective_user.id
+    
+    if not context.args:
+        await update.message.reply_text("Usage: /unwatch [SYMBOL] [TIMEFRAME]")
+        return
+    
+    symbol = context.args[0].upper()
+    timeframe = context.args[1].lower() if len(context.args) > 1 else None
+    
+    if watchlists.remove(user_id, symbol, timeframe):
+        await update.message.reply_text(f"✅ Removed {symbol}{f' ({timeframe})' if timeframe else ''}")
+    else:
+        await update.message.reply_text("❌ Not on your watchlist.")
+
+async def watchlist_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user_id = update.effective_user.id
+    symbols = watchlists.get(user_id)
+    
+    if not symbols:
+        await update.message.reply_text("📭 Your watchlist is empty.\nUse /watch [SYMBOL] [TIMEFRAME]")
+        return
+    
+    text = "👁 **Your Watchlist:**\n\n"
+    for symbol, timeframes in sorted(symbols.items()):
+        text += f"• `{symbol}` - {', '.join(timeframes)}\n"
+    
+    await update.message.reply_text(text, parse_mode='Markdown')
+
+async def alert_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user_id = update.effective_user.id
+    
+    if not is_approved(user_id):
+        await update.message.reply_text("🔒 Send /start to request access.")
+        return
+    
+    if len(context.args) < 3:
+        await update.message.reply_text(
+            "Usage: /alert [SYMBOL] [TIMEFRAME] [RULE]\n\n"
+            "Examples:\n"
+            "/alert AAPL 1h RSI < 30 and price in golden_zone\n"
+            "/alert BTC-USD 4h bullish_fvg_touched\n\n"
+            f"Fields: {', '.join(FIELDS)}"
+        )
+        return
+    
+    symbol = context.args[0].upper()
+    timeframe = context.args[1].lower()
+    expression = ' '.join(context.args[2:])
+    if timeframe not in TIMEFRAMES:
+        await update.message.reply_text(f"❌ Invalid timeframe. Use: {', '.join(TIMEFRAMES)}")
+        return
+    
+    try:
+        rule = alert_rules.add_rule(user_id, symbol, timeframe, expression)
+    except ValueError as e:
+        await update.message.reply_text(f"❌ Invalid rule: {e}")
+        return
+    
+    await update.message.reply_text(
+        f"⚡ Alert #{rule.rule_id} set on {symbol} ({TIMEFRAMES[timeframe]['name']})\n"
+        f"Rule: {expression}\n\n"
+        "Checked at every bar close."
+    )
+
+async def alerts_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user_id = update.effective_user.id
+    rules = alert_rules.rules_for(user_id)
+    
+    if not rules:
+        await update.message.reply_text("📭 No alerts.\nUse /alert [SYMBOL] [TIMEFRAME] [RULE]")
+        return
+    
+    text = "⚡ Your Alerts:\n\n"
+    for rule in rules:
+        text += f"#{rule.rule_id} {rule.symbol} {rule.timeframe}: {rule.expression}\n"
+    text += "\n/delalert [ID] - Delete alert"
+    
+    await update.message.reply_text(text)
+
+async def delalert_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user_id = update.effective_user.id
+    
+    if not context.args:
+        await update.message.reply_text("Usage: /delalert [ID]")
+        return
+    
+    try:
+        if alert_rules.remove_rule(user_id, int(context.args[0].lstrip('#'))):
+            await update.message.reply_text("✅ Alert deleted.")
+        else:
+            await update.message.reply_text("❌ Alert not found.")
+    except ValueError:
+        await update.message.reply_text("❌ Invalid ID.")
+
+async def scan_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user_id = update.effective_user.id
+    
+    if not is_approved(user_id):
+        await update.message.reply_text("🔒 Send /start to request access.")
+        return
+    
+    # /scan [TIMEFRAME] [SORT] [csv] [NAME] - NAME is a file in universes/
+    timeframe = '1d'
+    sort_by = 'score'
+    as_csv = False
+    name = None
+    for arg in context.args:
+        if arg.lower() in TIMEFRAMES:
+            timeframe = arg.lower()
+        elif arg.lower() in SORT_KEYS:
+            sort_by = arg.lower()
+        elif arg.lower() == 'csv':
+            as_csv = True
+        else:
+            name = arg
+    
+    try:
+        symbols = load_universe(universe_path(name))
+    except (ValueError, OSError):
+        available = ', '.join(list_universes()) or 'none'
+        await update.message.reply_text(f"❌ Unknown universe. Available: {available}")
+        return
+    if not symbols:
+        await update.message.reply_text("❌ The universe has no valid symbols.")
+        return
+    
+    status = await update.message.reply_text(
+        f"🔎 Scanning {len(symbols)} symbols ({TIMEFRAMES[timeframe]['name']})..."
+    )
+    
+    try:
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(None, screener.scan, symbols, timeframe, None, sort_by)
+    except Exception as e:
+        logger.error(f"Scan error: {e}")
+        await status.edit_text(f"❌ Scan failed: {str(e)[:100]}")
+        return
+    
+    if as_csv:
+        document = io.BytesIO(screener.to_csv(results).encode())
+        document.name = f"scan_{timeframe}_{datetime.now():%Y%m%d_%H%M}.csv"
+        await update.message.reply_document(document=document, caption=f"🔎 {len(results)} symbols, sorted by {sort_by}")
+        await status.delete()
+    else:
+        await status.edit_text(screener.get_table_text(results, timeframe), parse_mode='Markdown')
+
+async def quality_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user_id = update.effective_user.id
+    current = session(user_id).get('image_profile', 'preview')
+    
+    if not context.args or context.args[0].lower() not in OUTPUT_PROFILES:
+        await update.message.reply_text(
+            f"Usage: /quality [{'|'.join(OUTPUT_PROFILES)}]\n\n"
+            "preview - small image first, full resolution on demand\n"
+            "compact - reduced size and colors\n"
+            "standard - full resolution photo\n"
+            "hires - high resolution document\n\n"
+            f"Current: {current}"
+        )
+        return
+    
+    update_state(user_id, image_profile=context.args[0].lower())
+    await update.message.reply_text(f"✅ Chart quality: {context.args[0].lower()}")
+
+async def profile_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user_id = update.effective_user.id
+    
+    if not is_admin(user_id):
+        await update.message.reply_text("❌ Admin only command.")
+        return
+    
+    if len(context.args) < 2:
+        await update.message.reply_text(
+            "Usage: /profile [SYMBOL] [TIMEFRAME] [TYPE]\n"
+            "Example: /profile AAPL 1h ict\n\n"
+            "Types: elliott, classic, harmonic, ict, fibonacci, volume, all"
+        )
+        return
+    
+    symbol = context.args[0].upper()
+    timeframe = context.args[1].lower()
+    analysis_type = context.args[2].lower() if len(context.args) > 2 else 'all'
+    if timeframe not in TIMEFRAMES:
+        await update.message.reply_text(f"❌ Invalid timeframe. Use: {', '.join(TIMEFRAMES)}")
+        return
+    
+    msg = await update.message.reply_text(f"⏱ Profiling {symbol} {timeframe} {analysis_type}...")
+    
+    try:
+        # Same analysis thread as user charts, so the profile sees the real code path
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            analysis_executor, profile_chart_pipeline, symbol, timeframe, [analysis_type]
+        )
+    except Exception as e:
+        logger.error(f"Profile error: {e}")
+        await msg.edit_text(f"❌ Error: {str(e)}")
+        return
+    
+    if result is None:
+        await msg.edit_text(f"❌ Insufficient data for {symbol}")
+        return
+    
+    text, data = result
+    await msg.edit_text(f"⏱ {symbol} {timeframe} {analysis_type}\n\n```\n{text[:3900]}```", parse_mode='Markdown')
+    
+    document = io.BytesIO(data)
+    document.name = f"profile_{symbol}_{timeframe}_{analysis_type}.pstats"
+    await update.message.reply_document(
+        document=document,
+        caption="pstats file - open with snakeviz, or flameprof / gprof2dot for a flame graph"
+    )
+
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     text = (
         "❓ **User Guide**\n\n"
@@ -330,7 +798,17 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "• Fibonacci levels\n"
         "• Entry, Targets & Stop Loss\n\n"
         "**Timeframes:**\n"
-        "5m, 7m, 10m, 15m, 30m, 1H, 4H, Daily"
+        "5m, 7m, 10m, 15m, 30m, 1H, 4H, Daily\n\n"
+        "**Alerts:**\n"
+        "/watch [SYMBOL] [TF] - Alert at bar close\n"
+        "/unwatch [SYMBOL] [TF] - Stop alerts\n"
+        "/watchlist - Your watched symbols\n"
+        "/alert [SYMBOL] [TF] [RULE] - Custom alert\n"
+        "/alerts - Your alerts\n\n"
+        "**Screener:**\n"
+        "/scan [TF] [score|classic|harmonic|ict|fib] [csv] [NAME] - Rank the universe\n\n"
+        "**Charts:**\n"
+        "/quality [preview|compact|standard|hires] - Image size"
     )
     await update.message.reply_text(text, parse_mode='Markdown')
 
@@ -351,6 +829,7 @@ async def handle_approval(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if data.startswith('approve_'):
         target_id = int(data.replace('approve_', ''))
         approved_users.add(target_id)
+        _approvals.pop(target_id, None)
         save_approved_users(approved_users)
         
         if target_id in pending_requests:
@@ -397,7 +876,8 @@ async def handle_symbol(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     msg = await update.message.reply_text(f"⏳ Searching for {symbol}...")
     
-    info = get_stock_info(symbol)
+    # Network call off the event loop so other users' updates keep flowing
+    info = await asyncio.get_running_loop().run_in_executor(None, fetch_stock_info, symbol)
     
     if info['price'] == 0:
         await msg.edit_text(
@@ -406,7 +886,7 @@ async def handle_symbol(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
     
-    user_states[user_id] = {'symbol': symbol, 'info': info}
+    update_state(user_id, symbol=symbol, info=info)
     
     # Updated keyboard with new timeframes
     keyboard = [
@@ -426,6 +906,12 @@ async def handle_symbol(update: Update, context: ContextTypes.DEFAULT_TYPE):
         ],
         [
             InlineKeyboardButton("📋 Quick Full Analysis (Daily)", callback_data=f"quick_{symbol}")
+        ],
+        [
+            InlineKeyboardButton("🧭 MTF Summary (All Timeframes)", callback_data=f"mtf_{symbol}")
+        ],
+        [
+            InlineKeyboardButton("🧩 4-Timeframe Grid", callback_data=f"grid_tfs_{symbol}")
         ]
     ]
     
@@ -453,7 +939,8 @@ async def handle_timeframe(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Quick analysis
     if data.startswith('quick_'):
         symbol = data.replace('quick_', '')
-        await generate_and_send_chart(query, context, symbol, '1d', ['all'])
+        await schedule_job(query, user_id, job_priority(user_id, 'quick'),
+                           partial(generate_and_send_chart, query, context, symbol, '1d', ['all']))
         return
     
     # Timeframe selection
@@ -462,9 +949,7 @@ async def handle_timeframe(update: Update, context: ContextTypes.DEFAULT_TYPE):
         timeframe = parts[1]
         symbol = parts[2]
         
-        user_states[user_id] = user_states.get(user_id, {})
-        user_states[user_id]['symbol'] = symbol
-        user_states[user_id]['timeframe'] = timeframe
+        update_state(user_id, symbol=symbol, timeframe=timeframe)
         
         keyboard = [
             [
@@ -482,6 +967,9 @@ async def handle_timeframe(update: Update, context: ContextTypes.DEFAULT_TYPE):
             [
                 InlineKeyboardButton("📋 Full Analysis (All)", callback_data=f"chart_all_{symbol}_{timeframe}")
             ],
+            [
+                InlineKeyboardButton("🧩 All Types Grid", callback_data=f"grid_types_{symbol}_{timeframe}")
+            ],
             [
                 InlineKeyboardButton("🔙 Back", callback_data=f"back_{symbol}")
             ]
@@ -499,7 +987,6 @@ async def handle_timeframe(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Back button
     elif data.startswith('back_'):
         symbol = data.replace('back_', '')
-        info = get_stock_info(symbol)
         
         keyboard = [
             [
@@ -515,6 +1002,9 @@ async def handle_timeframe(update: Update, context: ContextTypes.DEFAULT_TYPE):
             [
                 InlineKeyboardButton("4H", callback_data=f"tf_4h_{symbol}"),
                 InlineKeyboardButton("📊 Daily", callback_data=f"tf_1d_{symbol}")
+            ],
+            [
+                InlineKeyboardButton("🧭 MTF Summary", callback_data=f"mtf_{symbol}")
             ]
         ]
         
@@ -547,56 +1037,428 @@ async def handle_chart_request(update: Update, context: ContextTypes.DEFAULT_TYP
     else:
         analysis_types = [analysis_type]
     
-    await generate_and_send_chart(query, context, symbol, timeframe, analysis_types)
+    job_class = 'quick' if len(analysis_types) == 1 else 'full'
+    await schedule_job(query, user_id, job_priority(user_id, job_class),
+                       partial(generate_and_send_chart, query, context, symbol, timeframe, analysis_types))
 
-async def generate_and_send_chart(query, context, symbol: str, timeframe: str, analysis_types: list):
-    """Generate and send chart with analysis"""
+async def handle_mtf_summary(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
     
-    await query.edit_message_text(f"⏳ Generating chart for {symbol}...\n\n"
-                                  "📈 Adding Moving Averages...\n"
-                                  "📊 Calculating Volume Profile...\n"
-                                  "🎯 Computing Targets & Stop Loss...")
+    user_id = update.effective_user.id
+    if not is_approved(user_id):
+        return
     
-    # Fetch data
-    df = get_stock_data(symbol, timeframe)
+    symbol = query.data.replace('mtf_', '')
+    await schedule_job(query, user_id, job_priority(user_id, 'full'), partial(send_mtf_summary, query, context, symbol))
+
+async def send_mtf_summary(query, context, symbol: str, token=None):
+    await query.edit_message_text(f"⏳ Multi-timeframe analysis for {symbol}...")
     
-    if df.empty or len(df) < 20:
-        await query.edit_message_text(
-            f"❌ Insufficient data for {symbol}\n\n"
-            "Try a longer timeframe."
+    try:
+        loop = asyncio.get_running_loop()
+        frames, summaries = await loop.run_in_executor(None, partial(mtf_analyzer.analyze, symbol, token=token))
+        
+        if not summaries:
+            await query.edit_message_text(f"❌ No data for {symbol}")
+            return
+        
+        text = mtf_analyzer.get_grid_text(symbol, summaries)
+        _, bias = mtf_analyzer.confluence(summaries)
+        chart_buffer = await loop.run_in_executor(
+            analysis_executor,
+            partial(run_stage, token, 'render_mtf', chart_drawer.generate_confluence_chart, frames, summaries, symbol, bias)
+        )
+        
+        await context.bot.send_photo(
+            chat_id=query.message.chat_id,
+            photo=chart_buffer,
+            caption=text[:1024],
+            parse_mode='Markdown'
+        )
+        
+        keyboard = [
+            [
+                InlineKeyboardButton("🔄 Refresh", callback_data=f"mtf_{symbol}"),
+                InlineKeyboardButton("🔙 Change TF", callback_data=f"back_{symbol}")
+            ],
+            [
+                InlineKeyboardButton("🏠 Home", callback_data="main_menu")
+            ]
+        ]
+        await context.bot.send_message(
+            chat_id=query.message.chat_id,
+            text="Select next action:",
+            reply_markup=InlineKeyboardMarkup(keyboard)
         )
+        
+        try:
+            await query.message.delete()
+        except:
+            pass
+        
+    except JobCancelled:
+        await query.edit_message_text(f"⏹ {symbol} cancelled - a newer request replaced it.")
+    except Exception as e:
+        logger.error(f"MTF error: {e}")
+        await query.edit_message_text(f"❌ Error: {str(e)}")
+
+GRID_TIMEFRAMES = ['15m', '1h', '4h', '1d']
+GRID_TYPES = ['elliott', 'classic', 'harmonic', 'ict', 'fibonacci', 'volume']
+
+async def handle_grid_request(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Several charts in one image: 2x2 timeframes or 2x3 analysis types"""
+    query = update.callback_query
+    await query.answer()
+    
+    user_id = update.effective_user.id
+    if not is_approved(user_id):
         return
     
-    tf_name = TIMEFRAMES[timeframe]['name']
-    info = get_stock_info(symbol)
+    await schedule_job(query, user_id, job_priority(user_id, 'full'), partial(send_grid_chart, query, context))
+
+async def send_grid_chart(query, context, token=None):
+    parts = query.data.split('_')
+    layout = parts[1]
+    symbol = parts[2]
+    
+    await query.edit_message_text(f"⏳ Generating chart grid for {symbol}...")
     
     try:
-        # Check if volume profile is selected as standalone
-        show_volume_profile = 'volume' in analysis_types or 'all' in analysis_types
+        loop = asyncio.get_running_loop()
         
-        # Generate chart with MA and optionally Volume Profile
-        chart_buffer = chart_drawer.generate_chart(
-            df, symbol, tf_name, analysis_types,
-            show_ma=True, show_volume_profile=show_volume_profile
-        )
-        
-        # Generate analysis text
-        analysis_text = generate_analysis_text(df, symbol, timeframe, analysis_types, info)
+        if layout == 'types':
+            timeframe = parts[3]
+            tf_name = TIMEFRAMES[timeframe]['name']
+            df = await loop.run_in_executor(None, fetch_stock_data, symbol, timeframe)
+            if df.empty or len(df) < 20:
+                await query.edit_message_text(f"❌ Insufficient data for {symbol}")
+                return
+            
+            engines = engines_for(symbol, timeframe)
+            # The same frame in every panel, so indicators are prepared once
+            panels = [(df, tf_name, [analysis_type]) for analysis_type in GRID_TYPES]
+            chart_buffer = await loop.run_in_executor(
+                analysis_executor,
+                partial(run_stage, token, 'render_grid', engines.chart_drawer.generate_grid_chart, panels, symbol, 3)
+            )
+            info = await loop.run_in_executor(None, fetch_stock_info, symbol)
+            caption = await loop.run_in_executor(
+                analysis_executor,
+                partial(run_stage, token, 'analyze_grid', generate_analysis_text, df, symbol, timeframe, ['all'], info, engines)
+            )
+        else:
+            # Two base downloads cover all four timeframes
+            frames = await loop.run_in_executor(None, mtf_analyzer.fetch, symbol)
+            timeframes = [tf for tf in GRID_TIMEFRAMES if tf in frames and len(frames[tf]) >= 20]
+            # Each panel drawn with its timeframe's profile, so its lines match the caption
+            panels = [(frames[tf], TIMEFRAMES[tf]['name'], ['all'], engines_for(symbol, tf).chart_drawer)
+                      for tf in timeframes]
+            if not panels:
+                await query.edit_message_text(f"❌ Insufficient data for {symbol}")
+                return
+            
+            chart_buffer = await loop.run_in_executor(
+                analysis_executor, partial(run_stage, token, 'render_grid', chart_drawer.generate_grid_chart, panels, symbol, 2)
+            )
+            caption = await loop.run_in_executor(
+                analysis_executor, partial(run_stage, token, 'analyze_grid', grid_targets_text, symbol, panels)
+            )
         
-        # Send photo
         await context.bot.send_photo(
             chat_id=query.message.chat_id,
             photo=chart_buffer,
-            caption=analysis_text[:1024],
+            caption=caption[:1024],
             parse_mode='Markdown'
         )
         
+        keyboard = [
+            [
+                InlineKeyboardButton("🔄 Refresh", callback_data=query.data),
+                InlineKeyboardButton("🔙 Change TF", callback_data=f"back_{symbol}")
+            ],
+            [
+                InlineKeyboardButton("🏠 Home", callback_data="main_menu")
+            ]
+        ]
+        await context.bot.send_message(
+            chat_id=query.message.chat_id,
+            text="Select next action:",
+            reply_markup=InlineKeyboardMarkup(keyboard)
+        )
+        
+        try:
+            await query.message.delete()
+        except:
+            pass
+        
+    except JobCancelled:
+        await query.edit_message_text(f"⏹ {symbol} cancelled - a newer request replaced it.")
+    except Exception as e:
+        logger.error(f"Grid chart error: {e}")
+        await query.edit_message_text(f"❌ Error: {str(e)}")
+
+def grid_targets_text(symbol: str, panels: list) -> str:
+    """Caption of the timeframe grid: direction, entry and stop per panel"""
+    caption = f"🧩 **{symbol}** - Multi-Timeframe Grid\n\n"
+    for df, tf_name, _, drawer in panels:
+        targets = drawer.get_targets_text(df)
+        direction = "🟢 LONG" if targets['is_bullish'] else "🔴 SHORT"
+        caption += f"**{tf_name}:** {direction} | Entry ${targets['entry']:.2f} | SL ${targets['stop_loss']:.2f}\n"
+    return caption
+
+async def handle_image_request(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Full-resolution photo or HD document of the user's last chart"""
+    query = update.callback_query
+    await query.answer()
+    
+    user_id = update.effective_user.id
+    if not is_approved(user_id):
+        return
+    
+    profile = query.data.replace('image_', '')
+    if profile not in OUTPUT_PROFILES or user_id not in last_charts:
+        await query.edit_message_text("❌ Chart expired. Please request it again.")
+        return
+    
+    # Re-rendering at another resolution is chart work like any other: queued, then on the analysis thread
+    await schedule_job(query, user_id, job_priority(user_id, 'quick'), partial(send_chart_image, query, context, profile))
+
+async def send_chart_image(query, context, profile: str, token=None):
+    user_id = query.from_user.id
+    last = last_charts.get(user_id)
+    if last is None:
+        await query.edit_message_text("❌ Chart expired. Please request it again.")
+        return
+    
+    symbol = last['symbol']
+    timeframe = last['timeframe']
+    
+    try:
+        image = last.get(profile)
+        if image is None:
+            drawer = engines_for(symbol, timeframe).chart_drawer
+            show_volume_profile = 'volume' in last['analysis_types'] or 'all' in last['analysis_types']
+            
+            def render():
+                fig = drawer.build_chart_figure(
+                    last['df'], symbol, TIMEFRAMES[timeframe]['name'], last['analysis_types'],
+                    show_ma=True, show_volume_profile=show_volume_profile
+                )
+                return drawer.export_figure(fig, (profile,), cancel=token.check if token is not None else None)[profile]
+            
+            loop = asyncio.get_running_loop()
+            image = last[profile] = await loop.run_in_executor(
+                analysis_executor, partial(run_stage, token, 'render_image', render, profile=profile)
+            )
+        image.seek(0)
+        
+        caption = f"{symbol} | {TIMEFRAMES[timeframe]['name']}"
+        if token is not None:
+            token.check('upload')
+        if OUTPUT_PROFILES[profile].get('document'):
+            await context.bot.send_document(chat_id=query.message.chat_id, document=image, caption=caption)
+        else:
+            await context.bot.send_photo(chat_id=query.message.chat_id, photo=image, caption=caption)
+    except JobCancelled:
+        pass
+    except Exception as e:
+        logger.error(f"Image error: {e}")
+        await context.bot.send_message(chat_id=query.message.chat_id, text=f"❌ Error: {str(e)}")
+
+def profile_chart_pipeline(symbol: str, timeframe: str, analysis_types: list, top: int = 20):
+    """
+    Run the chart pipeline (fetch, analysis text, render + encode) under cProfile
+    Returns (top functions by cumulative time as text, .pstats file bytes) or None without data
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        df = get_stock_data(symbol, timeframe)
+        if df.empty or len(df) < 20:
+            return None
+        info = get_stock_info(symbol)
+        
+        engines = engines_for(symbol, timeframe)
+        generate_analysis_text(df, symbol, timeframe, analysis_types, info, engines)
+        
+        show_volume_profile = 'volume' in analysis_types or 'all' in analysis_types
+        fig = engines.chart_drawer.build_chart_figure(df, symbol, TIMEFRAMES[timeframe]['name'], analysis_types,
+                                                      show_ma=True, show_volume_profile=show_volume_profile)
+        engines.chart_drawer.export_figure(fig, ('preview',))
+    finally:
+        profiler.disable()
+    
+    stats = pstats.Stats(profiler).sort_stats('cumulative')
+    text = f"{'cum s':>7} {'own s':>7} {'calls':>7}  function\n"
+    for func in stats.fcn_list[:top]:
+        calls, _, own, cumulative, _ = stats.stats[func]
+        filename, line, name = func
+        location = f"{os.path.basename(filename)}:{line}" if line else filename
+        text += f"{cumulative:>7.3f} {own:>7.3f} {calls:>7}  {name} ({location})\n"
+    
+    with tempfile.NamedTemporaryFile(suffix='.pstats', delete=False) as f:
+        path = f.name
+    try:
+        stats.dump_stats(path)
+        with open(path, 'rb') as f:
+            data = f.read()
+    finally:
+        os.remove(path)
+    
+    return text, data
+
+def job_priority(user_id: int, job_class: str) -> str:
+    """
+    admin > quick (the Quick Analysis button, single-engine charts)
+    > full (Full Analysis on a chosen timeframe, grids, MTF)
+    """
+    return 'admin' if is_admin(user_id) else job_class
+
+async def schedule_job(query, user_id: int, priority: str, factory):
+    """Queue a chart job for the user and tell them if they have to wait"""
+    async def replaced():
+        await query.edit_message_text("⏹ Replaced by your newer request.")
+    
+    job = await job_scheduler.submit(user_id, priority, factory, on_drop=replaced)
+    
+    if job.status == 'rejected':
+        await query.edit_message_text(
+            f"🚦 The bot is busy ({job.position} requests waiting).\n"
+            "Please try again in a moment."
+        )
+    elif job.position > 0:
+        await query.edit_message_text(f"⏳ Queued - {job.position} request(s) ahead of you...")
+    return job
+
+def run_stage(token, stage: str, func, *args, **tags):
+    """One pipeline stage in a worker thread, skipped if the job was superseded while it waited"""
+    if token is not None:
+        token.check(stage)
+    return metrics.timed(stage, func, *args, **tags)
+
+async def generate_and_send_chart(query, context, symbol: str, timeframe: str, analysis_types: list, token=None):
+    """
+    Progressive delivery: quote header and targets as soon as the bars arrive,
+    each engine line edited in as it completes, then the chart
+    A superseded job stops at the next stage that checks `token`
+    """
+    
+    started = time.perf_counter()
+    tags = {'timeframe': timeframe, 'analysis': analysis_types[0] if len(analysis_types) == 1 else 'all'}
+    metrics.increment('chart_requests')
+    
+    await query.edit_message_text(f"⏳ Fetching {symbol}...")
+    
+    loop = asyncio.get_running_loop()
+    try:
+        # Network calls run side by side on the default executor
+        df, info = await asyncio.gather(
+            loop.run_in_executor(None, partial(run_stage, token, 'fetch_data', fetch_stock_data, symbol, timeframe, **tags)),
+            loop.run_in_executor(None, partial(run_stage, token, 'fetch_info', fetch_stock_info, symbol, **tags))
+        )
+        
+        if df.empty or len(df) < 20:
+            await query.edit_message_text(
+                f"❌ Insufficient data for {symbol}\n\n"
+                "Try a longer timeframe."
+            )
+            return
+        
+        tf_name = TIMEFRAMES[timeframe]['name']
+        
+        engines = engines_for(symbol, timeframe)
+        # One array view of the bars for every engine and the chart
+        bars = as_bars(df)
+        header = analysis_header_text(df, symbol, timeframe, info)
+        targets = await loop.run_in_executor(
+            analysis_executor, partial(run_stage, token, 'targets', engines.chart_drawer.get_targets_text, bars, **tags)
+        )
+        footer = analysis_targets_text(targets)
+        selected = selected_engines(analysis_types)
+        data_key = f"{symbol}:{timeframe}:{frame_key(df)}"
+        lines = {engine: f"⏳ {ENGINE_LABELS[engine]}...\n" for engine in selected}
+        
+        def progress_text() -> str:
+            return header + ''.join(lines.values()) + footer
+        
+        await query.edit_message_text(progress_text(), parse_mode='Markdown')
+        metrics.observe('first_response', time.perf_counter() - started, **tags)
+        
+        # CPU stages go one at a time through the analysis thread, so a cancelled
+        # job stops submitting work at the next stage
+        for engine in selected:
+            lines[engine] = await loop.run_in_executor(
+                analysis_executor,
+                partial(run_stage, token, f'analyze_{engine}', cached_analysis_line, bars, engine, data_key, engines, **tags)
+            )
+            await query.edit_message_text(progress_text(), parse_mode='Markdown')
+        
+        # Check if volume profile is selected as standalone
+        show_volume_profile = 'volume' in analysis_types or 'all' in analysis_types
+        
+        # Preview profiles send a small image first; the full one is encoded from the same render
+        user_id = query.from_user.id
+        # Only the requested profile: full resolution is rendered when its button is pressed
+        profile = session(user_id).get('image_profile', 'preview')
+        
+        def render():
+            # Another worker may already have rendered this chart from the same bars
+            key = f"{data_key}:{'_'.join(analysis_types)}:{profile}"
+            cached = shared_store.get('charts', key) if shared_store is not None else None
+            if cached is not None:
+                return {name: io.BytesIO(data) for name, data in cached.items()}
+            
+            # Generate chart with MA and optionally Volume Profile
+            fig = engines.chart_drawer.build_chart_figure(
+                bars, symbol, tf_name, analysis_types,
+                show_ma=True, show_volume_profile=show_volume_profile
+            )
+            images = engines.chart_drawer.export_figure(fig, (profile,), cancel=token.check if token is not None else None)
+            if shared_store is not None:
+                shared_store.set('charts', key, {name: buf.getvalue() for name, buf in images.items()},
+                                 ttl=RESULT_CACHE_TTL)
+            return images
+        
+        images = await loop.run_in_executor(analysis_executor, partial(run_stage, token, 'render', render, **tags))
+        
+        caption = f"📊 {symbol} | {tf_name}"
+        if token is not None:
+            token.check('upload')
+        with metrics.timer('send_photo', **tags):
+            if OUTPUT_PROFILES[profile].get('document'):
+                await context.bot.send_document(
+                    chat_id=query.message.chat_id,
+                    document=images[profile],
+                    caption=caption,
+                    reply_to_message_id=query.message.message_id
+                )
+            else:
+                await context.bot.send_photo(
+                    chat_id=query.message.chat_id,
+                    photo=images[profile],
+                    caption=caption,
+                    reply_to_message_id=query.message.message_id
+                )
+        metrics.observe('total', time.perf_counter() - started, **tags)
+        metrics.request_completed()
+        
+        # Kept for the full-resolution / HD buttons (last chart per user only)
+        remember_chart(user_id, {
+            'symbol': symbol, 'timeframe': timeframe, 'analysis_types': analysis_types,
+            'df': df, profile: images[profile]
+        })
+        
         # Follow-up buttons
         keyboard = [
             [
                 InlineKeyboardButton("🔄 Refresh", callback_data=f"chart_{'_'.join(analysis_types)}_{symbol}_{timeframe}"),
                 InlineKeyboardButton("📋 Full", callback_data=f"chart_all_{symbol}_{timeframe}")
             ],
+            [
+                InlineKeyboardButton("🖼 Full Resolution", callback_data="image_standard"),
+                InlineKeyboardButton("📄 HD Document", callback_data="image_hires")
+            ],
             [
                 InlineKeyboardButton("🔙 Change TF", callback_data=f"back_{symbol}"),
                 InlineKeyboardButton("🏠 Home", callback_data="main_menu")
@@ -609,19 +1471,36 @@ async def generate_and_send_chart(query, context, symbol: str, timeframe: str, a
             reply_markup=InlineKeyboardMarkup(keyboard)
         )
         
-        # Delete waiting message
+    except (asyncio.CancelledError, JobCancelled) as e:
+        metrics.increment('chart_cancelled')
         try:
-            await query.message.delete()
-        except:
+            await query.edit_message_text(f"⏹ {symbol} cancelled - a newer request replaced it.")
+        except Exception:
             pass
-        
+        if isinstance(e, asyncio.CancelledError):
+            raise
     except Exception as e:
+        metrics.increment('chart_errors')
         logger.error(f"Chart error: {e}")
         await query.edit_message_text(f"❌ Error: {str(e)}")
 
-def generate_analysis_text(df, symbol: str, timeframe: str, analysis_types: list, info: dict) -> str:
-    """Generate analysis text summary"""
-    
+ENGINE_LABELS = {
+    'elliott': 'Elliott',
+    'classic': 'Classic',
+    'harmonic': 'Harmonic',
+    'ict': 'ICT',
+    'fibonacci': 'Fibonacci',
+    'volume': 'Volume Profile',
+}
+
+def selected_engines(analysis_types: list) -> list:
+    """Engines with a text line, in display order (Fibonacci only when picked on its own)"""
+    full = 'all' in analysis_types
+    return [engine for engine in ENGINE_LABELS
+            if engine in analysis_types or (full and engine != 'fibonacci')]
+
+def analysis_header_text(df, symbol: str, timeframe: str, info: dict) -> str:
+    """Quote line and moving averages"""
     tf_name = TIMEFRAMES[timeframe]['name']
     change_emoji = "📈" if info['change'] >= 0 else "📉"
     
@@ -629,10 +1508,6 @@ def generate_analysis_text(df, symbol: str, timeframe: str, analysis_types: list
     text += f"⏰ {tf_name} | 💰 ${info['price']:.2f} {change_emoji} {info['change']:+.2f}%\n"
     text += "─" * 25 + "\n\n"
     
-    # Get targets from chart drawer
-    targets = chart_drawer.get_targets_text(df)
-    direction = "🟢 LONG" if targets['is_bullish'] else "🔴 SHORT"
-    
     # Calculate MAs for text
     close = df['Close'].values
     ma10 = f"${close[-10:].mean():.2f}" if len(close) >= 10 else "N/A"
@@ -643,44 +1518,59 @@ def generate_analysis_text(df, symbol: str, timeframe: str, analysis_types: list
     text += f"**Moving Averages:**\n"
     text += f"MA10: {ma10} | MA20: {ma20}\n"
     text += f"MA50: {ma50} | MA200: {ma200}\n\n"
-    
+    return text
+
+def analysis_line(df, engine: str, engines: Engines = default_engines) -> str:
+    """One engine's summary line (`df` may also be Bars)"""
     try:
-        if 'elliott' in analysis_types or 'all' in analysis_types:
-            elliott = elliott_analyzer.analyze(df)
-            text += f"🌊 **Elliott:** Wave {elliott.current_wave} ({elliott.trend})\n"
+        bars = as_bars(df)
+        if engine == 'elliott':
+            elliott = engines.elliott.analyze(bars)
+            return f"🌊 **Elliott:** Wave {elliott.current_wave} ({elliott.trend})\n"
         
-        if 'classic' in analysis_types or 'all' in analysis_types:
-            classic = classic_analyzer.analyze(df)
-            text += f"📊 **Classic:** {classic.current_trend} - {classic.signal.value}\n"
+        if engine == 'classic':
+            classic = engines.classic.analyze(bars)
+            return f"📊 **Classic:** {classic.current_trend} - {classic.signal.value}\n"
         
-        if 'harmonic' in analysis_types or 'all' in analysis_types:
-            harmonic = harmonic_analyzer.analyze(df)
+        if engine == 'harmonic':
+            harmonic = engines.harmonic.analyze(bars)
             if harmonic.patterns:
-                p = harmonic.patterns[0]
-                text += f"🔷 **Harmonic:** {p.pattern_type.value}\n"
-            else:
-                text += "🔷 **Harmonic:** No pattern\n"
+                return f"🔷 **Harmonic:** {harmonic.patterns[0].pattern_type.value}\n"
+            return "🔷 **Harmonic:** No pattern\n"
         
-        if 'ict' in analysis_types or 'all' in analysis_types:
-            ict = ict_analyzer.analyze(df)
-            text += f"🎯 **ICT:** {ict.market_structure.value}\n"
+        if engine == 'ict':
+            ict = engines.ict.analyze(bars)
+            return f"🎯 **ICT:** {ict.market_structure.value}\n"
         
-        if 'fibonacci' in analysis_types:
-            fib = fibonacci_analyzer.analyze(df)
-            text += f"📐 **Fibonacci:** {fib.current_zone}\n"
+        if engine == 'fibonacci':
+            fib = engines.fibonacci.analyze(bars)
+            return f"📐 **Fibonacci:** {fib.current_zone}\n"
         
-        if 'volume' in analysis_types or 'all' in analysis_types:
+        if engine == 'volume':
             # Calculate Volume Profile info
-            poc_price = df['Close'].iloc[-20:].mean()  # Approximate POC
-            high_vol_zone = df.loc[df['Volume'].idxmax(), 'Close'] if 'Volume' in df.columns else poc_price
-            text += f"📊 **Volume Profile:** POC ~${poc_price:.2f}\n"
-        
+            poc_price = np.nanmean(bars.close[-20:])  # Approximate POC
+            return f"📊 **Volume Profile:** POC ~${poc_price:.2f}\n"
     except Exception as e:
-        logger.error(f"Analysis text error: {e}")
-        text += "\n⚠️ Some analysis unavailable"
+        logger.error(f"Analysis text error ({engine}): {e}")
+    return f"⚠️ {ENGINE_LABELS[engine]} unavailable\n"
+
+def cached_analysis_line(df, engine: str, data_key: str, engines: Engines = default_engines) -> str:
+    """analysis_line through the shared cache; `data_key` names the symbol, timeframe and bars"""
+    if shared_store is None:
+        return analysis_line(df, engine, engines)
+    key = f"{engine}:{data_key}"
+    line = shared_store.get('analysis', key)
+    if line is None:
+        line = analysis_line(df, engine, engines)
+        if not line.startswith('⚠️'):
+            shared_store.set('analysis', key, line, ttl=RESULT_CACHE_TTL)
+    return line
+
+def analysis_targets_text(targets: dict) -> str:
+    """Direction, entry, targets and stop loss"""
+    direction = "🟢 LONG" if targets['is_bullish'] else "🔴 SHORT"
     
-    # Add targets and stop loss
-    text += "\n" + "─" * 25 + "\n"
+    text = "\n" + "─" * 25 + "\n"
     text += f"**Direction:** {direction}\n"
     text += f"**Entry:** ${targets['entry']:.2f}\n"
     text += f"**TP1:** ${targets['target_1']:.2f}\n"
@@ -689,7 +1579,16 @@ def generate_analysis_text(df, symbol: str, timeframe: str, analysis_types: list
     text += f"**Stop Loss:** ${targets['stop_loss']:.2f}\n"
     
     text += f"\n📅 {datetime.now().strftime('%Y-%m-%d %H:%M')}"
-    
+    return text
+
+def generate_analysis_text(df, symbol: str, timeframe: str, analysis_types: list, info: dict,
+                           engines: Optional[Engines] = None) -> str:
+    """Generate analysis text summary (with the symbol's profile unless `engines` is given)"""
+    engines = engines or engines_for(symbol, timeframe)
+    bars = as_bars(df)
+    text = analysis_header_text(df, symbol, timeframe, info)
+    text += ''.join(analysis_line(bars, engine, engines) for engine in selected_engines(analysis_types))
+    text += analysis_targets_text(engines.chart_drawer.get_targets_text(bars))
     return text
 
 async def handle_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -703,15 +1602,70 @@ async def handle_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # MAIN FUNCTION
 # ============================================
 
-def main():
-    TOKEN = os.environ.get('BOT_TOKEN')
-    
-    if not TOKEN:
-        logger.error("❌ BOT_TOKEN not found!")
-        print("❌ Error: BOT_TOKEN not found")
+# BOT_MODE=webhook: Telegram pushes updates to this HTTPS endpoint instead of long polling
+WEBHOOK_CONFIG = {
+    'listen': os.environ.get('WEBHOOK_LISTEN', '0.0.0.0'),
+    'port': int(os.environ.get('WEBHOOK_PORT', '8443')),
+    'url_path': os.environ.get('WEBHOOK_PATH', 'telegram'),
+    'webhook_url': os.environ.get('WEBHOOK_URL'),  # public URL including the path
+    'secret_token': os.environ.get('WEBHOOK_SECRET'),
+}
+
+# Updates handled at once; handlers only queue chart work, so this is mostly waiting on I/O
+UPDATE_CONCURRENCY = int(os.environ.get('BOT_CONCURRENCY', '32'))
+
+# Seconds queued and running chart jobs get to finish on shutdown
+SHUTDOWN_GRACE = float(os.environ.get('SHUTDOWN_GRACE', '20'))
+
+async def on_startup(application: Application):
+    scanner = application.bot_data.get('scanner')
+    if scanner is None:
         return
     
-    app = Application.builder().token(TOKEN).build()
+    async def send_alert(chat_id: int, text: str):
+        await application.bot.send_message(chat_id=chat_id, text=text, parse_mode='Markdown')
+    
+    # Not application.create_task: stop() waits for those, and the scanner never returns
+    application.bot_data['scanner_task'] = asyncio.get_running_loop().create_task(scanner.run(send_alert))
+
+async def on_stop(application: Application):
+    """No new updates arrive any more: let chart jobs finish, then cancel what is left"""
+    task = application.bot_data.pop('scanner_task', None)
+    if task is not None:
+        task.cancel()
+    
+    if not await job_scheduler.drain(SHUTDOWN_GRACE):
+        logger.warning(f"Cancelling {job_scheduler.depth + job_scheduler.running} chart jobs still pending")
+    await job_scheduler.shutdown()
+
+async def on_shutdown(application: Application):
+    mtf_analyzer.shutdown()
+    analysis_executor.shutdown(wait=True, cancel_futures=True)
+    state_writer.shutdown(wait=True)
+
+def build_scanner() -> WatchlistScanner:
+    return WatchlistScanner(
+        watchlists, get_stocks_data,
+        timeframe_names={tf: config['name'] for tf, config in TIMEFRAMES.items()},
+        rule_engine=alert_rules
+    )
+
+def build_application(token: str, concurrency: int = UPDATE_CONCURRENCY, scanner=None,
+                      request=None, get_updates_request=None, updater: bool = True) -> Application:
+    """
+    Application with every handler registered; `request` replaces the HTTP layer (offline tests)
+    updater=False for shard workers, which get their updates from the router process
+    """
+    builder = (Application.builder().token(token).concurrent_updates(concurrency)
+               .post_init(on_startup).post_stop(on_stop).post_shutdown(on_shutdown))
+    if not updater:
+        builder = builder.updater(None)
+    if request is not None:
+        builder = builder.request(request)
+    if get_updates_request is not None:
+        builder = builder.get_updates_request(get_updates_request)
+    app = builder.build()
+    app.bot_data['scanner'] = scanner
     
     # Commands
     app.add_handler(CommandHandler("start", start_command))
@@ -720,15 +1674,45 @@ def main():
     app.add_handler(CommandHandler("users", users_command))
     app.add_handler(CommandHandler("pending", pending_command))
     app.add_handler(CommandHandler("remove", remove_command))
+    app.add_handler(CommandHandler("stats", stats_command))
+    app.add_handler(CommandHandler("profile", profile_command))
+    app.add_handler(CommandHandler("watch", watch_command))
+    app.add_handler(CommandHandler("unwatch", unwatch_command))
+    app.add_handler(CommandHandler("watchlist", watchlist_command))
+    app.add_handler(CommandHandler("alert", alert_command))
+    app.add_handler(CommandHandler("alerts", alerts_command))
+    app.add_handler(CommandHandler("delalert", delalert_command))
+    app.add_handler(CommandHandler("scan", scan_command))
+    app.add_handler(CommandHandler("quality", quality_command))
     
     # Button handlers
     app.add_handler(CallbackQueryHandler(handle_approval, pattern=r'^(approve|reject)_'))
     app.add_handler(CallbackQueryHandler(handle_chart_request, pattern=r'^chart_'))
+    app.add_handler(CallbackQueryHandler(handle_mtf_summary, pattern=r'^mtf_'))
+    app.add_handler(CallbackQueryHandler(handle_grid_request, pattern=r'^grid_'))
+    app.add_handler(CallbackQueryHandler(handle_image_request, pattern=r'^image_'))
     app.add_handler(CallbackQueryHandler(handle_main_menu, pattern=r'^main_menu$'))
     app.add_handler(CallbackQueryHandler(handle_timeframe))
     
     # Text messages
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_symbol))
+    return app
+
+def main():
+    TOKEN = os.environ.get('BOT_TOKEN')
+    
+    if not TOKEN:
+        logger.error("❌ BOT_TOKEN not found!")
+        print("❌ Error: BOT_TOKEN not found")
+        return
+    
+    mode = os.environ.get('BOT_MODE', 'polling').lower()
+    if mode == 'webhook' and not WEBHOOK_CONFIG['webhook_url']:
+        logger.error("❌ WEBHOOK_URL not set!")
+        print("❌ Error: BOT_MODE=webhook needs WEBHOOK_URL")
+        return
+    
+    shards = int(os.environ.get('BOT_SHARDS', '1'))
     
     logger.info("🚀 Starting bot V3...")
     print("=" * 50)
@@ -738,9 +1722,21 @@ def main():
     print(f"👑 Admin: {ADMIN_ID}")
     print("=" * 50)
     print("Timeframes: 5m, 7m, 10m, 15m, 30m, 1H, 4H, Daily")
+    print(f"Mode: {mode} | {shards} worker(s) x {UPDATE_CONCURRENCY} concurrent updates")
     print("=" * 50)
     
-    app.run_polling(drop_pending_updates=True)
+    if shards > 1:
+        from sharding import run_sharded
+        run_sharded(TOKEN, shards, mode, WEBHOOK_CONFIG, seed_users=approved_users)
+        return
+    
+    app = build_application(TOKEN, scanner=build_scanner())
+    
+    # Both modes stop on SIGINT / SIGTERM and run on_stop / on_shutdown
+    if mode == 'webhook':
+        app.run_webhook(drop_pending_updates=True, **WEBHOOK_CONFIG)
+    else:
+        app.run_polling(drop_pending_updates=True)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,104 @@
+"""
+Cancellation Tokens
+Cooperative cancellation for chart jobs: the scheduler cancels a superseded
+job's token and every stage (fetch, each analyzer, render, upload) checks it
+before doing work - in worker threads, and inside process-pool workers
+through a small array of flags in shared memory
+"""
+
+import threading
+import multiprocessing
+from typing import Optional
+
+# Live tokens that process-pool workers can see (one per running job is plenty)
+SLOTS = 256
+
+
+class JobCancelled(Exception):
+    """Raised at a stage boundary once the job's token is cancelled"""
+
+
+class CancelFlags:
+    """Shared byte per token slot: 1 = cancelled"""
+    
+    def __init__(self, slots: int = SLOTS):
+        self.array = multiprocessing.RawArray('b', slots)
+        self._free = list(range(slots - 1, -1, -1))
+        self._lock = threading.Lock()
+    
+    def acquire(self) -> Optional[int]:
+        with self._lock:
+            if not self._free:
+                return None  # tokens still work in this process, workers just cannot see them
+            slot = self._free.pop()
+        self.array[slot] = 0
+        return slot
+    
+    def release(self, slot: int):
+        self.array[slot] = 0
+        with self._lock:
+            self._free.append(slot)
+
+
+flags = CancelFlags()
+
+# The parent's flag array inside pool workers (spawned workers would otherwise get their own)
+_worker_flags = None
+
+
+def install_worker_flags(array):
+    """ProcessPoolExecutor initializer"""
+    global _worker_flags
+    _worker_flags = array
+
+
+def pool_options() -> dict:
+    """Keyword arguments for a ProcessPoolExecutor whose workers check tokens"""
+    return {'initializer': install_worker_flags, 'initargs': (flags.array,)}
+
+
+class WorkerToken:
+    """Picklable view of a token for process-pool workers"""
+    
+    def __init__(self, slot: Optional[int]):
+        self.slot = slot
+    
+    @property
+    def cancelled(self) -> bool:
+        if self.slot is None:
+            return False
+        array = _worker_flags if _worker_flags is not None else flags.array
+        return bool(array[self.slot])
+    
+    def check(self, stage: str = ''):
+        if self.cancelled:
+            raise JobCancelled(stage)
+
+
+class CancelToken:
+    """Per-job token; release() it once the job is over"""
+    
+    def __init__(self):
+        self._event = threading.Event()
+        self.slot = flags.acquire()
+    
+    def cancel(self):
+        self._event.set()
+        if self.slot is not None:
+            flags.array[self.slot] = 1
+    
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+    
+    def check(self, stage: str = ''):
+        if self._event.is_set():
+            raise JobCancelled(stage)
+    
+    def for_worker(self) -> WorkerToken:
+        return WorkerToken(self.slot)
+    
+    def release(self):
+        if self.slot is not None:
+            flags.release(self.slot)
+            self.slot = None
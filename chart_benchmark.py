@@ -0,0 +1,59 @@
+"""
+Chart Output Benchmark
+Render and encode time plus byte size for every output profile
+"""
+
+import sys
+import time
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from chart_drawer import ChartDrawer, OUTPUT_PROFILES
+from benchmarks import synthetic_ohlcv
+
+
+def benchmark_profiles(df: pd.DataFrame, analysis_types: list = None, repeats: int = 3) -> list:
+    """[{profile, build_ms, render_ms, encode_ms, bytes, size}] - best of `repeats`"""
+    drawer = ChartDrawer()
+    analysis_types = analysis_types or ['all']
+    rows = []
+    for profile, config in OUTPUT_PROFILES.items():
+        best = None
+        for _ in range(repeats):
+            start = time.perf_counter()
+            fig = drawer.build_chart_figure(df, 'BENCH', 'Daily', analysis_types)
+            built = time.perf_counter()
+            image = drawer.render_figure(fig, config['dpi'])
+            rendered = time.perf_counter()
+            buf = drawer.encode_image(image, profile)
+            encoded = time.perf_counter()
+            plt.close(fig)
+            
+            row = {
+                'profile': profile,
+                'build_ms': (built - start) * 1000,
+                'render_ms': (rendered - built) * 1000,
+                'encode_ms': (encoded - rendered) * 1000,
+                'bytes': len(buf.getvalue()),
+                'size': f"{round(image.width * config.get('scale', 1.0))}x{round(image.height * config.get('scale', 1.0))}",
+            }
+            if best is None or row['render_ms'] + row['encode_ms'] < best['render_ms'] + best['encode_ms']:
+                best = row
+        rows.append(best)
+    return rows
+
+
+def main():
+    """python chart_benchmark.py [bars] [repeats]"""
+    bars = int(sys.argv[1]) if len(sys.argv) > 1 else 130
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    
+    rows = benchmark_profiles(synthetic_ohlcv(bars), repeats=repeats)
+    print(f"{'Profile':<10} {'Size':>10} {'Build ms':>9} {'Render ms':>10} {'Encode ms':>10} {'KB':>8}")
+    for row in rows:
+        print(f"{row['profile']:<10} {row['size']:>10} {row['build_ms']:>9.0f} {row['render_ms']:>10.0f} "
+              f"{row['encode_ms']:>10.0f} {row['bytes'] / 1024:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
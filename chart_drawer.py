@@ -10,8 +10,23 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
 from matplotlib.patches import Rectangle
+from matplotlib.collections import PolyCollection
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from PIL import Image
 from datetime import datetime
 
+from bars import BarsLike, as_bars
+
+# Output profiles: images that share a dpi are encoded from one render
+OUTPUT_PROFILES = {
+    'preview': {'dpi': 68, 'scale': 1.0, 'format': 'PNG', 'colors': 64},  # rendered small, not downscaled
+    'compact': {'dpi': 150, 'scale': 0.7, 'format': 'PNG', 'colors': 128},
+    'standard': {'dpi': 150, 'scale': 1.0, 'format': 'PNG'},
+    'hires': {'dpi': 250, 'scale': 1.0, 'format': 'PNG', 'document': True},
+}
+
+FORMAT_EXTENSIONS = {'PNG': 'png', 'JPEG': 'jpg', 'WEBP': 'webp'}
+
 class ChartDrawer:
     """Advanced chart drawer with technical analysis visualization"""
     
@@ -41,12 +56,17 @@ class ChartDrawer:
             'fvg': 'rgba(255, 165, 2, 0.3)',
         }
         
+        # ATR multipliers for stop loss and targets (overridable by parameter profiles)
+        self.atr_stop_multiplier = 1.5
+        self.atr_target_multipliers = (1.5, 2.5, 4.0)
+        
         plt.style.use('dark_background')
     
-    def calculate_moving_averages(self, df: pd.DataFrame) -> dict:
+    def calculate_moving_averages(self, df: BarsLike) -> dict:
         """Calculate moving averages"""
+        bars = as_bars(df)
         mas = {}
-        close = df['Close'].values
+        close = bars.close
         
         for period in [10, 20, 50, 200]:
             if len(close) >= period:
@@ -57,13 +77,14 @@ class ChartDrawer:
         
         return mas
     
-    def calculate_volume_profile(self, df: pd.DataFrame, bins: int = 20) -> dict:
+    def calculate_volume_profile(self, df: BarsLike, bins: int = 20) -> dict:
         """Calculate Volume Profile"""
-        if len(df) < 10:
+        bars = as_bars(df)
+        if len(bars) < 10:
             return None
         
-        price_min = df['Low'].min()
-        price_max = df['High'].max()
+        price_min = np.nanmin(bars.low)
+        price_max = np.nanmax(bars.high)
         price_range = price_max - price_min
         
         if price_range == 0:
@@ -78,8 +99,8 @@ class ChartDrawer:
             bin_mid = (bin_low + bin_high) / 2
             
             # Calculate volume in this price range
-            mask = ((df['Low'] <= bin_high) & (df['High'] >= bin_low))
-            volume = df.loc[mask, 'Volume'].sum()
+            mask = ((bars.low <= bin_high) & (bars.high >= bin_low))
+            volume = np.nansum(bars.volume[mask])
             
             volume_profile.append({
                 'price_low': bin_low,
@@ -115,17 +136,18 @@ class ChartDrawer:
             'max_volume': max_vol
         }
     
-    def get_targets_text(self, df: pd.DataFrame) -> dict:
+    def get_targets_text(self, df: BarsLike) -> dict:
         """Calculate entry, targets and stop loss"""
-        if len(df) < 20:
+        bars = as_bars(df)
+        if len(bars) < 20:
             return {
                 'entry': 0, 'target_1': 0, 'target_2': 0, 'target_3': 0,
                 'stop_loss': 0, 'is_bullish': True
             }
         
-        close = df['Close'].values
-        high = df['High'].values
-        low = df['Low'].values
+        close = bars.close
+        high = bars.high
+        low = bars.low
         
         current_price = close[-1]
         
@@ -142,16 +164,16 @@ class ChartDrawer:
         
         if is_bullish:
             entry = current_price
-            stop_loss = current_price - (atr * 1.5)
-            target_1 = current_price + (atr * 1.5)
-            target_2 = current_price + (atr * 2.5)
-            target_3 = current_price + (atr * 4.0)
+            stop_loss = current_price - (atr * self.atr_stop_multiplier)
+            target_1 = current_price + (atr * self.atr_target_multipliers[0])
+            target_2 = current_price + (atr * self.atr_target_multipliers[1])
+            target_3 = current_price + (atr * self.atr_target_multipliers[2])
         else:
             entry = current_price
-            stop_loss = current_price + (atr * 1.5)
-            target_1 = current_price - (atr * 1.5)
-            target_2 = current_price - (atr * 2.5)
-            target_3 = current_price - (atr * 4.0)
+            stop_loss = current_price + (atr * self.atr_stop_multiplier)
+            target_1 = current_price - (atr * self.atr_target_multipliers[0])
+            target_2 = current_price - (atr * self.atr_target_multipliers[1])
+            target_3 = current_price - (atr * self.atr_target_multipliers[2])
         
         return {
             'entry': entry,
@@ -163,10 +185,11 @@ class ChartDrawer:
             'atr': atr
         }
     
-    def find_peaks_valleys(self, df: pd.DataFrame, order: int = 5) -> tuple:
+    def find_peaks_valleys(self, df: BarsLike, order: int = 5) -> tuple:
         """Find peaks and valleys for Elliott Waves"""
-        high = df['High'].values
-        low = df['Low'].values
+        bars = as_bars(df)
+        high = bars.high
+        low = bars.low
         
         peaks = []
         valleys = []
@@ -182,33 +205,40 @@ class ChartDrawer:
         
         return peaks, valleys
     
-    def draw_candlesticks(self, ax, df: pd.DataFrame):
+    def draw_candlesticks(self, ax, df: BarsLike):
         """Draw candlestick chart"""
-        for i in range(len(df)):
-            open_price = df['Open'].iloc[i]
-            close_price = df['Close'].iloc[i]
-            high_price = df['High'].iloc[i]
-            low_price = df['Low'].iloc[i]
-            
-            color = self.colors['bullish'] if close_price >= open_price else self.colors['bearish']
-            
-            # Wick
-            ax.plot([i, i], [low_price, high_price], color=color, linewidth=0.8)
-            
-            # Body
-            body_bottom = min(open_price, close_price)
-            body_height = abs(close_price - open_price)
-            
-            if body_height == 0:
-                body_height = 0.001
-            
-            rect = Rectangle((i - 0.3, body_bottom), 0.6, body_height,
-                            facecolor=color, edgecolor=color, alpha=0.9)
-            ax.add_patch(rect)
+        bars = as_bars(df)
+        open_price = bars.open
+        close_price = bars.close
+        x = np.arange(len(bars))
+        
+        colors = np.where(close_price >= open_price, self.colors['bullish'], self.colors['bearish'])
+        
+        # Wicks
+        ax.vlines(x, bars.low, bars.high, colors=colors, linewidth=0.8)
+        
+        # Bodies
+        body_bottom = np.minimum(open_price, close_price)
+        body_height = np.abs(close_price - open_price)
+        body_height[body_height == 0] = 0.001
+        
+        self.draw_bars(ax, x, body_bottom, body_height, 0.6, colors, alpha=0.9)
+    
+    def draw_bars(self, ax, x: np.ndarray, bottom: np.ndarray, height: np.ndarray,
+                  width: float, colors, alpha: float):
+        """Vertical bars as a single collection (one artist instead of one patch per bar)"""
+        left = x - width / 2
+        right = x + width / 2
+        top = bottom + height
+        verts = np.stack([np.column_stack([left, bottom]), np.column_stack([left, top]),
+                          np.column_stack([right, top]), np.column_stack([right, bottom])], axis=1)
+        ax.add_collection(PolyCollection(verts, facecolors=colors, edgecolors=colors, alpha=alpha))
+        ax.autoscale_view()
     
-    def draw_moving_averages(self, ax, df: pd.DataFrame, mas: dict):
+    def draw_moving_averages(self, ax, df: BarsLike, mas: dict):
         """Draw moving averages on chart"""
-        x = range(len(df))
+        bars = as_bars(df)
+        x = range(len(bars))
         
         ma_colors = {
             'MA10': self.colors['ma10'],
@@ -222,8 +252,9 @@ class ChartDrawer:
                 ax.plot(x, ma_values, color=ma_colors[ma_name], 
                        linewidth=1.2, label=ma_name, alpha=0.8)
     
-    def draw_volume_profile(self, ax, df: pd.DataFrame, vp_data: dict):
+    def draw_volume_profile(self, ax, df: BarsLike, vp_data: dict):
         """Draw Volume Profile on the right side of chart"""
+        bars = as_bars(df)
         if vp_data is None:
             return
         
@@ -233,7 +264,7 @@ class ChartDrawer:
         if max_vol == 0:
             return
         
-        chart_width = len(df)
+        chart_width = len(bars)
         vp_width = chart_width * 0.15  # Volume profile takes 15% of chart width
         
         for vp in profile:
@@ -264,9 +295,10 @@ class ChartDrawer:
         ax.axhline(y=vp_data['va_low'], color='#bb86fc', linestyle=':', 
                   linewidth=1, alpha=0.6)
     
-    def draw_targets_stoploss(self, ax, df: pd.DataFrame, targets: dict):
+    def draw_targets_stoploss(self, ax, df: BarsLike, targets: dict):
         """Draw entry, targets and stop loss lines"""
-        chart_len = len(df)
+        bars = as_bars(df)
+        chart_len = len(bars)
         
         # Entry line
         ax.axhline(y=targets['entry'], color=self.colors['entry'], 
@@ -295,8 +327,9 @@ class ChartDrawer:
                color=self.colors['stop_loss'], fontsize=8, 
                va='top' if targets['is_bullish'] else 'bottom')
     
-    def draw_elliott_waves(self, ax, df: pd.DataFrame, peaks: list, valleys: list):
+    def draw_elliott_waves(self, ax, df: BarsLike, peaks: list, valleys: list):
         """Draw Elliott Wave labels"""
+        bars = as_bars(df)
         all_points = [(p[0], p[1], 'peak') for p in peaks] + [(v[0], v[1], 'valley') for v in valleys]
         all_points.sort(key=lambda x: x[0])
         
@@ -310,7 +343,7 @@ class ChartDrawer:
             idx, price, ptype = point
             label = wave_labels[i] if i < len(wave_labels) else ''
             
-            offset = 0.02 * (df['High'].max() - df['Low'].min())
+            offset = 0.02 * (np.nanmax(bars.high) - np.nanmin(bars.low))
             y_pos = price + offset if ptype == 'peak' else price - offset
             
             ax.annotate(label, xy=(idx, price), xytext=(idx, y_pos),
@@ -319,10 +352,11 @@ class ChartDrawer:
                        bbox=dict(boxstyle='circle', facecolor=self.colors['background'], 
                                 edgecolor=self.colors['elliott'], alpha=0.8))
     
-    def draw_support_resistance(self, ax, df: pd.DataFrame):
+    def draw_support_resistance(self, ax, df: BarsLike):
         """Draw support and resistance levels"""
-        high = df['High'].values
-        low = df['Low'].values
+        bars = as_bars(df)
+        high = bars.high
+        low = bars.low
         
         # Find key levels
         resistance = np.max(high[-20:])
@@ -333,15 +367,16 @@ class ChartDrawer:
         ax.axhline(y=support, color=self.colors['support'], 
                   linestyle='-.', linewidth=1.5, alpha=0.7)
         
-        ax.text(len(df) - 1, resistance, f"R: {resistance:.2f}", 
+        ax.text(len(bars) - 1, resistance, f"R: {resistance:.2f}", 
                color=self.colors['resistance'], fontsize=8, va='bottom', ha='right')
-        ax.text(len(df) - 1, support, f"S: {support:.2f}", 
+        ax.text(len(bars) - 1, support, f"S: {support:.2f}", 
                color=self.colors['support'], fontsize=8, va='top', ha='right')
     
-    def draw_fibonacci(self, ax, df: pd.DataFrame):
+    def draw_fibonacci(self, ax, df: BarsLike):
         """Draw Fibonacci retracement levels"""
-        high = df['High'].max()
-        low = df['Low'].min()
+        bars = as_bars(df)
+        high = np.nanmax(bars.high)
+        low = np.nanmin(bars.low)
         diff = high - low
         
         fib_levels = [0, 0.236, 0.382, 0.5, 0.618, 0.786, 1]
@@ -350,145 +385,313 @@ class ChartDrawer:
         for level, color in zip(fib_levels, fib_colors):
             price = high - (diff * level)
             ax.axhline(y=price, color=color, linestyle=':', linewidth=1, alpha=0.6)
-            ax.text(len(df) + 2, price, f"{level:.1%}: {price:.2f}", 
+            ax.text(len(bars) + 2, price, f"{level:.1%}: {price:.2f}", 
                    color=color, fontsize=7, va='center')
     
-    def draw_order_blocks(self, ax, df: pd.DataFrame):
+    def draw_order_blocks(self, ax, df: BarsLike):
         """Draw ICT Order Blocks"""
-        if len(df) < 10:
+        bars = as_bars(df)
+        if len(bars) < 10:
             return
         
         # Find potential order blocks (simplified)
-        for i in range(3, len(df) - 1):
+        for i in range(3, len(bars) - 1):
             # Bullish OB: bearish candle followed by strong bullish move
-            if df['Close'].iloc[i-1] < df['Open'].iloc[i-1]:  # Bearish candle
-                if df['Close'].iloc[i] > df['High'].iloc[i-1]:  # Break above
-                    rect = Rectangle((i-1, df['Low'].iloc[i-1]), 
-                                    2, df['High'].iloc[i-1] - df['Low'].iloc[i-1],
+            if bars.close[i-1] < bars.open[i-1]:  # Bearish candle
+                if bars.close[i] > bars.high[i-1]:  # Break above
+                    rect = Rectangle((i-1, bars.low[i-1]), 
+                                    2, bars.high[i-1] - bars.low[i-1],
                                     facecolor=self.colors['bullish'], 
                                     edgecolor='none', alpha=0.2)
                     ax.add_patch(rect)
             
             # Bearish OB: bullish candle followed by strong bearish move
-            if df['Close'].iloc[i-1] > df['Open'].iloc[i-1]:  # Bullish candle
-                if df['Close'].iloc[i] < df['Low'].iloc[i-1]:  # Break below
-                    rect = Rectangle((i-1, df['Low'].iloc[i-1]), 
-                                    2, df['High'].iloc[i-1] - df['Low'].iloc[i-1],
+            if bars.close[i-1] > bars.open[i-1]:  # Bullish candle
+                if bars.close[i] < bars.low[i-1]:  # Break below
+                    rect = Rectangle((i-1, bars.low[i-1]), 
+                                    2, bars.high[i-1] - bars.low[i-1],
                                     facecolor=self.colors['bearish'], 
                                     edgecolor='none', alpha=0.2)
                     ax.add_patch(rect)
     
-    def draw_fvg(self, ax, df: pd.DataFrame):
+    def draw_fvg(self, ax, df: BarsLike):
         """Draw Fair Value Gaps"""
-        if len(df) < 3:
+        bars = as_bars(df)
+        if len(bars) < 3:
             return
         
-        for i in range(2, len(df)):
+        for i in range(2, len(bars)):
             # Bullish FVG
-            if df['Low'].iloc[i] > df['High'].iloc[i-2]:
-                gap_low = df['High'].iloc[i-2]
-                gap_high = df['Low'].iloc[i]
+            if bars.low[i] > bars.high[i-2]:
+                gap_low = bars.high[i-2]
+                gap_high = bars.low[i]
                 rect = Rectangle((i-1, gap_low), 1, gap_high - gap_low,
                                 facecolor=self.colors['bullish'], 
                                 edgecolor='none', alpha=0.15)
                 ax.add_patch(rect)
             
             # Bearish FVG
-            if df['High'].iloc[i] < df['Low'].iloc[i-2]:
-                gap_low = df['High'].iloc[i]
-                gap_high = df['Low'].iloc[i-2]
+            if bars.high[i] < bars.low[i-2]:
+                gap_low = bars.high[i]
+                gap_high = bars.low[i-2]
                 rect = Rectangle((i-1, gap_low), 1, gap_high - gap_low,
                                 facecolor=self.colors['bearish'], 
                                 edgecolor='none', alpha=0.15)
                 ax.add_patch(rect)
     
-    def generate_chart(self, df: pd.DataFrame, symbol: str, timeframe: str, 
-                      analysis_types: list, show_ma: bool = True, 
-                      show_volume_profile: bool = True) -> io.BytesIO:
-        """Generate complete chart with all analysis"""
-        
-        # Create figure with subplots
-        fig = plt.figure(figsize=(14, 10), facecolor=self.colors['background'])
-        
-        # Main chart area
-        ax_main = fig.add_axes([0.08, 0.25, 0.75, 0.65])
+    def prepare_chart_data(self, df: BarsLike, show_volume_profile: bool = True) -> dict:
+        """Indicators shared by every panel drawn from the same bars"""
+        bars = as_bars(df)
+        data = {
+            'mas': self.calculate_moving_averages(bars),
+            'targets': self.get_targets_text(bars),
+            'peaks_valleys': self.find_peaks_valleys(bars),
+        }
+        if show_volume_profile:
+            data['volume_profile'] = self.calculate_volume_profile(bars)
+        return data
+    
+    def draw_panel(self, ax_main, ax_vol, df: BarsLike, data: dict, analysis_types: list,
+                   title: str, show_ma: bool = True, show_volume_profile: bool = True,
+                   title_size: int = 14):
+        """Draw one chart (price + volume axes) from prepared data"""
+        bars = as_bars(df)
         ax_main.set_facecolor(self.colors['background'])
-        
-        # Volume area
-        ax_vol = fig.add_axes([0.08, 0.08, 0.75, 0.15])
         ax_vol.set_facecolor(self.colors['background'])
         
         # Draw candlesticks
-        self.draw_candlesticks(ax_main, df)
+        self.draw_candlesticks(ax_main, bars)
         
-        # Calculate and draw moving averages
+        # Draw moving averages
         if show_ma:
-            mas = self.calculate_moving_averages(df)
-            self.draw_moving_averages(ax_main, df, mas)
+            self.draw_moving_averages(ax_main, bars, data['mas'])
         
-        # Calculate and draw volume profile
+        # Draw volume profile
         if show_volume_profile:
-            vp_data = self.calculate_volume_profile(df)
-            self.draw_volume_profile(ax_main, df, vp_data)
+            vp_data = data.get('volume_profile')
+            if vp_data is None:
+                vp_data = data['volume_profile'] = self.calculate_volume_profile(bars)
+            self.draw_volume_profile(ax_main, bars, vp_data)
         
-        # Calculate targets
-        targets = self.get_targets_text(df)
+        targets = data['targets']
+        peaks, valleys = data['peaks_valleys']
         
         # Draw analysis based on type
-        peaks, valleys = self.find_peaks_valleys(df)
-        
         if 'elliott' in analysis_types or 'all' in analysis_types:
-            self.draw_elliott_waves(ax_main, df, peaks, valleys)
+            self.draw_elliott_waves(ax_main, bars, peaks, valleys)
         
         if 'classic' in analysis_types or 'all' in analysis_types:
-            self.draw_support_resistance(ax_main, df)
+            self.draw_support_resistance(ax_main, bars)
         
         if 'fibonacci' in analysis_types or 'all' in analysis_types:
-            self.draw_fibonacci(ax_main, df)
+            self.draw_fibonacci(ax_main, bars)
         
         if 'ict' in analysis_types or 'all' in analysis_types:
-            self.draw_order_blocks(ax_main, df)
-            self.draw_fvg(ax_main, df)
+            self.draw_order_blocks(ax_main, bars)
+            self.draw_fvg(ax_main, bars)
         
         # Draw targets and stop loss
-        self.draw_targets_stoploss(ax_main, df, targets)
+        self.draw_targets_stoploss(ax_main, bars, targets)
         
         # Draw volume bars
-        for i in range(len(df)):
-            color = self.colors['bullish'] if df['Close'].iloc[i] >= df['Open'].iloc[i] else self.colors['bearish']
-            ax_vol.bar(i, df['Volume'].iloc[i], color=color, alpha=0.7, width=0.8)
+        volume_colors = np.where(bars.close >= bars.open,
+                                 self.colors['bullish'], self.colors['bearish'])
+        volume = bars.volume.astype(float)
+        self.draw_bars(ax_vol, np.arange(len(bars)), np.zeros(len(bars)), volume, 0.8, volume_colors, alpha=0.7)
         
         # Styling
-        ax_main.set_xlim(-1, len(df) + len(df) * 0.2)
-        ax_main.set_ylim(df['Low'].min() * 0.995, df['High'].max() * 1.005)
+        ax_main.set_xlim(-1, len(bars) + len(bars) * 0.2)
+        ax_main.set_ylim(np.nanmin(bars.low) * 0.995, np.nanmax(bars.high) * 1.005)
         ax_main.grid(True, color=self.colors['grid'], alpha=0.3, linestyle='--')
         ax_main.tick_params(colors=self.colors['text'])
         ax_main.set_ylabel('Price', color=self.colors['text'])
         
-        ax_vol.set_xlim(-1, len(df) + len(df) * 0.2)
+        ax_vol.set_xlim(-1, len(bars) + len(bars) * 0.2)
         ax_vol.grid(True, color=self.colors['grid'], alpha=0.3, linestyle='--')
         ax_vol.tick_params(colors=self.colors['text'])
         ax_vol.set_ylabel('Volume', color=self.colors['text'])
         
-        # Title
-        direction = "🟢 LONG" if targets['is_bullish'] else "🔴 SHORT"
-        title = f"{symbol} | {timeframe} | {direction}"
-        ax_main.set_title(title, color=self.colors['text'], fontsize=14, fontweight='bold', pad=10)
+        ax_main.set_title(title, color=self.colors['text'], fontsize=title_size, fontweight='bold', pad=10)
         
         # Legend for MAs
         if show_ma:
             ax_main.legend(loc='upper left', fontsize=8, facecolor=self.colors['background'],
                           edgecolor=self.colors['grid'], labelcolor=self.colors['text'])
+    
+    def build_chart_figure(self, df: BarsLike, symbol: str, timeframe: str,
+                           analysis_types: list, show_ma: bool = True,
+                           show_volume_profile: bool = True):
+        """Complete chart figure with all analysis (not yet rendered)"""
+        bars = as_bars(df)
+        
+        # Create figure with subplots
+        fig = plt.figure(figsize=(14, 10), facecolor=self.colors['background'])
+        
+        # Main chart area
+        ax_main = fig.add_axes([0.08, 0.25, 0.75, 0.65])
+        
+        # Volume area
+        ax_vol = fig.add_axes([0.08, 0.08, 0.75, 0.15])
+        
+        data = self.prepare_chart_data(bars, show_volume_profile)
+        
+        # Title
+        direction = "🟢 LONG" if data['targets']['is_bullish'] else "🔴 SHORT"
+        title = f"{symbol} | {timeframe} | {direction}"
+        
+        self.draw_panel(ax_main, ax_vol, bars, data, analysis_types, title,
+                        show_ma=show_ma, show_volume_profile=show_volume_profile)
         
         # Add timestamp
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M')
         fig.text(0.99, 0.01, f"Generated: {timestamp}", ha='right', va='bottom',
                 fontsize=8, color=self.colors['text'], alpha=0.7)
         
-        # Save to buffer
+        return fig
+    
+    def render_figure(self, fig, dpi: int, pad_inches: float = 0.1) -> Image.Image:
+        """Rasterize once and crop to the tight bounding box (same framing as bbox_inches='tight')"""
+        canvas = FigureCanvasAgg(fig)
+        fig.set_dpi(dpi)
+        canvas.draw()
+        
+        width, height = canvas.get_width_height()
+        image = Image.frombuffer('RGBA', (width, height), canvas.buffer_rgba(), 'raw', 'RGBA', 0, 1)
+        
+        bbox = fig.get_tightbbox(canvas.get_renderer()).padded(pad_inches)
+        left = max(0, int(bbox.x0 * dpi))
+        right = min(width, int(np.ceil(bbox.x1 * dpi)))
+        top = max(0, height - int(np.ceil(bbox.y1 * dpi)))
+        bottom = min(height, height - int(bbox.y0 * dpi))
+        return image.crop((left, top, right, bottom)).convert('RGB')
+    
+    def encode_image(self, image: Image.Image, profile: str) -> io.BytesIO:
+        """Scale and encode a rendered chart for one output profile"""
+        config = OUTPUT_PROFILES[profile]
+        
+        if config.get('scale', 1.0) != 1.0:
+            size = (round(image.width * config['scale']), round(image.height * config['scale']))
+            image = image.resize(size, Image.LANCZOS)
+        
+        buf = io.BytesIO()
+        if config['format'] == 'PNG':
+            if config.get('colors'):
+                # Charts use few flat colors, a small palette keeps them sharp
+                image = image.quantize(colors=config['colors'], method=Image.Quantize.FASTOCTREE)
+            image.save(buf, format='PNG', optimize=bool(config.get('colors')))
+        else:
+            image.save(buf, format=config['format'], quality=config.get('quality', 80))
+        
+        buf.name = f"chart_{profile}.{FORMAT_EXTENSIONS[config['format']]}"
+        buf.seek(0)
+        return buf
+    
+    def export_figure(self, fig, profiles: tuple = ('standard',), cancel=None) -> dict:
+        """
+        {profile: BytesIO} with one render per distinct dpi; closes the figure
+        cancel: optional callable run before each profile is rendered; raising aborts the export
+        """
+        images = {}
+        rendered = {}
+        try:
+            for profile in profiles:
+                if cancel is not None:
+                    cancel('render')
+                dpi = OUTPUT_PROFILES[profile]['dpi']
+                if dpi not in rendered:
+                    rendered[dpi] = self.render_figure(fig, dpi)
+                images[profile] = self.encode_image(rendered[dpi], profile)
+        finally:
+            plt.close(fig)
+        return images
+    
+    def generate_chart(self, df: BarsLike, symbol: str, timeframe: str, 
+                      analysis_types: list, show_ma: bool = True, 
+                      show_volume_profile: bool = True, profile: str = 'standard') -> io.BytesIO:
+        """Generate complete chart with all analysis"""
+        fig = self.build_chart_figure(df, symbol, timeframe, analysis_types,
+                                      show_ma=show_ma, show_volume_profile=show_volume_profile)
+        return self.export_figure(fig, (profile,))[profile]
+    
+    def generate_grid_chart(self, panels: list, symbol: str, cols: int = 2,
+                            show_ma: bool = True) -> io.BytesIO:
+        """
+        Several charts in one figure, e.g. 2x2 timeframes or 2x3 analysis types
+        panels: [(df or Bars, timeframe_name, analysis_types[, drawer]), ...] - panels that
+        share the same frame and drawer also share its bars and prepared indicators;
+        an optional drawer (e.g. with a profile's ATR multipliers) draws its panel instead of self
+        """
+        rows = (len(panels) + cols - 1) // cols
+        fig = plt.figure(figsize=(7 * cols, 5 * rows), facecolor=self.colors['background'])
+        grid = fig.add_gridspec(rows, cols, left=0.05, right=0.98, top=0.9, bottom=0.06, hspace=0.3, wspace=0.15)
+        
+        prepared = {}
+        for k, (df, timeframe, analysis_types, *rest) in enumerate(panels):
+            drawer = rest[0] if rest else self
+            show_volume_profile = 'volume' in analysis_types or 'all' in analysis_types
+            entry = prepared.get((id(df), id(drawer)))
+            if entry is None:
+                bars = as_bars(df)
+                entry = prepared[(id(df), id(drawer))] = (bars, drawer.prepare_chart_data(bars, show_volume_profile=False))
+            bars, data = entry
+            
+            cell = grid[k // cols, k % cols].subgridspec(2, 1, height_ratios=[4, 1], hspace=0.05)
+            ax_main = fig.add_subplot(cell[0])
+            ax_vol = fig.add_subplot(cell[1], sharex=ax_main)
+            ax_main.tick_params(labelbottom=False)
+            
+            direction = "LONG" if data['targets']['is_bullish'] else "SHORT"
+            title = f"{timeframe} | {'+'.join(analysis_types).upper()} | {direction}"
+            drawer.draw_panel(ax_main, ax_vol, bars, data, analysis_types, title, show_ma=show_ma,
+                              show_volume_profile=show_volume_profile, title_size=11)
+        
+        fig.suptitle(symbol, color=self.colors['text'], fontsize=16, fontweight='bold')
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M')
+        fig.text(0.99, 0.01, f"Generated: {timestamp}", ha='right', va='bottom',
+                fontsize=8, color=self.colors['text'], alpha=0.7)
+        
+        buf = io.BytesIO()
+        fig.savefig(buf, format='png', dpi=100, facecolor=self.colors['background'], edgecolor='none')
+        buf.seek(0)
+        plt.close(fig)
+        
+        return buf
+    
+    def generate_confluence_chart(self, frames: dict, summaries: list, symbol: str,
+                                  bias: str, max_bars: int = 120) -> io.BytesIO:
+        """One 2x4 figure: close line, golden zone and bias per timeframe"""
+        fig, axes = plt.subplots(2, 4, figsize=(14, 7), facecolor=self.colors['background'])
+        
+        for ax, summary in zip(axes.flat, summaries):
+            ax.set_facecolor(self.colors['background'])
+            bars = as_bars(frames[summary.timeframe]).tail(max_bars)
+            x = np.arange(len(bars))
+            
+            votes = summary.votes
+            color = self.colors['bullish'] if votes > 0 else self.colors['bearish'] if votes < 0 else self.colors['neutral']
+            ax.plot(x, bars.close, color=color, linewidth=1.2)
+            
+            if not summary.error:
+                zone_low, zone_high = summary.golden_zone
+                ax.axhspan(zone_low, zone_high, color=self.colors['fib'], alpha=0.15)
+            
+            for spine in ax.spines.values():
+                spine.set_color(color)
+            ax.grid(True, color=self.colors['grid'], alpha=0.3, linestyle='--')
+            ax.tick_params(colors=self.colors['text'], labelsize=7)
+            ax.set_xticks([])
+            ax.set_title(f"{summary.timeframe} | {summary.trend} | EW {summary.elliott_wave} | {votes:+d}",
+                         color=self.colors['text'], fontsize=9)
+        
+        for ax in list(axes.flat)[len(summaries):]:
+            ax.set_visible(False)
+        
+        fig.suptitle(f"{symbol} | MTF Confluence | {bias}", color=self.colors['text'],
+                     fontsize=14, fontweight='bold')
+        fig.tight_layout()
+        
         buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=150, facecolor=self.colors['background'],
-                   edgecolor='none', bbox_inches='tight')
+        plt.savefig(buf, format='png', dpi=100, facecolor=self.colors['background'], edgecolor='none')
         buf.seek(0)
         plt.close(fig)
         
@@ -9,6 +9,9 @@ import pandas as pd
 from typing import List, Dict, Tuple, Optional
 from dataclasses import dataclass
 from enum import Enum
+from range_extremes import RangeExtremeIndex
+from rolling_regression import RollingRegression
+from bars import BarsLike, as_bars
 
 class PatternType(Enum):
     # نماذج انعكاسية
@@ -66,6 +69,14 @@ class Pattern:
     signal: SignalType
     description: str
 
+@dataclass
+class PatternOccurrence:
+    pattern: Pattern
+    window: int  # طول النافذة التي اكتُشف فيها النموذج
+    detected_idx: int  # آخر شمعة في النافذة (لحظة الاكتشاف)
+    outcome: str  # 'target' / 'stop' / 'open' / 'neutral'
+    outcome_idx: int  # شمعة تحقق النتيجة (-1 إن لم تتحقق)
+
 @dataclass
 class ClassicAnalysisResult:
     supports: List[SupportResistance]
@@ -83,23 +94,39 @@ class ClassicAnalyzer:
     def __init__(self):
         self.tolerance = 0.02  # 2% tolerance for level matching
     
-    def find_support_resistance(self, df: pd.DataFrame, lookback: int = 20) -> Tuple[List[SupportResistance], List[SupportResistance]]:
+    def find_support_resistance(self, df: BarsLike, lookback: int = 20,
+                                high_index: Optional[RangeExtremeIndex] = None,
+                                low_index: Optional[RangeExtremeIndex] = None) -> Tuple[List[SupportResistance], List[SupportResistance]]:
         """
         تحديد مستويات الدعم والمقاومة
         """
+        bars = as_bars(df)
         supports = []
         resistances = []
         
-        highs = df['High'].values
-        lows = df['Low'].values
-        closes = df['Close'].values
+        highs = bars.high
+        lows = bars.low
+        closes = bars.close
+        
+        if high_index is None:
+            high_index = RangeExtremeIndex(highs)
+        if low_index is None:
+            low_index = RangeExtremeIndex(lows)
         
         # تجميع المستويات المهمة
         levels = {}
         
-        for i in range(lookback, len(df)):
+        # القمم والقيعان المحلية لكل الشموع دفعة واحدة
+        candidates = np.arange(lookback, len(bars))
+        is_high = np.zeros(len(bars), dtype=bool)
+        is_low = np.zeros(len(bars), dtype=bool)
+        if len(candidates):
+            is_high[candidates] = highs[candidates] == high_index.max_many(candidates - lookback, candidates + 1)
+            is_low[candidates] = lows[candidates] == low_index.min_many(candidates - lookback, candidates + 1)
+        
+        for i in np.flatnonzero(is_high | is_low):
             # البحث عن القمم المحلية (مقاومة)
-            if highs[i] == max(highs[i-lookback:i+1]):
+            if is_high[i]:
                 level = round(highs[i], 2)
                 if level not in levels:
                     levels[level] = {'type': 'resistance', 'count': 0, 'last_idx': i}
@@ -107,7 +134,7 @@ class ClassicAnalyzer:
                 levels[level]['last_idx'] = i
             
             # البحث عن القيعان المحلية (دعم)
-            if lows[i] == min(lows[i-lookback:i+1]):
+            if is_low[i]:
                 level = round(lows[i], 2)
                 if level not in levels:
                     levels[level] = {'type': 'support', 'count': 0, 'last_idx': i}
@@ -179,11 +206,12 @@ class ClassicAnalyzer:
         
         return merged
     
-    def detect_trend(self, df: pd.DataFrame, period: int = 20) -> Tuple[str, float]:
+    def detect_trend(self, df: BarsLike, period: int = 20) -> Tuple[str, float]:
         """
         تحديد الاتجاه العام
         """
-        closes = df['Close'].values
+        bars = as_bars(df)
+        closes = bars.close
         
         if len(closes) < period:
             return "غير محدد", 0
@@ -193,45 +221,71 @@ class ClassicAnalyzer:
         
         # حساب ميل خط الاتجاه
         recent_ma = ma[-period:]
-        x = np.arange(len(recent_ma))
         
-        # إزالة NaN
-        valid_idx = ~np.isnan(recent_ma)
-        if sum(valid_idx) < 2:
+        # إزالة NaN أينما وقعت مع إبقاء كل قيمة في موضعها الأصلي على محور x (مثل np.polyfit(x[valid], ...))
+        valid = ~np.isnan(recent_ma)
+        if np.count_nonzero(valid) < 2:
             return "غير محدد", 0
         
-        slope, _ = np.polyfit(x[valid_idx], recent_ma[valid_idx], 1)
+        slope, _, _ = RollingRegression(recent_ma[valid], x=np.arange(len(recent_ma))[valid]).fit_range()
         
         # تحديد الاتجاه
         slope_percent = (slope / closes[-1]) * 100
         
+        return self._classify_trend(slope_percent), slope_percent
+    
+    def _classify_trend(self, slope_percent: float) -> str:
         if slope_percent > 0.1:
-            trend = "صاعد"
+            return "صاعد"
         elif slope_percent < -0.1:
-            trend = "هابط"
-        else:
-            trend = "عرضي"
+            return "هابط"
+        return "عرضي"
+    
+    def trend_slope_series(self, df: BarsLike, period: int = 20) -> pd.Series:
+        """
+        ميل المتوسط المتحرك (% من السعر) عند كل شمعة - نفس حساب detect_trend لكامل التاريخ
+        """
+        bars = as_bars(df)
+        closes = bars.close
+        slopes = np.full(len(closes), np.nan)
+        
+        ma = pd.Series(closes).rolling(window=period).mean().values
+        first_valid = period - 1
+        
+        if len(closes) - first_valid >= period:
+            series = RollingRegression(ma[first_valid:]).fit(period)
+            window_ends = series.ends + first_valid - 1
+            slopes[window_ends] = series.slope / closes[window_ends] * 100
         
-        return trend, slope_percent
+        return pd.Series(slopes, index=bars.labels())
     
-    def find_trend_lines(self, df: pd.DataFrame, lookback: int = 5) -> List[TrendLine]:
+    def find_trend_lines(self, df: BarsLike, lookback: int = 5,
+                         high_index: Optional[RangeExtremeIndex] = None,
+                         low_index: Optional[RangeExtremeIndex] = None) -> List[TrendLine]:
         """
         رسم خطوط الاتجاه
         """
+        bars = as_bars(df)
         trend_lines = []
         
-        highs = df['High'].values
-        lows = df['Low'].values
+        highs = bars.high
+        lows = bars.low
+        
+        if high_index is None:
+            high_index = RangeExtremeIndex(highs)
+        if low_index is None:
+            low_index = RangeExtremeIndex(lows)
         
         # إيجاد القمم والقيعان
         high_points = []
         low_points = []
         
-        for i in range(lookback, len(df) - lookback):
-            if highs[i] == max(highs[i-lookback:i+lookback+1]):
-                high_points.append((i, highs[i]))
-            if lows[i] == min(lows[i-lookback:i+lookback+1]):
-                low_points.append((i, lows[i]))
+        candidates = np.arange(lookback, len(bars) - lookback)
+        if len(candidates):
+            window_max = high_index.max_many(candidates - lookback, candidates + lookback + 1)
+            window_min = low_index.min_many(candidates - lookback, candidates + lookback + 1)
+            high_points = [(i, highs[i]) for i in candidates[highs[candidates] == window_max]]
+            low_points = [(i, lows[i]) for i in candidates[lows[candidates] == window_min]]
         
         # رسم خط اتجاه للقمم (مقاومة)
         if len(high_points) >= 2:
@@ -239,7 +293,7 @@ class ClassicAnalyzer:
             x = [p[0] for p in points]
             y = [p[1] for p in points]
             if len(set(x)) > 1:
-                slope, intercept = np.polyfit(x, y, 1)
+                slope, intercept, _ = RollingRegression(y, x=x).fit_range()
                 trend_lines.append(TrendLine(
                     slope=slope,
                     intercept=intercept,
@@ -255,7 +309,7 @@ class ClassicAnalyzer:
             x = [p[0] for p in points]
             y = [p[1] for p in points]
             if len(set(x)) > 1:
-                slope, intercept = np.polyfit(x, y, 1)
+                slope, intercept, _ = RollingRegression(y, x=x).fit_range()
                 trend_lines.append(TrendLine(
                     slope=slope,
                     intercept=intercept,
@@ -267,28 +321,36 @@ class ClassicAnalyzer:
         
         return trend_lines
     
-    def detect_patterns(self, df: pd.DataFrame) -> List[Pattern]:
+    def detect_patterns(self, df: BarsLike,
+                        high_index: Optional[RangeExtremeIndex] = None,
+                        low_index: Optional[RangeExtremeIndex] = None) -> List[Pattern]:
         """
         كشف النماذج الفنية
         """
+        bars = as_bars(df)
         patterns = []
         
-        highs = df['High'].values
-        lows = df['Low'].values
-        closes = df['Close'].values
+        highs = bars.high
+        lows = bars.low
+        closes = bars.close
+        
+        if high_index is None:
+            high_index = RangeExtremeIndex(highs)
+        if low_index is None:
+            low_index = RangeExtremeIndex(lows)
         
         # كشف القمة المزدوجة
-        pattern = self._detect_double_top(highs, closes)
+        pattern = self._detect_double_top(highs, closes, high_index)
         if pattern:
             patterns.append(pattern)
         
         # كشف القاع المزدوج
-        pattern = self._detect_double_bottom(lows, closes)
+        pattern = self._detect_double_bottom(lows, closes, low_index)
         if pattern:
             patterns.append(pattern)
         
         # كشف الرأس والكتفين
-        pattern = self._detect_head_shoulders(highs, lows, closes)
+        pattern = self._detect_head_shoulders(highs, lows, closes, high_index, low_index)
         if pattern:
             patterns.append(pattern)
         
@@ -299,25 +361,29 @@ class ClassicAnalyzer:
         
         return patterns
     
-    def _detect_double_top(self, highs: np.ndarray, closes: np.ndarray) -> Optional[Pattern]:
+    def _detect_double_top(self, highs: np.ndarray, closes: np.ndarray,
+                           high_index: Optional[RangeExtremeIndex] = None) -> Optional[Pattern]:
         """
         كشف نموذج القمة المزدوجة
         """
         if len(highs) < 20:
             return None
         
-        # البحث عن قمتين متقاربتين
-        recent_highs = highs[-30:]
-        max_idx1 = np.argmax(recent_highs[:15])
-        max_idx2 = np.argmax(recent_highs[15:]) + 15
+        if high_index is None:
+            high_index = RangeExtremeIndex(highs)
+        
+        # البحث عن قمتين متقاربتين (آخر 30 شمعة)
+        start = max(0, len(highs) - 30)
+        max_idx1 = high_index.argmax(start, start + 15) - start
+        max_idx2 = high_index.argmax(start + 15) - start
         
-        peak1 = recent_highs[max_idx1]
-        peak2 = recent_highs[max_idx2]
+        peak1 = highs[start + max_idx1]
+        peak2 = highs[start + max_idx2]
         
         # التحقق من تقارب القمتين
         if abs(peak1 - peak2) / peak1 < 0.03:  # فرق أقل من 3%
             # البحث عن القاع بينهما
-            valley = min(recent_highs[max_idx1:max_idx2+1])
+            valley = high_index.min(start + max_idx1, start + max_idx2 + 1)
             
             # حساب الهدف
             pattern_height = ((peak1 + peak2) / 2) - valley
@@ -336,22 +402,26 @@ class ClassicAnalyzer:
         
         return None
     
-    def _detect_double_bottom(self, lows: np.ndarray, closes: np.ndarray) -> Optional[Pattern]:
+    def _detect_double_bottom(self, lows: np.ndarray, closes: np.ndarray,
+                              low_index: Optional[RangeExtremeIndex] = None) -> Optional[Pattern]:
         """
         كشف نموذج القاع المزدوج
         """
         if len(lows) < 20:
             return None
         
-        recent_lows = lows[-30:]
-        min_idx1 = np.argmin(recent_lows[:15])
-        min_idx2 = np.argmin(recent_lows[15:]) + 15
+        if low_index is None:
+            low_index = RangeExtremeIndex(lows)
         
-        bottom1 = recent_lows[min_idx1]
-        bottom2 = recent_lows[min_idx2]
+        start = max(0, len(lows) - 30)
+        min_idx1 = low_index.argmin(start, start + 15) - start
+        min_idx2 = low_index.argmin(start + 15) - start
+        
+        bottom1 = lows[start + min_idx1]
+        bottom2 = lows[start + min_idx2]
         
         if abs(bottom1 - bottom2) / bottom1 < 0.03:
-            peak = max(recent_lows[min_idx1:min_idx2+1])
+            peak = low_index.max(start + min_idx1, start + min_idx2 + 1)
             
             pattern_height = peak - ((bottom1 + bottom2) / 2)
             target = peak + pattern_height
@@ -369,31 +439,38 @@ class ClassicAnalyzer:
         
         return None
     
-    def _detect_head_shoulders(self, highs: np.ndarray, lows: np.ndarray, closes: np.ndarray) -> Optional[Pattern]:
+    def _detect_head_shoulders(self, highs: np.ndarray, lows: np.ndarray, closes: np.ndarray,
+                               high_index: Optional[RangeExtremeIndex] = None,
+                               low_index: Optional[RangeExtremeIndex] = None) -> Optional[Pattern]:
         """
         كشف نموذج الرأس والكتفين
         """
         if len(highs) < 30:
             return None
         
-        recent = highs[-40:]
+        if high_index is None:
+            high_index = RangeExtremeIndex(highs)
+        if low_index is None:
+            low_index = RangeExtremeIndex(lows)
+        
+        start = max(0, len(highs) - 40)
         
         # البحث عن 3 قمم
-        third = len(recent) // 3
+        third = (len(highs) - start) // 3
         
-        left_shoulder_idx = np.argmax(recent[:third])
-        head_idx = np.argmax(recent[third:2*third]) + third
-        right_shoulder_idx = np.argmax(recent[2*third:]) + 2*third
+        left_shoulder_idx = high_index.argmax(start, start + third) - start
+        head_idx = high_index.argmax(start + third, start + 2*third) - start
+        right_shoulder_idx = high_index.argmax(start + 2*third) - start
         
-        left_shoulder = recent[left_shoulder_idx]
-        head = recent[head_idx]
-        right_shoulder = recent[right_shoulder_idx]
+        left_shoulder = highs[start + left_shoulder_idx]
+        head = highs[start + head_idx]
+        right_shoulder = highs[start + right_shoulder_idx]
         
         # التحقق من الشروط
         if head > left_shoulder and head > right_shoulder:
             if abs(left_shoulder - right_shoulder) / left_shoulder < 0.05:
                 # خط العنق
-                neckline = min(lows[-40:][left_shoulder_idx:right_shoulder_idx+1])
+                neckline = low_index.min(start + left_shoulder_idx, start + right_shoulder_idx + 1)
                 
                 pattern_height = head - neckline
                 target = neckline - pattern_height
@@ -422,10 +499,8 @@ class ClassicAnalyzer:
         recent_lows = lows[-20:]
         
         # حساب ميل القمم والقيعان
-        x = np.arange(len(recent_highs))
-        
-        high_slope, high_intercept = np.polyfit(x, recent_highs, 1)
-        low_slope, low_intercept = np.polyfit(x, recent_lows, 1)
+        high_slope, high_intercept, _ = RollingRegression(recent_highs).fit_range()
+        low_slope, low_intercept, _ = RollingRegression(recent_lows).fit_range()
         
         # تحديد نوع المثلث
         if high_slope < -0.01 and low_slope > 0.01:
@@ -468,11 +543,257 @@ class ClassicAnalyzer:
             description=desc
         )
     
-    def calculate_indicators(self, df: pd.DataFrame) -> Dict[str, float]:
+    def scan_patterns(self, df: BarsLike, window_sizes: Tuple[int, ...] = (20, 30, 40, 60),
+                      horizon: Optional[int] = None) -> List[PatternOccurrence]:
+        """
+        مسح تاريخي للنماذج الكلاسيكية عند كل إزاحة ولعدة أطوال نوافذ
+        - القمم/القيعان من فهرس النطاقات (بدون حلقات على النوافذ)
+        - ميل المثلثات من RollingRegression بدلاً من np.polyfit لكل نافذة
+        - نتيجة كل نموذج: الهدف أولاً أم وقف الخسارة (خلال horizon شمعة إن حُدد)
+        """
+        bars = as_bars(df)
+        highs = bars.high
+        lows = bars.low
+        closes = bars.close
+        n = len(bars)
+        
+        high_index = RangeExtremeIndex(highs)
+        low_index = RangeExtremeIndex(lows)
+        
+        found = []
+        for window in sorted(set(window_sizes)):
+            if window < 20 or window > n:
+                continue
+            
+            ends = np.arange(window, n + 1)  # النافذة [end - window, end)
+            starts = ends - window
+            
+            found.append(self._scan_double_tops(highs, high_index, starts, ends, window))
+            found.append(self._scan_double_bottoms(lows, low_index, starts, ends, window))
+            found.append(self._scan_head_shoulders(highs, high_index, low_index, starts, ends, window))
+            found.append(self._scan_triangles(highs, lows, closes, starts, ends, window))
+        
+        found = [f for f in found if len(f['start'])]
+        if not found:
+            return []
+        
+        columns = {key: np.concatenate([f[key] for f in found]) for key in found[0]}
+        
+        # النموذج نفسه يُكتشف في نوافذ متتالية: نحتفظ بأول اكتشاف فقط
+        order = np.argsort(columns['detected'], kind='stable')
+        columns = {key: values[order] for key, values in columns.items()}
+        keys = (columns['type'] * (n + 1) + columns['start']) * (n + 1) + columns['end']
+        _, first = np.unique(keys, return_index=True)
+        first.sort()
+        columns = {key: values[first] for key, values in columns.items()}
+        columns = self._merge_triangle_windows(columns, n)
+        
+        outcome, outcome_idx = self._resolve_outcomes(columns, high_index, low_index, horizon)
+        
+        pattern_types = list(PatternType)
+        signals = list(SignalType)
+        occurrences = []
+        for k in range(len(columns['start'])):
+            pattern_type = pattern_types[columns['type'][k]]
+            signal = signals[columns['signal'][k]]
+            target = columns['target'][k]
+            occurrences.append(PatternOccurrence(
+                pattern=Pattern(
+                    pattern_type=pattern_type,
+                    start_idx=int(columns['start'][k]),
+                    end_idx=int(columns['end'][k]),
+                    confidence=float(columns['confidence'][k]),
+                    target_price=target,
+                    stop_loss=columns['stop'][k],
+                    signal=signal,
+                    description=self._scan_description(pattern_type, columns['level'][k], target)
+                ),
+                window=int(columns['window'][k]),
+                detected_idx=int(columns['detected'][k]),
+                outcome=outcome[k],
+                outcome_idx=int(outcome_idx[k])
+            ))
+        
+        return occurrences
+    
+    def _enum_code(self, member: Enum) -> int:
+        return list(type(member)).index(member)
+    
+    def _merge_triangle_windows(self, columns: Dict[str, np.ndarray], n: int) -> Dict[str, np.ndarray]:
+        """
+        المثلث ليس له نقاط ارتكاز: بدايته ونهايته حدود النافذة، فكل إزاحة تعطي مفتاحاً جديداً
+        النوافذ المتداخلة من نفس النوع مثلث واحد: نحتفظ بأول اكتشاف له
+        """
+        codes = [self._enum_code(t) for t in (PatternType.ASCENDING_TRIANGLE, PatternType.DESCENDING_TRIANGLE,
+                                              PatternType.SYMMETRIC_TRIANGLE)]
+        triangle = np.flatnonzero(np.isin(columns['type'], codes))
+        if not len(triangle):
+            return columns
+        
+        # إزاحة كل نوع بـ n + 1 حتى لا تتداخل نوافذ الأنواع المختلفة
+        offset = columns['type'][triangle] * (n + 1)
+        start = columns['start'][triangle] + offset
+        end = columns['end'][triangle] + offset
+        order = np.lexsort((columns['detected'][triangle], start))
+        start, end = start[order], end[order]
+        
+        new_group = np.r_[True, start[1:] > np.maximum.accumulate(end)[:-1]]
+        group = np.cumsum(new_group) - 1
+        detected = columns['detected'][triangle][order]
+        by_detection = np.lexsort((detected, group))
+        _, first = np.unique(group[by_detection], return_index=True)
+        keep_triangles = triangle[order][by_detection[first]]
+        
+        keep = np.sort(np.r_[np.flatnonzero(~np.isin(columns['type'], codes)), keep_triangles])
+        return {key: values[keep] for key, values in columns.items()}
+    
+    def _scan_columns(self, mask, pattern_code, signal_code, start, end, ends, window,
+                      target, stop, level, confidence) -> Dict[str, np.ndarray]:
+        """
+        أعمدة النوافذ المطابقة فقط (الرموز إما قيمة واحدة أو مصفوفة لكل نافذة)
+        """
+        count = int(mask.sum())
+        return {
+            'type': np.broadcast_to(pattern_code, mask.shape)[mask],
+            'signal': np.broadcast_to(signal_code, mask.shape)[mask],
+            'start': start[mask],
+            'end': end[mask],
+            'detected': ends[mask] - 1,
+            'window': np.full(count, window),
+            'target': target[mask],
+            'stop': stop[mask],
+            'level': level[mask],
+            'confidence': np.full(count, confidence, dtype=float),
+        }
+    
+    def _scan_double_tops(self, highs, high_index, starts, ends, window) -> Dict[str, np.ndarray]:
+        half = window // 2
+        idx1 = high_index.argmax_many(starts, starts + half)
+        idx2 = high_index.argmax_many(starts + half, ends)
+        peak1 = highs[idx1]
+        peak2 = highs[idx2]
+        
+        mask = np.abs(peak1 - peak2) / peak1 < 0.03
+        valley = high_index.min_many(idx1, idx2 + 1)
+        avg_peak = (peak1 + peak2) / 2
+        target = valley - (avg_peak - valley)
+        
+        return self._scan_columns(mask, self._enum_code(PatternType.DOUBLE_TOP), self._enum_code(SignalType.SELL), idx1, idx2, ends, window,
+                                  target, avg_peak * 1.02, peak1, 75)
+    
+    def _scan_double_bottoms(self, lows, low_index, starts, ends, window) -> Dict[str, np.ndarray]:
+        half = window // 2
+        idx1 = low_index.argmin_many(starts, starts + half)
+        idx2 = low_index.argmin_many(starts + half, ends)
+        bottom1 = lows[idx1]
+        bottom2 = lows[idx2]
+        
+        mask = np.abs(bottom1 - bottom2) / bottom1 < 0.03
+        peak = low_index.max_many(idx1, idx2 + 1)
+        avg_bottom = (bottom1 + bottom2) / 2
+        target = peak + (peak - avg_bottom)
+        
+        return self._scan_columns(mask, self._enum_code(PatternType.DOUBLE_BOTTOM), self._enum_code(SignalType.BUY), idx1, idx2, ends, window,
+                                  target, avg_bottom * 0.98, bottom1, 75)
+    
+    def _scan_head_shoulders(self, highs, high_index, low_index, starts, ends, window) -> Dict[str, np.ndarray]:
+        third = window // 3
+        left_idx = high_index.argmax_many(starts, starts + third)
+        head_idx = high_index.argmax_many(starts + third, starts + 2 * third)
+        right_idx = high_index.argmax_many(starts + 2 * third, ends)
+        left = highs[left_idx]
+        head = highs[head_idx]
+        right = highs[right_idx]
+        
+        mask = (head > left) & (head > right) & (np.abs(left - right) / left < 0.05)
+        neckline = low_index.min_many(left_idx, right_idx + 1)
+        target = neckline - (head - neckline)
+        
+        return self._scan_columns(mask, self._enum_code(PatternType.HEAD_SHOULDERS), self._enum_code(SignalType.SELL), left_idx, right_idx, ends, window,
+                                  target, head * 1.02, neckline, 80)
+    
+    def _scan_triangles(self, highs, lows, closes, starts, ends, window) -> Dict[str, np.ndarray]:
+        high_slope = RollingRegression(highs).fit(window).slope
+        low_slope = RollingRegression(lows).fit(window).slope
+        
+        symmetric = (high_slope < -0.01) & (low_slope > 0.01)
+        ascending = ~symmetric & (np.abs(high_slope) < 0.01) & (low_slope > 0.01)
+        descending = ~symmetric & ~ascending & (high_slope < -0.01) & (np.abs(low_slope) < 0.01)
+        mask = symmetric | ascending | descending
+        
+        pattern_code = np.where(symmetric, self._enum_code(PatternType.SYMMETRIC_TRIANGLE),
+                                np.where(ascending, self._enum_code(PatternType.ASCENDING_TRIANGLE),
+                                         self._enum_code(PatternType.DESCENDING_TRIANGLE)))
+        signal_code = np.where(symmetric, self._enum_code(SignalType.NEUTRAL),
+                               np.where(ascending, self._enum_code(SignalType.BUY),
+                                        self._enum_code(SignalType.SELL)))
+        
+        pattern_height = highs[starts] - lows[starts]
+        current_price = closes[ends - 1]
+        target = np.where(ascending, current_price + pattern_height,
+                          np.where(descending, current_price - pattern_height, current_price))
+        stop = current_price * np.where(ascending, 0.98, 1.02)
+        
+        return self._scan_columns(mask, pattern_code, signal_code, starts, ends - 1, ends, window,
+                                  target, stop, current_price, 70)
+    
+    def _resolve_outcomes(self, columns: Dict[str, np.ndarray], high_index: RangeExtremeIndex,
+                          low_index: RangeExtremeIndex, horizon: Optional[int]) -> Tuple[List[str], np.ndarray]:
+        """
+        أيهما يتحقق أولاً بعد الاكتشاف: الهدف أم وقف الخسارة (بحث ثنائي متجه)
+        """
+        count = len(columns['start'])
+        entry = columns['detected'] + 1
+        limit = entry + horizon if horizon else None
+        buy = columns['signal'] == self._enum_code(SignalType.BUY)
+        sell = columns['signal'] == self._enum_code(SignalType.SELL)
+        
+        target_hit = np.full(count, -1, dtype=np.int64)
+        stop_hit = np.full(count, -1, dtype=np.int64)
+        for side, target_search, stop_search in ((buy, high_index.first_at_or_above, low_index.first_at_or_below),
+                                                  (sell, low_index.first_at_or_below, high_index.first_at_or_above)):
+            if not side.any():
+                continue
+            side_limit = limit[side] if limit is not None else None
+            target_hit[side] = target_search(entry[side], columns['target'][side], side_limit)
+            stop_hit[side] = stop_search(entry[side], columns['stop'][side], side_limit)
+        
+        outcome = []
+        outcome_idx = np.full(count, -1, dtype=np.int64)
+        for k in range(count):
+            if not (buy[k] or sell[k]):
+                outcome.append('neutral')
+            elif target_hit[k] >= 0 and (stop_hit[k] < 0 or target_hit[k] < stop_hit[k]):
+                outcome.append('target')
+                outcome_idx[k] = target_hit[k]
+            elif stop_hit[k] >= 0:
+                # عند تحقق الاثنين في نفس الشمعة نفترض الأسوأ (وقف الخسارة)
+                outcome.append('stop')
+                outcome_idx[k] = stop_hit[k]
+            else:
+                outcome.append('open')
+        
+        return outcome, outcome_idx
+    
+    def _scan_description(self, pattern_type: PatternType, level: float, target: float) -> str:
+        if pattern_type == PatternType.DOUBLE_TOP:
+            return f"🔻 قمة مزدوجة عند ${level:.2f} - هدف ${target:.2f}"
+        if pattern_type == PatternType.DOUBLE_BOTTOM:
+            return f"🔺 قاع مزدوج عند ${level:.2f} - هدف ${target:.2f}"
+        if pattern_type == PatternType.HEAD_SHOULDERS:
+            return f"👤 رأس وكتفين - خط العنق ${level:.2f} - هدف ${target:.2f}"
+        if pattern_type == PatternType.SYMMETRIC_TRIANGLE:
+            return "📐 مثلث متماثل - انتظار الاختراق"
+        if pattern_type == PatternType.ASCENDING_TRIANGLE:
+            return "📐 مثلث صاعد - توقع اختراق صعودي"
+        return "📐 مثلث هابط - توقع اختراق هبوطي"
+    
+    def calculate_indicators(self, df: BarsLike) -> Dict[str, float]:
         """
         حساب المؤشرات الفنية الأساسية
         """
-        closes = df['Close']
+        bars = as_bars(df)
+        closes = pd.Series(bars.close)
         
         indicators = {}
         
@@ -506,30 +827,35 @@ class ClassicAnalyzer:
         
         return indicators
     
-    def analyze(self, df: pd.DataFrame) -> ClassicAnalysisResult:
+    def analyze(self, df: BarsLike) -> ClassicAnalysisResult:
         """
         التحليل الكلاسيكي الكامل
         """
+        bars = as_bars(df)
+        # فهرس القمم والقيعان المشترك لكل عمليات البحث في النوافذ
+        high_index = RangeExtremeIndex(bars.high)
+        low_index = RangeExtremeIndex(bars.low)
+        
         # الدعم والمقاومة
-        supports, resistances = self.find_support_resistance(df)
+        supports, resistances = self.find_support_resistance(bars, high_index=high_index, low_index=low_index)
         
         # الاتجاه
-        trend, trend_strength = self.detect_trend(df)
+        trend, trend_strength = self.detect_trend(bars)
         
         # خطوط الاتجاه
-        trend_lines = self.find_trend_lines(df)
+        trend_lines = self.find_trend_lines(bars, high_index=high_index, low_index=low_index)
         
         # النماذج
-        patterns = self.detect_patterns(df)
+        patterns = self.detect_patterns(bars, high_index=high_index, low_index=low_index)
         
         # المؤشرات
-        indicators = self.calculate_indicators(df)
+        indicators = self.calculate_indicators(bars)
         
         # تحديد الإشارة العامة
         signal = self._determine_signal(trend, patterns, indicators)
         
         # المستويات الرئيسية
-        current_price = df['Close'].iloc[-1]
+        current_price = bars.close[-1]
         key_levels = {
             'السعر الحالي': current_price,
             'أقرب دعم': supports[0].level if supports else current_price * 0.95,
@@ -559,6 +885,19 @@ class ClassicAnalyzer:
         """
         تحديد الإشارة العامة
         """
+        buy_score, sell_score = self.signal_scores(trend, patterns, indicators)
+        
+        if buy_score > sell_score + 2:
+            return SignalType.BUY
+        elif sell_score > buy_score + 2:
+            return SignalType.SELL
+        else:
+            return SignalType.NEUTRAL
+    
+    def signal_scores(self, trend: str, patterns: List[Pattern], indicators: Dict) -> Tuple[int, int]:
+        """
+        نقاط الشراء والبيع التي تُبنى عليها الإشارة العامة
+        """
         buy_score = 0
         sell_score = 0
         
@@ -589,12 +928,7 @@ class ClassicAnalyzer:
         else:
             sell_score += 1
         
-        if buy_score > sell_score + 2:
-            return SignalType.BUY
-        elif sell_score > buy_score + 2:
-            return SignalType.SELL
-        else:
-            return SignalType.NEUTRAL
+        return buy_score, sell_score
     
     def _build_analysis_text(self, supports, resistances, trend, patterns, indicators, signal, current_price) -> str:
         """
@@ -3,11 +3,12 @@
 Elliott Wave Analysis Engine
 """
 
+import heapq
 import numpy as np
-import pandas as pd
 from typing import List, Dict, Tuple, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
+from bars import BarsLike, as_bars
 
 class WaveType(Enum):
     IMPULSE = "دافعة"
@@ -28,6 +29,13 @@ class Wave:
     direction: WaveDirection
     confidence: float  # نسبة الثقة
 
+@dataclass
+class WaveCount:
+    pivot_positions: List[int]  # مواقع نقاط الموجات 0-1-2-3-4-5 داخل قائمة pivots
+    direction: WaveDirection
+    confidence: float
+    ratios: Dict[str, float]
+
 @dataclass
 class ElliottWaveResult:
     waves: List[Wave]
@@ -38,6 +46,17 @@ class ElliottWaveResult:
     pivots: List[Dict]
     fibonacci_levels: Dict[str, float]
     analysis_text: str
+    wave_counts: List[WaveCount] = field(default_factory=list)  # أفضل الترقيمات المرشحة
+
+@dataclass
+class DegreeAnalysis:
+    lookback: int  # درجة الموجة (نافذة تحديد القمم والقيعان)
+    waves: List[Wave]
+    current_wave: str
+    next_expected: str
+    confidence: float
+    parent_wave: Optional[str]  # موجة الدرجة الأعلى التي يقع داخلها هذا العد
+    pivots: List[Dict]
 
 class ElliottWaveAnalyzer:
     """محلل موجات إليوت"""
@@ -53,38 +72,89 @@ class ElliottWaveAnalyzer:
             'waveB_retracement': (0.382, 0.786),  # الموجة B
             'waveC_extension': (0.618, 1.618),    # الموجة C
         }
+        
+        # نقاط ترجيح الترقيم عند البحث (الأساس + مكافآت نسب فيبوناتشي)
+        self.count_base_score = 60
+        self.count_bonuses = {
+            'wave2': 8,
+            'wave3': 12,
+            'wave4': 8,
+            'wave5': 7,
+            'wave3_longest': 5,
+        }
     
-    def find_pivots(self, df: pd.DataFrame, lookback: int = 5) -> Tuple[List[Dict], List[Dict]]:
+    def _centered_extremes(self, values: np.ndarray, radii: List[int], op) -> Dict[int, np.ndarray]:
         """
-        تحديد القمم والقيعان (Swing Highs & Lows)
+        أعلى/أدنى قيمة في نافذة مركزية [i-r, i+r] لكل نصف قطر مطلوب
+        كل مستوى يُبنى من المستوى الأصغر بمضاعفة نصف القطر (هرم مشترك)
         """
-        highs = []
-        lows = []
-        
-        high_col = df['High'].values
-        low_col = df['Low'].values
-        close_col = df['Close'].values
-        
-        for i in range(lookback, len(df) - lookback):
-            # تحديد القمة
-            if high_col[i] == max(high_col[i-lookback:i+lookback+1]):
-                highs.append({
-                    'index': i,
-                    'price': high_col[i],
-                    'date': df.index[i] if hasattr(df.index[i], 'strftime') else str(df.index[i]),
-                    'type': 'high'
-                })
+        n = len(values)
+        fill = -np.inf if op is np.maximum else np.inf
+        current = values.astype(float)
+        radius = 0
+        result = {}
+        
+        for target in sorted(set(radii)):
+            while radius < target:
+                # النوافذ عند i-step و i و i+step تغطي [i-r-step, i+r+step] دون فجوات
+                step = min(target - radius, 2 * radius + 1)
+                if step < n:
+                    left = np.full(n, fill)
+                    right = np.full(n, fill)
+                    left[step:] = current[:-step]
+                    right[:-step] = current[step:]
+                    current = op(op(left, right), current)
+                radius += step
+            result[target] = current
+        
+        return result
+    
+    def find_pivot_pyramid(self, df: BarsLike, lookbacks: List[int]) -> Dict[int, Tuple[List[Dict], List[Dict]]]:
+        """
+        تحديد القمم والقيعان لعدة درجات (lookbacks) في تمريرة واحدة
+        """
+        bars = as_bars(df)
+        high_col = bars.high
+        low_col = bars.low
+        n = len(bars)
+        
+        def date_of(i):
+            label = bars.label(i)
+            return label if hasattr(label, 'strftime') else str(label)
+        
+        max_by_radius = self._centered_extremes(high_col, lookbacks, np.maximum)
+        min_by_radius = self._centered_extremes(low_col, lookbacks, np.minimum)
+        
+        pyramid = {}
+        for lookback in lookbacks:
+            inner = np.zeros(n, dtype=bool)
+            inner[lookback:max(lookback, n - lookback)] = True
+            
+            high_idx = np.flatnonzero(inner & (high_col == max_by_radius[lookback]))
+            low_idx = np.flatnonzero(inner & (low_col == min_by_radius[lookback]))
             
-            # تحديد القاع
-            if low_col[i] == min(low_col[i-lookback:i+lookback+1]):
-                lows.append({
-                    'index': i,
-                    'price': low_col[i],
-                    'date': df.index[i] if hasattr(df.index[i], 'strftime') else str(df.index[i]),
-                    'type': 'low'
-                })
-        
-        return highs, lows
+            highs = [{
+                'index': int(i),
+                'price': high_col[i],
+                'date': date_of(i),
+                'type': 'high'
+            } for i in high_idx]
+            lows = [{
+                'index': int(i),
+                'price': low_col[i],
+                'date': date_of(i),
+                'type': 'low'
+            } for i in low_idx]
+            
+            pyramid[lookback] = (highs, lows)
+        
+        return pyramid
+    
+    def find_pivots(self, df: BarsLike, lookback: int = 5) -> Tuple[List[Dict], List[Dict]]:
+        """
+        تحديد القمم والقيعان (Swing Highs & Lows)
+        """
+        return self.find_pivot_pyramid(df, [lookback])[lookback]
     
     def merge_pivots(self, highs: List[Dict], lows: List[Dict]) -> List[Dict]:
         """
@@ -203,6 +273,223 @@ class ElliottWaveAnalyzer:
         
         return True, confidence, "✅ موجة تصحيحية (A-B-C)"
     
+    def _in_ratio_array(self, values: np.ndarray, key: str) -> np.ndarray:
+        low, high = self.fib_ratios[key]
+        return (values >= low) & (values <= high)
+    
+    def validate_impulse_windows(self, prices: np.ndarray) -> np.ndarray:
+        """
+        نسخة متجهة من validate_impulse_wave لكل نافذة متتالية من 6 نقاط
+        prices: مصفوفة أسعار النقاط (1D) أو مصفوفة لعدة رموز (رمز لكل صف)
+        تُرجع الثقة لكل نافذة (الشكل: ..., عدد_النقاط - 5)
+        """
+        prices = np.asarray(prices, dtype=float)
+        if prices.shape[-1] < 6:
+            return np.zeros(prices.shape[:-1] + (0,))
+        
+        windows = np.lib.stride_tricks.sliding_window_view(prices, 6, axis=-1)
+        p0, p1, p2, p3, p4, p5 = (windows[..., k] for k in range(6))
+        
+        w1_length = np.abs(p1 - p0)
+        w3_length = np.abs(p3 - p2)
+        w5_length = np.abs(p5 - p4)
+        rising = p1 > p0
+        falling = p1 < p0
+        
+        confidence = np.full(p0.shape, 100.0)
+        
+        # قاعدة 1: الموجة 2 لا تتجاوز بداية الموجة 1
+        confidence -= 40 * ((rising & (p2 < p0)) | (falling & (p2 > p0)))
+        
+        # قاعدة 2: الموجة 3 ليست الأقصر
+        confidence -= 30 * ((w3_length < w1_length) & (w3_length < w5_length))
+        
+        # قاعدة 3: الموجة 4 لا تتداخل مع الموجة 1
+        confidence -= 20 * ((rising & (p4 < p1)) | (falling & (p4 > p1)))
+        
+        # التحقق من نسب فيبوناتشي
+        has_w1 = w1_length > 0
+        safe_w1 = np.where(has_w1, w1_length, 1.0)
+        confidence += 5 * (has_w1 & self._in_ratio_array(np.abs(p2 - p1) / safe_w1, 'wave2_retracement'))
+        confidence += 10 * (has_w1 & self._in_ratio_array(w3_length / safe_w1, 'wave3_extension'))
+        
+        return np.clip(confidence, 0, 100)
+    
+    def validate_corrective_windows(self, prices: np.ndarray) -> np.ndarray:
+        """
+        نسخة متجهة من validate_corrective_wave لكل نافذة متتالية من 4 نقاط
+        """
+        prices = np.asarray(prices, dtype=float)
+        if prices.shape[-1] < 4:
+            return np.zeros(prices.shape[:-1] + (0,))
+        
+        windows = np.lib.stride_tricks.sliding_window_view(prices, 4, axis=-1)
+        p0, p1, p2, p3 = (windows[..., k] for k in range(4))
+        
+        a_length = np.abs(p1 - p0)
+        has_a = a_length > 0
+        safe_a = np.where(has_a, a_length, 1.0)
+        
+        confidence = np.full(p0.shape, 80.0)
+        
+        # الموجة B عادة تصحح 38.2%-78.6% من A
+        confidence += 10 * (has_a & self._in_ratio_array(np.abs(p2 - p1) / safe_a, 'waveB_retracement'))
+        
+        # الموجة C عادة تساوي أو تتجاوز A
+        confidence += 10 * (has_a & self._in_ratio_array(np.abs(p3 - p2) / safe_a, 'waveC_extension'))
+        
+        return np.minimum(confidence, 100)
+    
+    def scan_impulse_windows(self, pivots: List[Dict]) -> Tuple[int, float]:
+        """
+        إيجاد أفضل موجة دافعة (6 نقاط متتالية) في كامل التاريخ
+        تُرجع موقع أول نقطة والثقة، أو (-1, 0) عند عدم كفاية النقاط
+        """
+        confidence = self.validate_impulse_windows(np.array([p['price'] for p in pivots], dtype=float))
+        if confidence.size == 0:
+            return -1, 0
+        
+        # عند التساوي نفضّل الأحدث
+        best = len(confidence) - 1 - int(np.argmax(confidence[::-1]))
+        return best, float(confidence[best])
+    
+    def _in_ratio(self, value: float, key: str) -> bool:
+        low, high = self.fib_ratios[key]
+        return low <= value <= high
+    
+    def search_wave_counts(self, pivots: List[Dict], top_k: int = 3, max_skip: int = 2,
+                           min_end: int = 0) -> List[WaveCount]:
+        """
+        البحث عن أفضل ترقيمات الموجة الدافعة (1-2-3-4-5)
+        - يجرب كل نقطة بداية ويسمح بتجاوز تأرجحات صغيرة (حتى max_skip لكل موجة)
+        - يقلّم الفروع المخالفة مبكراً: الموجة 2 تتجاوز بداية 1، الموجة 4 تتداخل مع 1،
+          الموجة 3 الأقصر، إضافة لحد أعلى للنقاط (Branch & Bound) مقابل أفضل k
+        - الأرجل الصالحة بين النقاط محفوظة (memoized) لكل نقطة بداية رجل
+        """
+        n = len(pivots)
+        if n < 6 or top_k <= 0:
+            return []
+        
+        prices = np.array([p['price'] for p in pivots], dtype=float)
+        steps = [1 + 2 * s for s in range(max_skip + 1)]
+        first_start = max(0, min_end - 5 * steps[-1])
+        base = self.count_base_score
+        bonus = self.count_bonuses
+        
+        heap = []  # (confidence, end_position, counter, WaveCount) - الأسوأ في القمة
+        counter = 0
+        
+        for direction in (WaveDirection.UP, WaveDirection.DOWN):
+            sign = 1.0 if direction == WaveDirection.UP else -1.0
+            start_type = 'low' if direction == WaveDirection.UP else 'high'
+            s = prices * sign
+            legs = {}
+            
+            def next_pivots(j: int) -> List[int]:
+                # رجل صالحة: طرفاها هما أعلى وأدنى سعر في المقطع (التأرجحات المتجاوزة داخلها)
+                if j not in legs:
+                    rising = pivots[j]['type'] == start_type
+                    candidates = []
+                    for step in steps:
+                        k = j + step
+                        if k >= n:
+                            break
+                        seg = s[j:k + 1]
+                        if rising:
+                            if s[j] <= seg.min() and s[k] >= seg.max():
+                                candidates.append(k)
+                        elif s[j] >= seg.max() and s[k] <= seg.min():
+                            candidates.append(k)
+                    legs[j] = candidates
+                return legs[j]
+            
+            def bound_ok(score: float, remaining: float) -> bool:
+                return len(heap) < top_k or score + remaining >= heap[0][0]
+            
+            for i0 in range(first_start, n - 5):
+                if pivots[i0]['type'] != start_type:
+                    continue
+                for i1 in next_pivots(i0):
+                    w1 = s[i1] - s[i0]
+                    if w1 <= 0:
+                        continue
+                    for i2 in next_pivots(i1):
+                        # قاعدة 1: الموجة 2 لا تتجاوز بداية الموجة 1
+                        if s[i2] <= s[i0]:
+                            continue
+                        r2 = (s[i1] - s[i2]) / w1
+                        sc2 = base + (bonus['wave2'] if self._in_ratio(r2, 'wave2_retracement') else 0)
+                        if not bound_ok(sc2, sum(bonus.values()) - bonus['wave2']):
+                            continue
+                        for i3 in next_pivots(i2):
+                            if s[i3] <= s[i1]:
+                                continue
+                            w3 = s[i3] - s[i2]
+                            r3 = w3 / w1
+                            sc3 = sc2 + (bonus['wave3'] if self._in_ratio(r3, 'wave3_extension') else 0)
+                            if not bound_ok(sc3, bonus['wave4'] + bonus['wave5'] + bonus['wave3_longest']):
+                                continue
+                            for i4 in next_pivots(i3):
+                                # قاعدة 3: الموجة 4 لا تتداخل مع الموجة 1
+                                if s[i4] <= s[i1]:
+                                    continue
+                                r4 = (s[i3] - s[i4]) / w3
+                                sc4 = sc3 + (bonus['wave4'] if self._in_ratio(r4, 'wave4_retracement') else 0)
+                                if not bound_ok(sc4, bonus['wave5'] + bonus['wave3_longest']):
+                                    continue
+                                for i5 in next_pivots(i4):
+                                    if i5 < min_end:
+                                        continue
+                                    w5 = s[i5] - s[i4]
+                                    # قاعدة 2: الموجة 3 ليست الأقصر
+                                    if w5 <= 0 or (w3 < w1 and w3 < w5):
+                                        continue
+                                    r5 = w5 / w1
+                                    score = sc4 + (bonus['wave5'] if self._in_ratio(r5, 'wave5_extension') else 0)
+                                    if w3 >= w1 and w3 >= w5:
+                                        score += bonus['wave3_longest']
+                                    score = min(100, score)
+                                    
+                                    entry = (score, i5, counter, WaveCount(
+                                        pivot_positions=[i0, i1, i2, i3, i4, i5],
+                                        direction=direction,
+                                        confidence=score,
+                                        ratios={'wave2': r2, 'wave3': r3, 'wave4': r4, 'wave5': r5}
+                                    ))
+                                    counter += 1
+                                    if len(heap) < top_k:
+                                        heapq.heappush(heap, entry)
+                                    elif entry[:2] > heap[0][:2]:
+                                        heapq.heapreplace(heap, entry)
+        
+        return [entry[3] for entry in sorted(heap, key=lambda e: (e[0], e[1]), reverse=True)]
+    
+    def waves_from_count(self, count: WaveCount, pivots: List[Dict]) -> List[Wave]:
+        """
+        تحويل الترقيم إلى موجات: 1-5 دافعة ثم A-B-C من النقاط التالية لنهاية الدافعة
+        """
+        positions = count.pivot_positions
+        tail = list(range(positions[-1] + 1, min(len(pivots), positions[-1] + 4)))
+        points = positions + tail
+        labels = ['1', '2', '3', '4', '5', 'A', 'B', 'C']
+        
+        waves = []
+        for i in range(len(points) - 1):
+            start = pivots[points[i]]
+            end = pivots[points[i + 1]]
+            waves.append(Wave(
+                number=labels[i],
+                start_idx=start['index'],
+                end_idx=end['index'],
+                start_price=start['price'],
+                end_price=end['price'],
+                wave_type=WaveType.IMPULSE if i < 5 else WaveType.CORRECTIVE,
+                direction=WaveDirection.UP if end['price'] > start['price'] else WaveDirection.DOWN,
+                confidence=count.confidence
+            ))
+        
+        return waves
+    
     def identify_waves(self, pivots: List[Dict], trend: str) -> List[Wave]:
         """
         تحديد وترقيم الموجات
@@ -287,12 +574,57 @@ class ElliottWaveAnalyzer:
         
         return targets
     
-    def analyze(self, df: pd.DataFrame, lookback: int = 5) -> ElliottWaveResult:
+    def label_waves(self, pivots: List[Dict], trend: str) -> Tuple[List[Wave], float, str, List[WaveCount]]:
+        """
+        ترقيم الموجات من القمم والقيعان مع التحقق من صحتها
+        """
+        # البحث عن أفضل ترقيم ينتهي ضمن آخر 3 نقاط (ليتبعه تصحيح A-B-C على الأكثر)
+        wave_counts = self.search_wave_counts(pivots, top_k=3, min_end=len(pivots) - 4)
+        
+        if wave_counts:
+            best = wave_counts[0]
+            waves = self.waves_from_count(best, pivots)
+            impulse_pivots = [pivots[i] for i in best.pivot_positions]
+            is_valid, _, validation_msg = self.validate_impulse_wave(impulse_pivots)
+            confidence = best.confidence
+        else:
+            # تحديد الموجات
+            waves = self.identify_waves(pivots, trend)
+            
+            # التحقق من صحة الموجات
+            if len(waves) >= 5:
+                is_valid, confidence, validation_msg = self.validate_impulse_wave(pivots)
+            elif len(waves) >= 3:
+                is_valid, confidence, validation_msg = self.validate_corrective_wave(pivots)
+            else:
+                is_valid, confidence, validation_msg = False, 50, "موجات قيد التكوين"
+        
+        return waves, confidence, validation_msg, wave_counts
+    
+    def current_position(self, waves: List[Wave]) -> Tuple[str, str]:
+        """
+        تحديد الموجة الحالية والمتوقعة
+        """
+        if not waves:
+            return "غير محدد", "1"
+        
+        current_wave = waves[-1].number
+        wave_sequence = ['1', '2', '3', '4', '5', 'A', 'B', 'C']
+        try:
+            current_idx = wave_sequence.index(current_wave)
+            next_expected = wave_sequence[(current_idx + 1) % len(wave_sequence)]
+        except ValueError:
+            next_expected = "1"
+        
+        return current_wave, next_expected
+    
+    def analyze(self, df: BarsLike, lookback: int = 5) -> ElliottWaveResult:
         """
         التحليل الكامل لموجات إليوت
         """
+        bars = as_bars(df)
         # تحديد القمم والقيعان
-        highs, lows = self.find_pivots(df, lookback)
+        highs, lows = self.find_pivots(bars, lookback)
         pivots = self.merge_pivots(highs, lows)
         
         if len(pivots) < 3:
@@ -308,39 +640,21 @@ class ElliottWaveAnalyzer:
             )
         
         # تحديد الاتجاه العام
-        first_price = df['Close'].iloc[0]
-        last_price = df['Close'].iloc[-1]
+        first_price = bars.close[0]
+        last_price = bars.close[-1]
         trend = "صاعد" if last_price > first_price else "هابط"
         
-        # تحديد الموجات
-        waves = self.identify_waves(pivots, trend)
-        
-        # التحقق من صحة الموجات
-        if len(waves) >= 5:
-            is_valid, confidence, validation_msg = self.validate_impulse_wave(pivots)
-        elif len(waves) >= 3:
-            is_valid, confidence, validation_msg = self.validate_corrective_wave(pivots)
-        else:
-            is_valid, confidence, validation_msg = False, 50, "موجات قيد التكوين"
+        # تحديد الموجات والتحقق منها
+        waves, confidence, validation_msg, wave_counts = self.label_waves(pivots, trend)
         
         # تحديد الموجة الحالية والمتوقعة
-        if waves:
-            current_wave = waves[-1].number
-            wave_sequence = ['1', '2', '3', '4', '5', 'A', 'B', 'C']
-            try:
-                current_idx = wave_sequence.index(current_wave)
-                next_expected = wave_sequence[(current_idx + 1) % len(wave_sequence)]
-            except ValueError:
-                next_expected = "1"
-        else:
-            current_wave = "غير محدد"
-            next_expected = "1"
+        current_wave, next_expected = self.current_position(waves)
         
         # حساب مستويات فيبوناتشي
         fib_levels = self.calculate_fibonacci_targets(waves)
         
         # بناء نص التحليل
-        analysis_text = self._build_analysis_text(waves, trend, current_wave, next_expected, confidence, validation_msg, fib_levels)
+        analysis_text = self._build_analysis_text(waves, trend, current_wave, next_expected, confidence, validation_msg, fib_levels, wave_counts)
         
         # تحويل pivots للإخراج
         pivots_output = [{'index': p['index'], 'price': p['price'], 'type': p['type']} for p in pivots]
@@ -353,12 +667,78 @@ class ElliottWaveAnalyzer:
             confidence=confidence,
             pivots=pivots_output,
             fibonacci_levels=fib_levels,
-            analysis_text=analysis_text
+            analysis_text=analysis_text,
+            wave_counts=wave_counts
         )
     
+    def analyze_multi_degree(self, df: BarsLike, lookbacks: Tuple[int, ...] = (34, 13, 5, 3)) -> List[DegreeAnalysis]:
+        """
+        تحليل متعدد الدرجات (Fractal): من الدرجة الأعلى إلى الأدنى
+        - القمم والقيعان لكل الدرجات من هرم واحد مشترك
+        - عدّ كل درجة أدنى يتم داخل الموجة الحالية للدرجة الأعلى
+        """
+        bars = as_bars(df)
+        lookbacks = sorted(set(lookbacks), reverse=True)
+        pyramid = self.find_pivot_pyramid(bars, lookbacks)
+        
+        first_price = bars.close[0]
+        last_price = bars.close[-1]
+        trend = "صاعد" if last_price > first_price else "هابط"
+        
+        degrees = []
+        parent = None
+        
+        for lookback in lookbacks:
+            highs, lows = pyramid[lookback]
+            pivots = self.merge_pivots(highs, lows)
+            
+            # حصر العد داخل الموجة الحالية للدرجة الأعلى
+            if parent is not None and parent.waves:
+                parent_start = parent.waves[-1].start_idx
+                nested = [p for p in pivots if p['index'] >= parent_start]
+                if len(nested) >= 3:
+                    pivots = nested
+            
+            if len(pivots) < 3:
+                continue
+            
+            waves, confidence, _, _ = self.label_waves(pivots, trend)
+            current_wave, next_expected = self.current_position(waves)
+            
+            degree = DegreeAnalysis(
+                lookback=lookback,
+                waves=waves,
+                current_wave=current_wave,
+                next_expected=next_expected,
+                confidence=confidence,
+                parent_wave=parent.current_wave if parent is not None else None,
+                pivots=[{'index': p['index'], 'price': p['price'], 'type': p['type']} for p in pivots]
+            )
+            degrees.append(degree)
+            parent = degree
+        
+        return degrees
+    
+    def get_multi_degree_text(self, degrees: List[DegreeAnalysis]) -> str:
+        """
+        نص ملخص الموقع الحالي في كل درجة
+        """
+        text = "🌊 **موجات إليوت متعددة الدرجات**\n\n"
+        
+        if not degrees:
+            return text + "❌ بيانات غير كافية لتحليل موجات إليوت\n"
+        
+        for degree in degrees:
+            text += f"  • درجة {degree.lookback}: موجة {degree.current_wave} → {degree.next_expected}"
+            if degree.parent_wave:
+                text += f" (داخل موجة {degree.parent_wave})"
+            text += f" | ثقة {degree.confidence:.0f}%\n"
+        
+        return text
+    
     def _build_analysis_text(self, waves: List[Wave], trend: str, current_wave: str, 
                             next_expected: str, confidence: float, validation_msg: str,
-                            fib_levels: Dict[str, float]) -> str:
+                            fib_levels: Dict[str, float], wave_counts: Optional[List[WaveCount]] = None) -> str:
         """
         بناء نص التحليل الكامل
         """
@@ -381,6 +761,12 @@ class ElliottWaveAnalyzer:
         
         text += f"\n{validation_msg}\n"
         
+        # الترقيمات البديلة
+        if wave_counts and len(wave_counts) > 1:
+            text += "\n🔀 **ترقيمات بديلة:**\n"
+            for count in wave_counts[1:]:
+                text += f"  • {count.direction.value}: ثقة {count.confidence:.0f}%\n"
+        
         # مستويات فيبوناتشي
         if fib_levels:
             text += "\n📐 **مستويات فيبوناتشي:**\n"
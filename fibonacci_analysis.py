@@ -3,12 +3,13 @@ Fibonacci Analysis Engine
 Separate module for Fibonacci retracement and extension analysis
 """
 
-import pandas as pd
 import numpy as np
 from dataclasses import dataclass
 from typing import List, Tuple
 from enum import Enum
 
+from bars import BarsLike, as_bars, rolling_mean_last
+
 
 class FibLevel(Enum):
     """Fibonacci levels"""
@@ -47,12 +48,13 @@ class FibonacciAnalyzer:
         self.retracement_ratios = [0.0, 0.236, 0.382, 0.5, 0.618, 0.786, 1.0]
         self.extension_ratios = [1.0, 1.272, 1.618, 2.0, 2.618, 3.618]
     
-    def analyze(self, df: pd.DataFrame) -> FibonacciResult:
+    def analyze(self, df: BarsLike) -> FibonacciResult:
         """Perform Fibonacci analysis"""
+        bars = as_bars(df)
         
         # Find swing high and low
-        swing_high, swing_low, trend = self._find_swing_points(df)
-        current_price = df['Close'].iloc[-1]
+        swing_high, swing_low, trend = self._find_swing_points(bars)
+        current_price = bars.close[-1]
         
         # Calculate retracement levels
         retracement_levels = self._calculate_retracement(swing_high, swing_low, trend)
@@ -87,23 +89,24 @@ class FibonacciAnalyzer:
             stop_loss=stop_loss
         )
     
-    def _find_swing_points(self, df: pd.DataFrame) -> Tuple[float, float, str]:
+    def _find_swing_points(self, df: BarsLike) -> Tuple[float, float, str]:
         """Find major swing high and low"""
+        bars = as_bars(df)
         
         # Use last N candles to find swing points
-        lookback = min(len(df), 50)
-        recent_df = df.tail(lookback)
+        lookback = min(len(bars), 50)
+        recent = bars.tail(lookback)
         
-        swing_high = recent_df['High'].max()
-        swing_low = recent_df['Low'].min()
+        swing_high = np.nanmax(recent.high)
+        swing_low = np.nanmin(recent.low)
         
         # Determine trend based on price position
-        current_price = df['Close'].iloc[-1]
+        current_price = bars.close[-1]
         mid_point = (swing_high + swing_low) / 2
         
         # Also check recent momentum
-        sma_10 = df['Close'].rolling(10).mean().iloc[-1]
-        sma_20 = df['Close'].rolling(20).mean().iloc[-1]
+        sma_10 = rolling_mean_last(bars.close, 10)
+        sma_20 = rolling_mean_last(bars.close, 20)
         
         if current_price > mid_point and sma_10 > sma_20:
             trend = 'bullish'
@@ -111,7 +114,7 @@ class FibonacciAnalyzer:
             trend = 'bearish'
         else:
             # Use recent price action
-            trend = 'bullish' if df['Close'].iloc[-1] > df['Close'].iloc[-5] else 'bearish'
+            trend = 'bullish' if bars.close[-1] > bars.close[-5] else 'bearish'
         
         return swing_high, swing_low, trend
     
@@ -5,11 +5,13 @@ Gartley, Butterfly, Bat, Crab, Shark, Cypher
 """
 
 import numpy as np
-import pandas as pd
 from typing import List, Dict, Tuple, Optional
 from dataclasses import dataclass
 from enum import Enum
 
+from range_extremes import RangeExtremeIndex
+from bars import BarsLike, as_bars
+
 class HarmonicType(Enum):
     GARTLEY = "جارتلي"
     BUTTERFLY = "الفراشة"
@@ -90,21 +92,33 @@ class HarmonicAnalyzer:
         }
         
         self.tolerance = 0.05  # 5% tolerance
+        self.swing_lookback = 5  # عدد الشموع على كل جانب لتأكيد نقطة التأرجح
     
-    def find_swing_points(self, df: pd.DataFrame, lookback: int = 5) -> List[Tuple[int, float, str]]:
+    def find_swing_points(self, df: BarsLike, lookback: Optional[int] = None) -> List[Tuple[int, float, str]]:
         """
         إيجاد نقاط التأرجح (القمم والقيعان)
         """
         points = []
-        highs = df['High'].values
-        lows = df['Low'].values
+        bars = as_bars(df)
+        highs = bars.high
+        lows = bars.low
+        
+        if lookback is None:
+            lookback = self.swing_lookback
         
-        for i in range(lookback, len(df) - lookback):
+        candidates = np.arange(lookback, len(bars) - lookback)
+        is_high = np.zeros(len(bars), dtype=bool)
+        is_low = np.zeros(len(bars), dtype=bool)
+        if len(candidates):
+            is_high[candidates] = highs[candidates] == RangeExtremeIndex(highs).max_many(candidates - lookback, candidates + lookback + 1)
+            is_low[candidates] = lows[candidates] == RangeExtremeIndex(lows).min_many(candidates - lookback, candidates + lookback + 1)
+        
+        for i in np.flatnonzero(is_high | is_low):
             # قمة
-            if highs[i] == max(highs[i-lookback:i+lookback+1]):
+            if is_high[i]:
                 points.append((i, highs[i], 'high'))
             # قاع
-            if lows[i] == min(lows[i-lookback:i+lookback+1]):
+            if is_low[i]:
                 points.append((i, lows[i], 'low'))
         
         # ترتيب وتنظيف
@@ -465,12 +479,13 @@ class HarmonicAnalyzer:
         
         return patterns
     
-    def calculate_fibonacci_retracements(self, df: pd.DataFrame) -> Dict[str, float]:
+    def calculate_fibonacci_retracements(self, df: BarsLike) -> Dict[str, float]:
         """
         حساب مستويات فيبوناتشي
         """
-        high = df['High'].max()
-        low = df['Low'].min()
+        bars = as_bars(df)
+        high = np.nanmax(bars.high)
+        low = np.nanmin(bars.low)
         diff = high - low
         
         levels = {
@@ -487,12 +502,14 @@ class HarmonicAnalyzer:
         
         return levels
     
-    def analyze(self, df: pd.DataFrame) -> HarmonicAnalysisResult:
+    def analyze(self, df: BarsLike) -> HarmonicAnalysisResult:
         """
         التحليل التوافقي الكامل
         """
+        bars = as_bars(df)
+        
         # إيجاد نقاط التأرجح
-        points = self.find_swing_points(df)
+        points = self.find_swing_points(bars)
         
         # كشف الأنماط
         all_patterns = []
@@ -506,10 +523,10 @@ class HarmonicAnalyzer:
         all_patterns.sort(key=lambda x: x.confidence, reverse=True)
         
         # مستويات فيبوناتشي
-        fib_levels = self.calculate_fibonacci_retracements(df)
+        fib_levels = self.calculate_fibonacci_retracements(bars)
         
         # بناء نص التحليل
-        analysis_text = self._build_analysis_text(all_patterns, fib_levels, df['Close'].iloc[-1])
+        analysis_text = self._build_analysis_text(all_patterns, fib_levels, bars.close[-1])
         
         return HarmonicAnalysisResult(
             patterns=all_patterns[:5],  # أفضل 5 أنماط
@@ -5,10 +5,11 @@ Order Blocks, Fair Value Gaps, Liquidity, Market Structure
 """
 
 import numpy as np
-import pandas as pd
 from typing import List, Dict, Tuple, Optional
 from dataclasses import dataclass
 from enum import Enum
+from range_extremes import RangeExtremeIndex
+from bars import BarsLike, as_bars
 
 class OrderBlockType(Enum):
     BULLISH = "صاعد"
@@ -77,19 +78,36 @@ class ICTAnalyzer:
     """محلل مدرسة ICT"""
     
     def __init__(self):
-        pass
+        self.swing_lookback = 3  # عدد الشموع على كل جانب لتأكيد نقطة التأرجح
     
-    def identify_swing_points(self, df: pd.DataFrame, lookback: int = 3) -> List[Dict]:
+    def identify_swing_points(self, df: BarsLike, lookback: Optional[int] = None,
+                              high_index: Optional[RangeExtremeIndex] = None,
+                              low_index: Optional[RangeExtremeIndex] = None) -> List[Dict]:
         """
         تحديد نقاط التأرجح (Swing Highs & Lows)
         """
+        bars = as_bars(df)
         swings = []
-        highs = df['High'].values
-        lows = df['Low'].values
-        
-        for i in range(lookback, len(df) - lookback):
+        highs = bars.high
+        lows = bars.low
+        
+        if lookback is None:
+            lookback = self.swing_lookback
+        if high_index is None:
+            high_index = RangeExtremeIndex(highs)
+        if low_index is None:
+            low_index = RangeExtremeIndex(lows)
+        
+        candidates = np.arange(lookback, len(bars) - lookback)
+        is_high = np.zeros(len(bars), dtype=bool)
+        is_low = np.zeros(len(bars), dtype=bool)
+        if len(candidates):
+            is_high[candidates] = highs[candidates] == high_index.max_many(candidates - lookback, candidates + lookback + 1)
+            is_low[candidates] = lows[candidates] == low_index.min_many(candidates - lookback, candidates + lookback + 1)
+        
+        for i in np.flatnonzero(is_high | is_low):
             # Swing High
-            if highs[i] == max(highs[i-lookback:i+lookback+1]):
+            if is_high[i]:
                 swings.append({
                     'type': 'high',
                     'price': highs[i],
@@ -97,7 +115,7 @@ class ICTAnalyzer:
                 })
             
             # Swing Low
-            if lows[i] == min(lows[i-lookback:i+lookback+1]):
+            if is_low[i]:
                 swings.append({
                     'type': 'low',
                     'price': lows[i],
@@ -191,18 +209,26 @@ class ICTAnalyzer:
         
         return structure, structure_points, breaks
     
-    def find_order_blocks(self, df: pd.DataFrame, swings: List[Dict]) -> List[OrderBlock]:
+    def find_order_blocks(self, df: BarsLike, swings: List[Dict],
+                          high_index: Optional[RangeExtremeIndex] = None,
+                          low_index: Optional[RangeExtremeIndex] = None) -> List[OrderBlock]:
         """
         إيجاد Order Blocks
         Bullish OB: آخر شمعة هابطة قبل حركة صعودية قوية
         Bearish OB: آخر شمعة صاعدة قبل حركة هبوطية قوية
         """
+        bars = as_bars(df)
         order_blocks = []
         
-        opens = df['Open'].values
-        closes = df['Close'].values
-        highs = df['High'].values
-        lows = df['Low'].values
+        opens = bars.open
+        closes = bars.close
+        highs = bars.high
+        lows = bars.low
+        
+        if high_index is None:
+            high_index = RangeExtremeIndex(highs)
+        if low_index is None:
+            low_index = RangeExtremeIndex(lows)
         
         # البحث عن Bullish Order Blocks
         for swing in swings:
@@ -213,13 +239,13 @@ class ICTAnalyzer:
                 for i in range(idx - 1, max(0, idx - 5), -1):
                     if closes[i] < opens[i]:  # شمعة هابطة
                         # التحقق من قوة الحركة بعدها
-                        if idx + 3 < len(df):
-                            move_up = highs[idx:idx+3].max() - lows[idx]
+                        if idx + 3 < len(bars):
+                            move_up = high_index.max(idx, idx + 3) - lows[idx]
                             candle_range = highs[i] - lows[i]
                             
                             if move_up > candle_range * 2:  # حركة قوية
                                 # التحقق من عدم الاختبار
-                                mitigated = any(lows[idx+1:] < lows[i]) if idx + 1 < len(df) else False
+                                mitigated = bool(low_index.min(idx + 1) < lows[i]) if idx + 1 < len(bars) else False
                                 
                                 order_blocks.append(OrderBlock(
                                     ob_type=OrderBlockType.BULLISH,
@@ -240,12 +266,12 @@ class ICTAnalyzer:
                 
                 for i in range(idx - 1, max(0, idx - 5), -1):
                     if closes[i] > opens[i]:  # شمعة صاعدة
-                        if idx + 3 < len(df):
-                            move_down = highs[idx] - lows[idx:idx+3].min()
+                        if idx + 3 < len(bars):
+                            move_down = highs[idx] - low_index.min(idx, idx + 3)
                             candle_range = highs[i] - lows[i]
                             
                             if move_down > candle_range * 2:
-                                mitigated = any(highs[idx+1:] > highs[i]) if idx + 1 < len(df) else False
+                                mitigated = bool(high_index.max(idx + 1) > highs[i]) if idx + 1 < len(bars) else False
                                 
                                 order_blocks.append(OrderBlock(
                                     ob_type=OrderBlockType.BEARISH,
@@ -264,28 +290,43 @@ class ICTAnalyzer:
         
         return order_blocks[:10]  # أقوى 10
     
-    def find_fair_value_gaps(self, df: pd.DataFrame) -> List[FairValueGap]:
+    def find_fair_value_gaps(self, df: BarsLike,
+                             high_index: Optional[RangeExtremeIndex] = None,
+                             low_index: Optional[RangeExtremeIndex] = None) -> List[FairValueGap]:
         """
         إيجاد Fair Value Gaps (FVG)
         Bullish FVG: فجوة بين low الشمعة الثالثة و high الشمعة الأولى
         Bearish FVG: فجوة بين high الشمعة الثالثة و low الشمعة الأولى
         """
+        bars = as_bars(df)
         fvgs = []
         
-        highs = df['High'].values
-        lows = df['Low'].values
+        highs = bars.high
+        lows = bars.low
+        
+        if high_index is None:
+            high_index = RangeExtremeIndex(highs)
+        if low_index is None:
+            low_index = RangeExtremeIndex(lows)
+        
+        # الشموع المرشحة فقط بدلاً من المرور على كل الشموع
+        bullish_gap = np.zeros(len(bars), dtype=bool)
+        bearish_gap = np.zeros(len(bars), dtype=bool)
+        if len(bars) > 2:
+            bullish_gap[2:] = lows[2:] > highs[:-2]
+            bearish_gap[2:] = highs[2:] < lows[:-2]
         
-        for i in range(2, len(df)):
+        for i in np.flatnonzero(bullish_gap | bearish_gap):
             # Bullish FVG
-            if lows[i] > highs[i-2]:
+            if bullish_gap[i]:
                 gap_high = lows[i]
                 gap_low = highs[i-2]
                 
                 # التحقق من الملء
                 filled = False
                 fill_pct = 0
-                if i + 1 < len(df):
-                    lowest_after = lows[i+1:].min() if len(lows[i+1:]) > 0 else gap_high
+                if i + 1 < len(bars):
+                    lowest_after = low_index.min(i + 1)
                     if lowest_after <= gap_low:
                         filled = True
                         fill_pct = 100
@@ -303,14 +344,14 @@ class ICTAnalyzer:
                 ))
             
             # Bearish FVG
-            if highs[i] < lows[i-2]:
+            if bearish_gap[i]:
                 gap_high = lows[i-2]
                 gap_low = highs[i]
                 
                 filled = False
                 fill_pct = 0
-                if i + 1 < len(df):
-                    highest_after = highs[i+1:].max() if len(highs[i+1:]) > 0 else gap_low
+                if i + 1 < len(bars):
+                    highest_after = high_index.max(i + 1)
                     if highest_after >= gap_high:
                         filled = True
                         fill_pct = 100
@@ -332,15 +373,16 @@ class ICTAnalyzer:
         
         return fvgs[:10]
     
-    def find_liquidity_zones(self, df: pd.DataFrame, swings: List[Dict]) -> List[LiquidityZone]:
+    def find_liquidity_zones(self, df: BarsLike, swings: List[Dict]) -> List[LiquidityZone]:
         """
         إيجاد مناطق السيولة (Liquidity)
         Buy-side liquidity: فوق القمم (stop losses للبائعين)
         Sell-side liquidity: تحت القيعان (stop losses للمشترين)
         """
+        bars = as_bars(df)
         liquidity_zones = []
         
-        current_price = df['Close'].iloc[-1]
+        current_price = bars.close[-1]
         
         # تجميع القمم المتقاربة (Buy-side liquidity)
         highs = [s for s in swings if s['type'] == 'high']
@@ -391,13 +433,14 @@ class ICTAnalyzer:
         
         return liquidity_zones[:10]
     
-    def calculate_premium_discount(self, df: pd.DataFrame) -> Tuple[str, Dict]:
+    def calculate_premium_discount(self, df: BarsLike) -> Tuple[str, Dict]:
         """
         حساب منطقة Premium/Discount
         """
-        high = df['High'].max()
-        low = df['Low'].min()
-        current = df['Close'].iloc[-1]
+        bars = as_bars(df)
+        high = np.nanmax(bars.high)
+        low = np.nanmin(bars.low)
+        current = bars.close[-1]
         
         range_size = high - low
         equilibrium = low + (range_size * 0.5)
@@ -423,12 +466,24 @@ class ICTAnalyzer:
         
         return zone, levels
     
-    def find_optimal_trade_entry(self, df: pd.DataFrame, structure: MarketStructure, 
-                                  order_blocks: List[OrderBlock], fvgs: List[FairValueGap]) -> Dict:
+    def find_optimal_trade_entry(self, df: BarsLike, structure: MarketStructure, 
+                                  order_blocks: List[OrderBlock], fvgs: List[FairValueGap],
+                                  high_index: Optional[RangeExtremeIndex] = None,
+                                  low_index: Optional[RangeExtremeIndex] = None) -> Dict:
         """
         إيجاد نقطة الدخول المثلى (OTE - Optimal Trade Entry)
         """
-        current_price = df['Close'].iloc[-1]
+        bars = as_bars(df)
+        current_price = bars.close[-1]
+        
+        if high_index is None:
+            high_index = RangeExtremeIndex(bars.high)
+        if low_index is None:
+            low_index = RangeExtremeIndex(bars.low)
+        
+        # أعلى قمة وأدنى قاع في آخر 20 شمعة
+        recent_high = high_index.max(-20)
+        recent_low = low_index.min(-20)
         
         ote = {
             'direction': None,
@@ -455,9 +510,8 @@ class ICTAnalyzer:
                 ote['confluence'].append(f"FVG صاعد عند ${bullish_fvgs[0].low:.2f}")
             
             # الأهداف
-            recent_high = df['High'].tail(20).max()
             ote['targets'] = [
-                current_price + (current_price - df['Low'].tail(20).min()) * 0.5,
+                current_price + (current_price - recent_low) * 0.5,
                 recent_high,
                 recent_high * 1.02
             ]
@@ -476,44 +530,49 @@ class ICTAnalyzer:
             if bearish_fvgs:
                 ote['confluence'].append(f"FVG هابط عند ${bearish_fvgs[0].high:.2f}")
             
-            recent_low = df['Low'].tail(20).min()
             ote['targets'] = [
-                current_price - (df['High'].tail(20).max() - current_price) * 0.5,
+                current_price - (recent_high - current_price) * 0.5,
                 recent_low,
                 recent_low * 0.98
             ]
         
         return ote
     
-    def analyze(self, df: pd.DataFrame) -> ICTAnalysisResult:
+    def analyze(self, df: BarsLike) -> ICTAnalysisResult:
         """
         التحليل الكامل بمدرسة ICT
         """
+        bars = as_bars(df)
+        # فهرس القمم والقيعان المشترك لكل عمليات البحث في النوافذ
+        high_index = RangeExtremeIndex(bars.high)
+        low_index = RangeExtremeIndex(bars.low)
+        
         # نقاط التأرجح
-        swings = self.identify_swing_points(df)
+        swings = self.identify_swing_points(bars, high_index=high_index, low_index=low_index)
         
         # هيكل السوق
         structure, structure_points, breaks = self.analyze_market_structure(swings)
         
         # Order Blocks
-        order_blocks = self.find_order_blocks(df, swings)
+        order_blocks = self.find_order_blocks(bars, swings, high_index=high_index, low_index=low_index)
         
         # Fair Value Gaps
-        fvgs = self.find_fair_value_gaps(df)
+        fvgs = self.find_fair_value_gaps(bars, high_index=high_index, low_index=low_index)
         
         # Liquidity Zones
-        liquidity = self.find_liquidity_zones(df, swings)
+        liquidity = self.find_liquidity_zones(bars, swings)
         
         # Premium/Discount
-        pd_zone, pd_levels = self.calculate_premium_discount(df)
+        pd_zone, pd_levels = self.calculate_premium_discount(bars)
         
         # Optimal Trade Entry
-        ote = self.find_optimal_trade_entry(df, structure, order_blocks, fvgs)
+        ote = self.find_optimal_trade_entry(bars, structure, order_blocks, fvgs,
+                                            high_index=high_index, low_index=low_index)
         
         # بناء نص التحليل
         analysis_text = self._build_analysis_text(
             structure, structure_points, breaks, order_blocks, 
-            fvgs, liquidity, pd_zone, pd_levels, ote, df['Close'].iloc[-1]
+            fvgs, liquidity, pd_zone, pd_levels, ote, bars.close[-1]
         )
         
         return ICTAnalysisResult(
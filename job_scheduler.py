@@ -0,0 +1,246 @@
+"""
+Job Scheduler
+Bounded priority queue between the handlers and the chart pipeline: at most
+one job per user (a newer click replaces the queued one and cancels the
+running one), a fixed number of jobs in flight and a backpressure answer
+when the queue is full
+"""
+
+import time
+import heapq
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from cancellation import CancelToken
+
+logger = logging.getLogger(__name__)
+
+# Head start in seconds: jobs run in order of submit time + slack, so admin requests and
+# quick analyses go first, but a full analysis / multi-chart job is only ever passed by work
+# submitted at most the slack difference after it (no starvation under bursts)
+PRIORITIES = {'admin': 0.0, 'quick': 2.0, 'full': 5.0}
+
+
+@dataclass
+class Job:
+    user_id: int
+    priority: str
+    factory: Callable[[CancelToken], Awaitable]  # creates the coroutine when the job starts
+    on_drop: Optional[Callable[[], Awaitable]] = None  # awaited if a newer job replaces it in the queue
+    submitted: float = field(default_factory=time.perf_counter)
+    deadline: float = 0.0  # submit time + priority slack, the queue order
+    status: str = 'queued'  # queued / running / done / cancelled / replaced / rejected / failed
+    position: int = 0  # jobs ahead of this one when it was queued
+    wait: float = 0.0  # seconds spent queued
+    task: Optional[asyncio.Task] = None
+    token: Optional[CancelToken] = None  # checked by every stage while the job runs
+    finished: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+class JobScheduler:
+    """
+    `concurrency` jobs run at once; up to `max_queued` more wait in deadline
+    order (FIFO within a class). A job whose estimated wait exceeds `max_wait`
+    is rejected up front instead of adding to everyone's latency. Admin jobs
+    are never rejected.
+    """
+    
+    def __init__(self, concurrency: int = 2, max_queued: int = 20, max_wait: Optional[float] = None,
+                 metrics=None):
+        self.concurrency = concurrency
+        self.max_queued = max_queued
+        self.max_wait = max_wait  # seconds
+        self.metrics = metrics
+        self.service_time: Optional[float] = None  # moving average of job run time
+        self.drain_time: Optional[float] = None  # moving average of queue wait per job ahead
+        self._heap: List[Tuple[float, int, Job]] = []
+        self._seq = 0
+        self._queued: Dict[int, Job] = {}  # user -> waiting job
+        self._running: Dict[int, Job] = {}  # user -> running job
+        self._ready: Optional[asyncio.Condition] = None
+        self._workers: List[asyncio.Task] = []
+        self._closing = False
+    
+    # ---------- state ----------
+    
+    @property
+    def depth(self) -> int:
+        return len(self._queued)
+    
+    @property
+    def running(self) -> int:
+        return len(self._running)
+    
+    def current(self, user_id: int) -> Optional[Job]:
+        """The user's queued job, else the running one"""
+        return self._queued.get(user_id) or self._running.get(user_id)
+    
+    def _update_gauges(self):
+        if self.metrics is not None:
+            self.metrics.set_gauge('queue_depth', self.depth)
+            self.metrics.set_gauge('jobs_running', self.running)
+    
+    def estimated_wait(self, ahead: int) -> float:
+        """Seconds until a job with `ahead` jobs in front of it starts"""
+        # Observed waits include everything that slows the queue down, run time alone does not
+        if self.drain_time is not None:
+            return ahead * self.drain_time
+        if self.service_time is not None:
+            return ahead * self.service_time / self.concurrency
+        return 0.0
+    
+    def _count(self, name: str):
+        if self.metrics is not None:
+            self.metrics.increment(name)
+    
+    # ---------- submit ----------
+    
+    async def submit(self, user_id: int, priority: str, factory: Callable[[CancelToken], Awaitable],
+                     on_drop: Optional[Callable[[], Awaitable]] = None) -> Job:
+        """
+        Queue a job for the user. The returned job's status is 'queued' or
+        'rejected' (queue full); `position` is how many jobs are ahead of it
+        """
+        self._start_workers()
+        job = Job(user_id=user_id, priority=priority, factory=factory, on_drop=on_drop)
+        
+        # The user's own queued job is replaced, so it does not count against the bound
+        others = [j for j in self._queued.values() if j.user_id != user_id]
+        running = self._running.get(user_id)
+        deadline = job.submitted + PRIORITIES.get(priority, max(PRIORITIES.values()))
+        ahead = sum(1 for j in others if j.deadline <= deadline)
+        # The user's own running job is cancelled and frees its slot
+        busy = len(self._running) - (1 if running is not None else 0) >= self.concurrency
+        job.position = ahead + (1 if busy else 0)
+        
+        if priority != 'admin' and (len(others) >= self.max_queued or
+                                    (self.max_wait is not None and self.estimated_wait(job.position) > self.max_wait)):
+            # Rejected: whatever the user already has queued or running carries on
+            job.status = 'rejected'
+            job.finished.set()
+            self._count('jobs_rejected')
+            return job
+        
+        replaced = self._queued.pop(user_id, None)
+        if replaced is not None:
+            replaced.status = 'replaced'
+            replaced.finished.set()
+            self._count('jobs_replaced')
+            if replaced.on_drop is not None:
+                try:
+                    await replaced.on_drop()
+                except Exception as e:
+                    logger.debug(f"Drop notice failed: {e}")
+        
+        if running is not None:
+            self._cancel(running)
+        
+        self._seq += 1
+        job.deadline = deadline
+        heapq.heappush(self._heap, (deadline, self._seq, job))
+        self._queued[user_id] = job
+        self._count('jobs_submitted')
+        self._update_gauges()
+        async with self._ready:
+            self._ready.notify()
+        return job
+    
+    def _cancel(self, job: Job):
+        # The token stops work already handed to threads / processes, the task cancel the coroutine
+        if job.token is not None:
+            job.token.cancel()
+        if job.task is not None and not job.task.done():
+            job.task.cancel()
+    
+    # ---------- workers ----------
+    
+    def _start_workers(self):
+        if self._workers:
+            return
+        self._ready = asyncio.Condition()
+        self._workers = [asyncio.get_running_loop().create_task(self._worker())
+                         for _ in range(self.concurrency)]
+    
+    async def _next(self) -> Job:
+        async with self._ready:
+            while True:
+                while self._heap:
+                    _, _, job = heapq.heappop(self._heap)
+                    if job.status == 'queued':  # replaced jobs stay in the heap until popped
+                        return job
+                await self._ready.wait()
+    
+    async def _worker(self):
+        while True:
+            job = await self._next()
+            del self._queued[job.user_id]
+            
+            # A cancelled predecessor finishes its cleanup first, so a user never has two jobs running
+            previous = self._running.get(job.user_id)
+            if previous is not None:
+                await previous.finished.wait()
+                if job.user_id in self._queued:
+                    # An even newer click arrived meanwhile
+                    job.status = 'replaced'
+                    job.finished.set()
+                    continue
+            
+            job.wait = time.perf_counter() - job.submitted
+            if job.position > 0:
+                per_job = job.wait / job.position
+                self.drain_time = per_job if self.drain_time is None else 0.8 * self.drain_time + 0.2 * per_job
+            if self.metrics is not None:
+                self.metrics.observe('queue_wait', job.wait, priority=job.priority)
+            
+            job.status = 'running'
+            self._running[job.user_id] = job
+            self._update_gauges()
+            job.token = CancelToken()
+            job.task = asyncio.get_running_loop().create_task(job.factory(job.token))
+            started = time.perf_counter()
+            try:
+                await job.task
+                job.status = 'done'
+                elapsed = time.perf_counter() - started
+                self.service_time = elapsed if self.service_time is None else 0.8 * self.service_time + 0.2 * elapsed
+            except asyncio.CancelledError:
+                job.status = 'cancelled'
+                if self._closing:
+                    raise
+            except Exception as e:
+                job.status = 'failed'
+                logger.error(f"Job for {job.user_id} failed: {e}")
+            finally:
+                if self._running.get(job.user_id) is job:
+                    del self._running[job.user_id]
+                job.token.release()
+                job.finished.set()
+                self._update_gauges()
+    
+    async def drain(self, timeout: float) -> bool:
+        """Wait up to `timeout` seconds for queued and running jobs; True if all finished"""
+        deadline = time.perf_counter() + timeout
+        while self._queued or self._running:
+            if time.perf_counter() >= deadline:
+                return False
+            await asyncio.sleep(0.1)
+        return True
+    
+    async def shutdown(self):
+        """Cancel running jobs and workers; queued jobs are dropped"""
+        self._closing = True
+        for job in list(self._running.values()):
+            self._cancel(job)
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        for job in self._queued.values():
+            job.status = 'cancelled'
+            job.finished.set()
+        self._queued.clear()
+        self._heap.clear()
+        self._workers = []
+        self._closing = False
+        self._update_gauges()
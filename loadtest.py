@@ -0,0 +1,447 @@
+"""
+Offline Load Test
+Drives the real bot handlers (handle_symbol, handle_timeframe,
+handle_chart_request) with synthetic updates, a recording fake bot and a
+local replay data source instead of yfinance. Ramps up virtual users with
+realistic click sequences and reports throughput, latency percentiles and
+event-loop lag per concurrency level.
+
+    python loadtest.py [--users 1,2,4,8] [--duration 60] [--think 1.0] [--slo 10]
+    python loadtest.py --record AAPL,MSFT --replay-dir replay   (saves real bars once, needs network)
+"""
+
+import os
+import json
+import time
+import zlib
+import random
+import asyncio
+import logging
+import argparse
+import threading
+import matplotlib
+matplotlib.use('Agg')
+import pandas as pd
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+
+import bot
+from benchmarks import synthetic_ohlcv, REGIMES
+from metrics import LatencyHistogram
+
+SYMBOLS = ['AAPL', 'MSFT', 'NVDA', 'TSLA', 'AMZN', 'META', 'GOOGL', 'SPY']
+
+# Bars a direct download of each timeframe's period returns (US session)
+REPLAY_BARS = {'5m': 156, '7m': 234, '10m': 156, '15m': 130, '30m': 130, '1h': 147, '4h': 126, '1d': 126}
+
+# (callback suffix, weight) - what users pick after choosing a timeframe
+CHART_CHOICES = [('all', 30), ('classic', 20), ('elliott', 12), ('ict', 12),
+                 ('harmonic', 8), ('fibonacci', 10), ('volume', 8)]
+TIMEFRAME_CHOICES = [('1d', 35), ('1h', 20), ('4h', 15), ('15m', 12), ('5m', 8), ('30m', 10)]
+
+USER_ID_BASE = 900000
+
+
+# ============================================
+# REPLAY DATA SOURCE
+# ============================================
+
+class ReplayDataSource:
+    """
+    get_stock_data / get_stock_info replacements serving bars from
+    `{directory}/{SYMBOL}_{timeframe}.csv` when recorded, otherwise a
+    deterministic synthetic series per symbol. `latency` (min, max seconds)
+    is slept in the calling thread to stand in for the network.
+    """
+    
+    def __init__(self, directory: Optional[str] = None, latency: Tuple[float, float] = (0.05, 0.3), seed: int = 0):
+        self.directory = directory
+        self.latency = latency
+        self.seed = seed
+        self._frames: Dict[Tuple[str, str], pd.DataFrame] = {}
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self.calls = 0
+    
+    def _sleep(self):
+        with self._lock:
+            delay = self._rng.uniform(*self.latency)
+            self.calls += 1
+        if delay > 0:
+            time.sleep(delay)
+    
+    def _frame(self, symbol: str, timeframe: str) -> pd.DataFrame:
+        key = (symbol, timeframe)
+        with self._lock:
+            df = self._frames.get(key)
+        if df is not None:
+            return df
+        
+        path = os.path.join(self.directory, f"{symbol}_{timeframe}.csv") if self.directory else None
+        if path and os.path.exists(path):
+            df = pd.read_csv(path)
+        else:
+            symbol_seed = zlib.crc32(f"{symbol}:{timeframe}:{self.seed}".encode())
+            regime = REGIMES[zlib.crc32(symbol.encode()) % len(REGIMES)]
+            df = synthetic_ohlcv(REPLAY_BARS.get(timeframe, 126), regime, seed=symbol_seed)
+        with self._lock:
+            self._frames[key] = df
+        return df
+    
+    def get_stock_data(self, symbol: str, timeframe: str) -> pd.DataFrame:
+        self._sleep()
+        return self._frame(symbol, timeframe).copy()
+    
+    def get_stock_info(self, symbol: str) -> dict:
+        self._sleep()
+        close = self._frame(symbol, '1d')['Close']
+        return {
+            'name': f"{symbol} (replay)",
+            'price': float(close.iloc[-1]),
+            'change': float((close.iloc[-1] / close.iloc[-2] - 1) * 100),
+            'volume': 0,
+        }
+
+
+def record_replay(symbols: List[str], directory: str, timeframes=None):
+    """Save real bars through the bot's own fetcher so later runs can replay them offline"""
+    os.makedirs(directory, exist_ok=True)
+    for symbol in symbols:
+        for timeframe in timeframes or bot.TIMEFRAMES:
+            df = bot.get_stock_data(symbol, timeframe)
+            if not df.empty:
+                df.to_csv(os.path.join(directory, f"{symbol}_{timeframe}.csv"), index=False)
+                print(f"{symbol} {timeframe}: {len(df)} bars")
+
+
+# ============================================
+# FAKE TELEGRAM OBJECTS
+# ============================================
+
+class FakeBot:
+    """Records every outgoing call with its time instead of talking to Telegram"""
+    
+    def __init__(self):
+        self.events: List[Tuple[float, int, str, str]] = []  # (time, chat_id, method, text)
+        self._next_message_id = 1
+    
+    def record(self, chat_id: int, method: str, text: str = ''):
+        self.events.append((time.perf_counter(), chat_id, method, text or ''))
+    
+    def new_message(self, chat_id: int, text: str = '') -> 'FakeMessage':
+        self._next_message_id += 1
+        return FakeMessage(self, chat_id, self._next_message_id, text)
+    
+    async def send_message(self, chat_id, text, **kwargs):
+        self.record(chat_id, 'send_message', text)
+        return self.new_message(chat_id, text)
+    
+    async def send_photo(self, chat_id, photo, caption=None, **kwargs):
+        self.record(chat_id, 'send_photo', caption)
+        return self.new_message(chat_id)
+    
+    async def send_document(self, chat_id, document, caption=None, **kwargs):
+        self.record(chat_id, 'send_document', caption)
+        return self.new_message(chat_id)
+
+
+class FakeMessage:
+    def __init__(self, fake_bot: FakeBot, chat_id: int, message_id: int, text: str = ''):
+        self._bot = fake_bot
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.text = text
+    
+    async def reply_text(self, text, **kwargs):
+        self._bot.record(self.chat_id, 'reply_text', text)
+        return self._bot.new_message(self.chat_id, text)
+    
+    async def reply_document(self, document, **kwargs):
+        self._bot.record(self.chat_id, 'reply_document')
+        return self._bot.new_message(self.chat_id)
+    
+    async def edit_text(self, text, **kwargs):
+        self._bot.record(self.chat_id, 'edit_message_text', text)
+        self.text = text
+        return self
+    
+    async def delete(self):
+        self._bot.record(self.chat_id, 'delete_message')
+        return True
+
+
+class FakeCallbackQuery:
+    def __init__(self, fake_bot: FakeBot, user, message: FakeMessage, data: str):
+        self._bot = fake_bot
+        self.from_user = user
+        self.message = message
+        self.data = data
+    
+    async def answer(self, *args, **kwargs):
+        self._bot.record(self.message.chat_id, 'answer_callback_query')
+        return True
+    
+    async def edit_message_text(self, text, **kwargs):
+        return await self.message.edit_text(text, **kwargs)
+
+
+class FakeApplication:
+    def create_task(self, coroutine, update=None, **kwargs):
+        return asyncio.get_running_loop().create_task(coroutine)
+
+
+def make_user(user_id: int):
+    return SimpleNamespace(id=user_id, full_name=f"Load User {user_id}", username=f"load{user_id}")
+
+
+def make_context(fake_bot: FakeBot, application: FakeApplication):
+    return SimpleNamespace(bot=fake_bot, application=application, args=[])
+
+
+# ============================================
+# VIRTUAL USERS
+# ============================================
+
+@dataclass
+class LevelStats:
+    users: int
+    elapsed: float = 0.0
+    actions: Dict[str, LatencyHistogram] = field(default_factory=lambda: {
+        name: LatencyHistogram() for name in ('symbol', 'timeframe', 'chart_first', 'chart_total')})
+    loop_lag: LatencyHistogram = field(default_factory=LatencyHistogram)
+    charts: int = 0
+    cancelled: int = 0
+    rejected: int = 0
+    errors: int = 0
+    
+    @property
+    def charts_per_minute(self) -> float:
+        return self.charts / self.elapsed * 60 if self.elapsed else 0.0
+
+
+def weighted(rng: random.Random, choices):
+    return rng.choices([c for c, _ in choices], weights=[w for _, w in choices])[0]
+
+
+class VirtualUser:
+    """
+    One chat session: type a symbol, pick a timeframe, request charts,
+    sometimes hammer Refresh before the chart arrives, then move on
+    """
+    
+    def __init__(self, user_id: int, fake_bot: FakeBot, context, stats: LevelStats,
+                 rng: random.Random, think: float = 1.0, impatience: float = 0.1):
+        self.user = make_user(user_id)
+        self.chat_id = user_id
+        self.bot = fake_bot
+        self.context = context
+        self.stats = stats
+        self.rng = rng
+        self.think = think  # think-time scale, 0 = click as fast as possible
+        self.impatience = impatience  # chance of re-clicking while a chart is rendering
+        self.message: Optional[FakeMessage] = None
+    
+    async def pause(self, low: float, high: float):
+        if self.think > 0:
+            await asyncio.sleep(self.rng.uniform(low, high) * self.think)
+    
+    def _events_since(self, start: float):
+        return [e for e in self.bot.events if e[0] >= start and e[1] == self.chat_id]
+    
+    async def send_symbol(self, symbol: str):
+        message = self.bot.new_message(self.chat_id, symbol)
+        update = SimpleNamespace(effective_user=self.user, message=message, callback_query=None)
+        start = time.perf_counter()
+        await bot.handle_symbol(update, self.context)
+        self.stats.actions['symbol'].record(time.perf_counter() - start)
+        # The keyboard lives on the bot's reply; later clicks come from that message
+        self.message = self.bot.new_message(self.chat_id)
+    
+    def _query(self, data: str):
+        query = FakeCallbackQuery(self.bot, self.user, self.message, data)
+        return SimpleNamespace(effective_user=self.user, callback_query=query, message=None)
+    
+    async def click_timeframe(self, data: str):
+        start = time.perf_counter()
+        await bot.handle_timeframe(self._query(data), self.context)
+        self.stats.actions['timeframe'].record(time.perf_counter() - start)
+    
+    async def click_chart(self, data: str):
+        """Click a chart button and wait for the photo (or for a newer click to replace it)"""
+        handler = bot.handle_timeframe if data.startswith('quick_') else bot.handle_chart_request
+        start = time.perf_counter()
+        await handler(self._query(data), self.context)
+        job = bot.job_scheduler.current(self.user.id)
+        if job is None:
+            return
+        
+        if self.rng.random() < self.impatience:
+            # Impatient re-click: the pending job is superseded
+            await self.pause(0.3, 1.0)
+            if not job.finished.is_set():
+                start = time.perf_counter()
+                await handler(self._query(data), self.context)
+                job = bot.job_scheduler.current(self.user.id) or job
+        
+        await job.finished.wait()
+        if job.status != 'done':
+            return
+        
+        events = self._events_since(start)
+        for t, _, method, text in events:
+            # Queue notices and the fetch placeholder are not a response yet
+            if method == 'edit_message_text' and not text.startswith('⏳'):
+                self.stats.actions['chart_first'].record(t - start)
+                break
+        delivered = [t for t, _, method, _ in events if method in ('send_photo', 'send_document')]
+        if delivered:
+            self.stats.actions['chart_total'].record(delivered[0] - start)
+            self.stats.charts += 1
+        if any(text.startswith('❌') for _, _, _, text in events):
+            self.stats.errors += 1
+    
+    async def run(self, deadline: float, symbols: List[str]):
+        while time.perf_counter() < deadline:
+            symbol = self.rng.choice(symbols)
+            await self.send_symbol(symbol)
+            await self.pause(1, 4)
+            
+            if self.rng.random() < 0.15:
+                await self.click_chart(f"quick_{symbol}")
+            else:
+                timeframe = weighted(self.rng, TIMEFRAME_CHOICES)
+                await self.click_timeframe(f"tf_{timeframe}_{symbol}")
+                # A few charts on the same symbol before moving on
+                for _ in range(self.rng.randint(1, 3)):
+                    if time.perf_counter() >= deadline:
+                        break
+                    await self.pause(1, 3)
+                    await self.click_chart(f"chart_{weighted(self.rng, CHART_CHOICES)}_{symbol}_{timeframe}")
+                    await self.pause(2, 6)
+            await self.pause(3, 8)
+
+
+async def monitor_loop_lag(histogram: LatencyHistogram, stop: asyncio.Event, interval: float = 0.02):
+    """How late a short sleep wakes up: time the loop spent blocked by handlers"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        histogram.record(max(0.0, time.perf_counter() - start - interval))
+
+
+async def run_level(users: int, duration: float, ramp: float, think: float, symbols: List[str],
+                    seed: int = 0) -> LevelStats:
+    fake_bot = FakeBot()
+    context = make_context(fake_bot, FakeApplication())
+    stats = LevelStats(users=users)
+    bot.user_states.clear()
+    bot.last_charts.clear()
+    
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(monitor_loop_lag(stats.loop_lag, stop))
+    started = time.perf_counter()
+    deadline = started + duration
+    
+    async def session(k: int):
+        rng = random.Random(seed * 1000 + k)
+        await asyncio.sleep(ramp * k / users)  # staggered arrival
+        user_id = USER_ID_BASE + k
+        bot.approved_users.add(user_id)
+        await VirtualUser(user_id, fake_bot, context, stats, rng, think).run(deadline, symbols)
+    
+    await asyncio.gather(*(session(k) for k in range(users)))
+    stats.elapsed = time.perf_counter() - started
+    stats.cancelled = sum(1 for _, _, _, text in fake_bot.events if text.startswith('⏹'))
+    stats.rejected = sum(1 for _, _, _, text in fake_bot.events if text.startswith('🚦'))
+    stop.set()
+    await monitor
+    return stats
+
+
+# ============================================
+# REPORT
+# ============================================
+
+def get_report_text(levels: List[LevelStats], slo: float) -> str:
+    ms = lambda h, q: h.percentile(q) * 1000
+    text = (f"{'Users':>5} {'Charts':>6} {'/min':>6} {'Sym p95':>8} {'1st p50':>8} {'1st p95':>8} "
+            f"{'Tot p50':>8} {'Tot p95':>8} {'Tot p99':>8} {'Lag p99':>8} {'Lag max':>8} {'Cxl':>4} {'Rej':>4} {'Err':>4}\n")
+    for s in levels:
+        a = s.actions
+        text += (f"{s.users:>5} {s.charts:>6} {s.charts_per_minute:>6.1f} {ms(a['symbol'], 95):>8.0f} "
+                 f"{ms(a['chart_first'], 50):>8.0f} {ms(a['chart_first'], 95):>8.0f} "
+                 f"{ms(a['chart_total'], 50):>8.0f} {ms(a['chart_total'], 95):>8.0f} {ms(a['chart_total'], 99):>8.0f} "
+                 f"{ms(s.loop_lag, 99):>8.0f} {s.loop_lag.max * 1000:>8.0f} {s.cancelled:>4} {s.rejected:>4} {s.errors:>4}\n")
+    
+    sustained = [s.users for s in levels if s.charts and s.actions['chart_total'].percentile(95) <= slo]
+    text += "\nLatencies in ms. "
+    text += (f"Sustains {max(sustained)} concurrent users with chart p95 <= {slo:g}s"
+             if sustained else f"No level kept chart p95 <= {slo:g}s")
+    return text
+
+
+def level_to_dict(s: LevelStats) -> dict:
+    summary = lambda h: {'count': h.count, 'p50': h.percentile(50), 'p95': h.percentile(95),
+                         'p99': h.percentile(99), 'max': h.max if h.count else 0.0}
+    return {
+        'users': s.users, 'elapsed': s.elapsed, 'charts': s.charts,
+        'charts_per_minute': s.charts_per_minute, 'cancelled': s.cancelled,
+        'rejected': s.rejected, 'errors': s.errors,
+        'latency': {name: summary(h) for name, h in s.actions.items()},
+        'loop_lag': summary(s.loop_lag),
+    }
+
+
+async def run_ramp(levels: List[int], duration: float, ramp: float, think: float, symbols: List[str],
+                   slo: float, stop_on_breach: bool = True) -> List[LevelStats]:
+    results = []
+    for users in levels:
+        stats = await run_level(users, duration, ramp, think, symbols)
+        results.append(stats)
+        p95 = stats.actions['chart_total'].percentile(95)
+        print(f"{users} users: {stats.charts} charts, p95 {p95:.2f}s, loop lag max {stats.loop_lag.max * 1000:.0f}ms")
+        if stop_on_breach and p95 > slo:
+            break
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test of the bot handlers")
+    parser.add_argument('--users', default='1,2,4,8,16', help="concurrency levels to ramp through")
+    parser.add_argument('--duration', type=float, default=60.0, help="seconds per level")
+    parser.add_argument('--ramp', type=float, default=5.0, help="seconds over which a level's users arrive")
+    parser.add_argument('--think', type=float, default=1.0, help="think-time scale (0 = no pauses)")
+    parser.add_argument('--latency', default='0.05,0.3', help="simulated fetch latency range in seconds")
+    parser.add_argument('--slo', type=float, default=10.0, help="chart p95 target in seconds")
+    parser.add_argument('--symbols', default=','.join(SYMBOLS))
+    parser.add_argument('--replay-dir', default=None)
+    parser.add_argument('--record', default='', help="symbols to download into --replay-dir, then exit")
+    parser.add_argument('--all-levels', action='store_true', help="keep ramping after the SLO is breached")
+    parser.add_argument('--json', default='', help="also write the results to this file")
+    args = parser.parse_args()
+    
+    if args.record:
+        record_replay(args.record.split(','), args.replay_dir or 'replay')
+        return
+    
+    logging.getLogger().setLevel(logging.WARNING)
+    source = ReplayDataSource(args.replay_dir, tuple(float(x) for x in args.latency.split(',')))
+    bot.get_stock_data = source.get_stock_data
+    bot.get_stock_info = source.get_stock_info
+    
+    levels = asyncio.run(run_ramp(
+        [int(n) for n in args.users.split(',')], args.duration, args.ramp, args.think,
+        args.symbols.split(','), args.slo, stop_on_breach=not args.all_levels
+    ))
+    print()
+    print(get_report_text(levels, args.slo))
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump([level_to_dict(s) for s in levels], f, indent=2)
+    bot.analysis_executor.shutdown(wait=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,225 @@
+"""
+Request Metrics
+Per-stage latency histograms (log-bucketed, HDR style) tagged by timeframe
+and analysis type, counters, gauges, cache hit rates and a Prometheus text dump
+"""
+
+import math
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+METRICS_FILE = "metrics.prom"
+
+
+class LatencyHistogram:
+    """
+    Log-bucketed histogram: every bucket is `precision` wider than the last,
+    so any quantile is within that relative error at constant memory
+    """
+    
+    def __init__(self, precision: float = 0.02, lowest: float = 1e-6):
+        self.lowest = lowest  # seconds
+        self._log_base = math.log1p(precision)
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+    
+    def _bucket(self, value: float) -> int:
+        return int(math.log(max(value, self.lowest) / self.lowest) / self._log_base)
+    
+    def _value(self, bucket: int) -> float:
+        # Bucket midpoint in log space
+        return self.lowest * math.exp((bucket + 0.5) * self._log_base)
+    
+    def record(self, seconds: float):
+        bucket = self._bucket(seconds)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+    
+    def merge(self, other: 'LatencyHistogram'):
+        for bucket, n in other.buckets.items():
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + n
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+    
+    def percentile(self, q: float) -> float:
+        """q in [0, 100]"""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(q / 100 * self.count))
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(max(self._value(bucket), self.min), self.max)
+        return self.max
+    
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class Metrics:
+    """Thread-safe registry of stage timings, counters and caches"""
+    
+    def __init__(self, rate_window: int = 300):
+        self.started = time.time()
+        self.rate_window = rate_window  # seconds for the recent throughput
+        self._histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], LatencyHistogram] = {}
+        self._counters: Dict[str, int] = {}
+        self._gauges: Dict[str, float] = {}
+        self._completed = deque(maxlen=100000)
+        self._caches = {}
+        self._lock = threading.Lock()
+    
+    # ---------- recording ----------
+    
+    def observe(self, stage: str, seconds: float, **tags):
+        key = (stage, tuple(sorted((k, str(v)) for k, v in tags.items() if v is not None)))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = LatencyHistogram()
+            histogram.record(seconds)
+    
+    @contextmanager
+    def timer(self, stage: str, **tags):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, **tags)
+    
+    def timed(self, stage: str, func, *args, **tags):
+        """Call func(*args) and record its duration (for executor jobs)"""
+        with self.timer(stage, **tags):
+            return func(*args)
+    
+    def increment(self, name: str, value: int = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+    
+    def set_gauge(self, name: str, value: float):
+        with self._lock:
+            self._gauges[name] = value
+    
+    def request_completed(self):
+        self.increment('requests_completed')
+        with self._lock:
+            self._completed.append(time.time())
+    
+    def register_cache(self, name: str, cache):
+        """Any object with `hits` and `misses` attributes"""
+        self._caches[name] = cache
+    
+    # ---------- reading ----------
+    
+    def stages(self, by_tag: Optional[str] = None) -> Dict[Tuple[str, str], LatencyHistogram]:
+        """Histograms merged per stage, or per (stage, tag value)"""
+        merged = {}
+        with self._lock:
+            for (stage, tags), histogram in self._histograms.items():
+                label = dict(tags).get(by_tag, '-') if by_tag else ''
+                target = merged.setdefault((stage, label), LatencyHistogram())
+                target.merge(histogram)
+        return merged
+    
+    def throughput(self) -> Tuple[float, float]:
+        """(requests/min since start, requests/min over the recent window)"""
+        now = time.time()
+        with self._lock:
+            total = len(self._completed)
+            recent = sum(1 for t in self._completed if t >= now - self.rate_window)
+        uptime = max(now - self.started, 60.0)
+        return total / uptime * 60, recent / min(uptime, self.rate_window) * 60
+    
+    def cache_rates(self) -> Dict[str, Tuple[int, int, float]]:
+        rates = {}
+        for name, cache in self._caches.items():
+            hits, misses = cache.hits, cache.misses
+            rates[name] = (hits, misses, 100 * hits / (hits + misses) if hits + misses else 0.0)
+        return rates
+    
+    def get_stats_text(self, by_tag: Optional[str] = None, stages: Optional[Iterable[str]] = None) -> str:
+        uptime = time.time() - self.started
+        overall, recent = self.throughput()
+        
+        text = "📈 **Request Stats**\n"
+        text += f"Uptime {uptime / 3600:.1f}h | {overall:.2f} req/min ({recent:.2f} last {self.rate_window // 60}m)\n\n"
+        text += "```\n"
+        text += f"{'Stage':<22} {'N':>6} {'p50ms':>7} {'p95ms':>7} {'p99ms':>7}\n"
+        for (stage, label), h in sorted(self.stages(by_tag).items()):
+            if stages is not None and stage not in stages:
+                continue
+            name = f"{stage}:{label}" if by_tag else stage
+            text += (f"{name[:22]:<22} {h.count:>6} {h.percentile(50) * 1000:>7.0f} "
+                     f"{h.percentile(95) * 1000:>7.0f} {h.percentile(99) * 1000:>7.0f}\n")
+        
+        # Names contain underscores, so they stay inside the code block
+        for name, (hits, misses, rate) in self.cache_rates().items():
+            text += f"\ncache {name}: {rate:.1f}% hit ({hits}/{hits + misses})"
+        
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+        for name, value in sorted(counters.items()):
+            text += f"\n{name}: {value}"
+        for name, value in sorted(gauges.items()):
+            text += f"\n{name}: {value:g}"
+        text += "\n```"
+        return text
+    
+    def prometheus_text(self, prefix: str = 'bot') -> str:
+        """Prometheus text exposition format (summaries and counters)"""
+        lines: List[str] = [
+            f"# HELP {prefix}_stage_seconds Request stage latency",
+            f"# TYPE {prefix}_stage_seconds summary",
+        ]
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            for stage, tags in sorted(self._histograms):
+                h = self._histograms[(stage, tags)]
+                labels = ','.join([f'stage="{stage}"'] + [f'{k}="{v}"' for k, v in tags])
+                for q in (0.5, 0.95, 0.99):
+                    lines.append(f'{prefix}_stage_seconds{{{labels},quantile="{q}"}} {h.percentile(q * 100):.6f}')
+                lines.append(f'{prefix}_stage_seconds_sum{{{labels}}} {h.total:.6f}')
+                lines.append(f'{prefix}_stage_seconds_count{{{labels}}} {h.count}')
+        
+        for name, value in sorted(counters.items()):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        
+        for name, value in sorted(gauges.items()):
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            lines.append(f"{prefix}_{name} {value:g}")
+        
+        rates = self.cache_rates()
+        if rates:
+            lines.append(f"# TYPE {prefix}_cache_hits_total counter")
+            lines.append(f"# TYPE {prefix}_cache_misses_total counter")
+        for name, (hits, misses, _) in rates.items():
+            lines.append(f'{prefix}_cache_hits_total{{cache="{name}"}} {hits}')
+            lines.append(f'{prefix}_cache_misses_total{{cache="{name}"}} {misses}')
+        
+        lines.append(f"{prefix}_uptime_seconds {time.time() - self.started:.0f}")
+        return "\n".join(lines) + "\n"
+    
+    def dump_prometheus(self, path: str = METRICS_FILE) -> str:
+        with open(path, 'w') as f:
+            f.write(self.prometheus_text())
+        return path
+
+
+# Process-wide registry
+metrics = Metrics()
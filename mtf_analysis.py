@@ -0,0 +1,259 @@
+"""
+Multi-Timeframe Confluence
+Derives all eight timeframes from two base downloads (5m and 1h), runs the
+trend / ICT / Elliott / Fibonacci summaries per timeframe in parallel and
+builds a confluence grid
+"""
+
+import logging
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from classic_analysis import ClassicAnalyzer
+from elliott_waves import ElliottWaveAnalyzer
+from ict_analysis import ICTAnalyzer, MarketStructure
+from fibonacci_analysis import FibonacciAnalyzer
+from cancellation import JobCancelled, pool_options
+from bar_store import SharedBarStore, BarDescriptor, attach_bars
+from bars import BarsLike, as_bars
+
+logger = logging.getLogger(__name__)
+
+# Each timeframe is cut from one of two base downloads
+BASE_FETCHES = {
+    '5m': {'interval': '5m', 'period': '10d'},
+    '1h': {'interval': '1h', 'period': '6mo'},
+}
+
+TIMEFRAME_SOURCES = {
+    '5m': ('5m', None),
+    '7m': ('5m', '7min'),
+    '10m': ('5m', '10min'),
+    '15m': ('5m', '15min'),
+    '30m': ('5m', '30min'),
+    '1h': ('1h', None),
+    '4h': ('1h', '4h'),
+    '1d': ('1h', '1D'),
+}
+
+OHLCV = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+
+TREND_NAMES = {"صاعد": 'bullish', "هابط": 'bearish'}
+
+
+@dataclass
+class TimeframeSummary:
+    timeframe: str
+    bars: int
+    price: float = 0.0
+    trend: str = 'sideways'  # bullish / bearish / sideways
+    ict_structure: int = 0  # +1 bullish, -1 bearish, 0 ranging
+    elliott_wave: str = '-'
+    elliott_next: str = '-'
+    fib_trend: str = ''
+    golden_zone: Tuple[float, float] = (0.0, 0.0)  # 0.382-0.618 retracement, low/high
+    zone_distance: float = 0.0  # % from price to the golden zone, 0 inside
+    error: str = ''
+    
+    @property
+    def votes(self) -> int:
+        """Bullish minus bearish signals on this timeframe"""
+        trend = {'bullish': 1, 'bearish': -1}.get(self.trend, 0)
+        fib = {'bullish': 1, 'bearish': -1}.get(self.fib_trend, 0)
+        return trend + self.ict_structure + fib
+
+
+def trim_period(df: pd.DataFrame, period: str) -> pd.DataFrame:
+    """Keep the window a direct download of `period` would return"""
+    if df.empty:
+        return df
+    unit = 'mo' if period.endswith('mo') else period[-1]
+    count = int(period[:-len(unit)])
+    if unit == 'd':
+        # Yahoo day periods count trading sessions, not calendar days
+        sessions = df.index.normalize().unique()
+        return df[df.index >= sessions[-count]] if len(sessions) > count else df
+    if unit == 'mo':
+        return df[df.index > df.index[-1] - pd.DateOffset(months=count)]
+    return df
+
+
+def derive_timeframes(bases: Dict[str, pd.DataFrame], periods: Dict[str, str]) -> Dict[str, pd.DataFrame]:
+    """All timeframes from the base frames: resample, then trim to each timeframe's period"""
+    frames = {}
+    for timeframe, (base, rule) in TIMEFRAME_SOURCES.items():
+        df = bases.get(base)
+        if df is None or df.empty:
+            continue
+        if rule is not None:
+            df = df.resample(rule).agg(OHLCV).dropna()
+        if timeframe in periods:
+            df = trim_period(df, periods[timeframe])
+        frames[timeframe] = df.reset_index()
+    return frames
+
+
+# ============================================
+# WORKER
+# ============================================
+
+_analyzers = {}
+
+
+def summarize_timeframe(timeframe: str, df: BarsLike, token=None) -> TimeframeSummary:
+    """
+    Trend, ICT structure, Elliott position and golden zone of one timeframe
+    `token` (CancelToken / WorkerToken) is checked before each engine
+    """
+    if not _analyzers:
+        _analyzers.update(classic=ClassicAnalyzer(), elliott=ElliottWaveAnalyzer(),
+                          ict=ICTAnalyzer(), fibonacci=FibonacciAnalyzer())
+    
+    bars = as_bars(df)
+    summary = TimeframeSummary(timeframe=timeframe, bars=len(bars))
+    if len(bars) < 20:
+        summary.error = 'insufficient data'
+        return summary
+    
+    summary.price = float(bars.close[-1])
+    check = token.check if token is not None else (lambda stage: None)
+    try:
+        check('mtf_trend')
+        trend, _ = _analyzers['classic'].detect_trend(bars)
+        summary.trend = TREND_NAMES.get(trend, 'sideways')
+        
+        check('mtf_ict')
+        ict = _analyzers['ict']
+        structure, _, _ = ict.analyze_market_structure(ict.identify_swing_points(bars))
+        summary.ict_structure = {MarketStructure.BULLISH: 1, MarketStructure.BEARISH: -1}.get(structure, 0)
+        
+        check('mtf_elliott')
+        elliott = _analyzers['elliott'].analyze(bars)
+        if elliott.waves:
+            summary.elliott_wave = elliott.current_wave
+            summary.elliott_next = elliott.next_expected
+        
+        check('mtf_fibonacci')
+        fib = _analyzers['fibonacci'].analyze(bars)
+        zone_low, zone_high = sorted((fib.retracement_levels['0.382'], fib.retracement_levels['0.618']))
+        price = summary.price
+        distance = 0.0 if zone_low <= price <= zone_high else min(abs(price - zone_low), abs(price - zone_high))
+        summary.fib_trend = fib.trend
+        summary.golden_zone = (zone_low, zone_high)
+        summary.zone_distance = distance / price * 100
+    except JobCancelled:
+        raise
+    except Exception as e:
+        summary.error = str(e)
+    return summary
+
+
+def summarize_shared(timeframe: str, descriptor: BarDescriptor, token=None) -> TimeframeSummary:
+    """summarize_timeframe on bars mapped from the shared bar store (no pickled frame)"""
+    return summarize_timeframe(timeframe, attach_bars(descriptor), token)
+
+
+# ============================================
+# CONFLUENCE
+# ============================================
+
+class MultiTimeframeAnalyzer:
+    """Confluence across all timeframes from one data pyramid"""
+    
+    def __init__(self, fetch_base: Callable[[str, str, str], pd.DataFrame],
+                 periods: Optional[Dict[str, str]] = None, workers: Optional[int] = None):
+        self.fetch_base = fetch_base  # (symbol, interval, period) -> DataFrame with DatetimeIndex
+        self.periods = periods or {}  # timeframe -> download period of the single-timeframe chart
+        self.workers = workers  # 0 = analyze inline
+        self.bars = SharedBarStore()  # frames handed to the pool as descriptors
+        self._pool = None
+    
+    def _executor(self) -> Optional[ProcessPoolExecutor]:
+        # Kept alive between requests so workers keep their analyzers warm
+        if self._pool is None and self.workers != 0:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, **pool_options())
+        return self._pool
+    
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+        self.bars.close()
+    
+    def fetch(self, symbol: str) -> Dict[str, pd.DataFrame]:
+        """Both base downloads concurrently, then every timeframe derived locally"""
+        with ThreadPoolExecutor(max_workers=len(BASE_FETCHES)) as pool:
+            futures = {base: pool.submit(self.fetch_base, symbol, config['interval'], config['period'])
+                       for base, config in BASE_FETCHES.items()}
+            bases = {}
+            for base, future in futures.items():
+                try:
+                    bases[base] = future.result()
+                except Exception as e:
+                    logger.error(f"Error fetching {symbol} {base} base: {e}")
+        return derive_timeframes(bases, self.periods)
+    
+    def analyze(self, symbol: str, frames: Optional[Dict[str, pd.DataFrame]] = None,
+                token=None) -> Tuple[Dict[str, pd.DataFrame], List[TimeframeSummary]]:
+        """
+        Summaries of every timeframe; a cancelled `token` raises JobCancelled
+        and drops timeframes that have not started yet
+        """
+        frames = frames if frames is not None else self.fetch(symbol)
+        timeframes = [tf for tf in TIMEFRAME_SOURCES if tf in frames]
+        if token is not None:
+            token.check('mtf_fetch')
+        
+        pool = self._executor()
+        if pool is None:
+            return frames, [summarize_timeframe(tf, frames[tf], token) for tf in timeframes]
+        
+        worker_token = token.for_worker() if token is not None else None
+        descriptors = [self.bars.put((symbol, tf), frames[tf]) for tf in timeframes]
+        futures = [pool.submit(summarize_shared, tf, descriptor, worker_token)
+                   for tf, descriptor in zip(timeframes, descriptors)]
+        pending = set(futures)
+        try:
+            while pending:
+                # Short waits so a cancelled job frees the pool without waiting for every timeframe
+                _, pending = wait(pending, timeout=0.05, return_when=FIRST_COMPLETED)
+                if token is not None:
+                    token.check('mtf_analyze')
+        finally:
+            for future in pending:
+                future.cancel()
+            for descriptor in descriptors:
+                self.bars.release(descriptor)
+        return frames, [future.result() for future in futures]
+    
+    def confluence(self, summaries: List[TimeframeSummary]) -> Tuple[int, str]:
+        """Total votes across timeframes and the overall bias"""
+        votes = sum(s.votes for s in summaries if not s.error)
+        valid = sum(1 for s in summaries if not s.error)
+        # A bias needs at least a third of the maximum possible votes
+        if valid and votes >= valid:
+            return votes, 'BULLISH'
+        if valid and votes <= -valid:
+            return votes, 'BEARISH'
+        return votes, 'MIXED'
+    
+    def get_grid_text(self, symbol: str, summaries: List[TimeframeSummary]) -> str:
+        arrows = {1: '▲', -1: '▼', 0: '•'}
+        trend = {'bullish': 1, 'bearish': -1}
+        votes, bias = self.confluence(summaries)
+        
+        text = f"🧭 **MTF CONFLUENCE** {symbol}\n\n"
+        text += "```\n"
+        text += f"{'TF':<4} {'Trd':^3} {'ICT':^3} {'Fib':^3} {'EW':>4} {'Zone%':>6}\n"
+        for s in summaries:
+            if s.error:
+                text += f"{s.timeframe:<4} {'n/a':^3}\n"
+                continue
+            zone = 'IN' if s.zone_distance == 0 else f"{s.zone_distance:.1f}"
+            text += (f"{s.timeframe:<4} {arrows[trend.get(s.trend, 0)]:^3} {arrows[s.ict_structure]:^3} "
+                     f"{arrows[trend.get(s.fib_trend, 0)]:^3} {s.elliott_wave:>2}→{s.elliott_next:<1} {zone:>6}\n")
+        text += "```\n"
+        text += f"**Confluence:** {bias} ({votes:+d})"
+        return text
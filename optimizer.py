@@ -0,0 +1,213 @@
+"""
+Walk-Forward Parameter Optimizer
+Grid or random search over analyzer parameters, scored by the backtester
+on anchored walk-forward splits and saved as parameter profiles
+"""
+
+import sys
+import random
+import itertools
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+from backtester import Backtester
+from parameter_profiles import ParameterProfile, save_profile, PROFILES_FILE
+
+DEFAULT_GRID = {
+    'ict_lookback': [2, 3, 5],
+    'harmonic_lookback': [3, 5, 8],
+    'harmonic_tolerance': [0.03, 0.05, 0.08],
+    'atr_stop': [1.0, 1.5, 2.0],
+    'atr_targets': [(1.0, 2.0, 3.0), (1.5, 2.5, 4.0), (2.0, 3.0, 5.0)],
+}
+
+PRICE_COLUMNS = ('Open', 'High', 'Low', 'Close')
+
+
+@dataclass
+class RangeScore:
+    """Trade-weighted backtest result of one parameter set on one bar range"""
+    trades: int
+    expectancy: float  # R per trade across all engines
+    hit_rate: float
+
+
+@dataclass
+class FoldResult:
+    train: Tuple[int, int]
+    test: Tuple[int, int]
+    best_trial: int
+    train_score: RangeScore
+    test_score: RangeScore
+
+
+@dataclass
+class OptimizationResult:
+    symbol_class: str
+    timeframe: str
+    profile: ParameterProfile  # best on the whole history, for deployment
+    score: RangeScore
+    folds: List[FoldResult] = field(default_factory=list)
+    oos_expectancy: float = 0.0  # walk-forward out-of-sample, trade-weighted
+    trials: int = 0
+
+
+# ============================================
+# WORKER PROCESS STATE
+# ============================================
+
+_worker = {}
+
+
+def _init_worker(shm_name: str, shape: Tuple[int, int], horizon: int, warmup: int,
+                 engines: List[str], ranges: List[Tuple[int, int]]):
+    """Attach to the shared price block once per process"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    prices = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    _worker['shm'] = shm  # keep the mapping alive
+    _worker['df'] = pd.DataFrame({name: prices[k] for k, name in enumerate(PRICE_COLUMNS)})
+    # One backtester per process keeps its pivot cache across trials
+    _worker['backtester'] = Backtester(horizon=horizon, warmup=warmup)
+    _worker['engines'] = engines
+    _worker['ranges'] = ranges
+
+
+def _score(reports) -> RangeScore:
+    trades = sum(r.trades for r in reports)
+    resolved = sum(r.wins + r.losses for r in reports)
+    wins = sum(r.wins for r in reports)
+    return RangeScore(
+        trades=trades,
+        expectancy=sum(r.expectancy * r.trades for r in reports) / trades if trades else 0.0,
+        hit_rate=100 * wins / resolved if resolved else 0.0
+    )
+
+
+def _run_trial(params: Dict) -> List[RangeScore]:
+    """Backtest one parameter set once and score every range from the same signals"""
+    df = _worker['df']
+    backtester = _worker['backtester']
+    backtester.profile = ParameterProfile.from_dict(params)
+    
+    signals = [backtester.generate_signals(df, engine) for engine in _worker['engines']]
+    return [_score([backtester.resolve(df, s, start=start, end=end) for s in signals])
+            for start, end in _worker['ranges']]
+
+
+class WalkForwardOptimizer:
+    """Searches parameter profiles per symbol class and timeframe"""
+    
+    def __init__(self, grid: Optional[Dict[str, list]] = None, n_trials: Optional[int] = None,
+                 folds: int = 4, min_trades: int = 30, horizon: int = 50, warmup: int = 50,
+                 engines: Optional[List[str]] = None, workers: Optional[int] = None, seed: int = 0):
+        self.grid = grid or DEFAULT_GRID
+        self.n_trials = n_trials  # None = full grid, otherwise random sample of the grid
+        self.folds = folds
+        self.min_trades = min_trades  # fewer trades than this cannot win a fold
+        self.horizon = horizon
+        self.warmup = warmup
+        self.engines = engines or list(Backtester.ENGINES)
+        self.workers = workers
+        self.seed = seed
+    
+    def trials(self) -> List[Dict]:
+        """Parameter sets to evaluate"""
+        names = list(self.grid)
+        combos = [dict(zip(names, values)) for values in itertools.product(*(self.grid[n] for n in names))]
+        if self.n_trials is not None and self.n_trials < len(combos):
+            combos = random.Random(self.seed).sample(combos, self.n_trials)
+        return combos
+    
+    def splits(self, n: int) -> List[Tuple[Tuple[int, int], Tuple[int, int]]]:
+        """Anchored walk-forward: train on [warmup, t_k), test on [t_k, t_k+1)"""
+        bounds = np.linspace(self.warmup, n, self.folds + 2).astype(int)
+        return [((int(bounds[0]), int(bounds[k])), (int(bounds[k]), int(bounds[k + 1])))
+                for k in range(1, self.folds + 1)]
+    
+    def _best(self, scores: List[RangeScore]) -> int:
+        eligible = [k for k, s in enumerate(scores) if s.trades >= self.min_trades] or range(len(scores))
+        return max(eligible, key=lambda k: scores[k].expectancy)
+    
+    def optimize(self, df: pd.DataFrame, symbol_class: str, timeframe: str) -> OptimizationResult:
+        """Evaluate every trial on every walk-forward range in a process pool"""
+        n = len(df)
+        splits = self.splits(n)
+        ranges = [r for split in splits for r in split] + [(self.warmup, n)]
+        trials = self.trials()
+        
+        prices = np.ascontiguousarray([df[name].values for name in PRICE_COLUMNS], dtype=np.float64)
+        shm = shared_memory.SharedMemory(create=True, size=prices.nbytes)
+        try:
+            np.ndarray(prices.shape, dtype=np.float64, buffer=shm.buf)[:] = prices
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                     initargs=(shm.name, prices.shape, self.horizon, self.warmup,
+                                               self.engines, ranges)) as pool:
+                results = list(pool.map(_run_trial, trials, chunksize=max(1, len(trials) // 64)))
+        finally:
+            shm.close()
+            shm.unlink()
+        
+        folds = []
+        for k, (train, test) in enumerate(splits):
+            train_scores = [r[2 * k] for r in results]
+            best = self._best(train_scores)
+            folds.append(FoldResult(train, test, best, train_scores[best], results[best][2 * k + 1]))
+        
+        oos_trades = sum(f.test_score.trades for f in folds)
+        oos_expectancy = sum(f.test_score.expectancy * f.test_score.trades for f in folds) / oos_trades if oos_trades else 0.0
+        
+        full_scores = [r[-1] for r in results]
+        best = self._best(full_scores)
+        return OptimizationResult(
+            symbol_class=symbol_class,
+            timeframe=timeframe,
+            profile=ParameterProfile.from_dict(trials[best]),
+            score=full_scores[best],
+            folds=folds,
+            oos_expectancy=oos_expectancy,
+            trials=len(trials)
+        )
+    
+    def save(self, result: OptimizationResult, path: str = PROFILES_FILE):
+        save_profile(result.symbol_class, result.timeframe, result.profile, {
+            'expectancy': round(result.score.expectancy, 4),
+            'hit_rate': round(result.score.hit_rate, 2),
+            'trades': result.score.trades,
+            'oos_expectancy': round(result.oos_expectancy, 4),
+            'trials': result.trials,
+        }, path)
+    
+    def get_report_text(self, result: OptimizationResult) -> str:
+        text = f"🧪 **OPTIMIZATION** {result.symbol_class}/{result.timeframe} ({result.trials} trials)\n\n"
+        for k, fold in enumerate(result.folds, 1):
+            text += (f"Fold {k}: train {fold.train[0]}-{fold.train[1]} "
+                     f"{fold.train_score.expectancy:+.2f}R | test {fold.test[0]}-{fold.test[1]} "
+                     f"{fold.test_score.expectancy:+.2f}R ({fold.test_score.trades} trades)\n")
+        text += f"\n**Out-of-sample:** {result.oos_expectancy:+.3f}R per trade\n"
+        text += f"**Full history:** {result.score.expectancy:+.3f}R, hit {result.score.hit_rate:.1f}%\n\n"
+        for name, value in result.profile.to_dict().items():
+            text += f"{name}: {value}\n"
+        return text
+
+
+def main():
+    """Optimize on a local OHLCV CSV: python optimizer.py prices.csv symbol_class timeframe [n_trials]"""
+    if len(sys.argv) < 4:
+        print("Usage: python optimizer.py prices.csv symbol_class timeframe [n_trials]")
+        return
+    
+    df = pd.read_csv(sys.argv[1], index_col=0, parse_dates=True)
+    n_trials = int(sys.argv[4]) if len(sys.argv) > 4 else None
+    
+    optimizer = WalkForwardOptimizer(n_trials=n_trials)
+    result = optimizer.optimize(df, sys.argv[2], sys.argv[3])
+    optimizer.save(result)
+    print(optimizer.get_report_text(result))
+
+
+if __name__ == '__main__':
+    main()
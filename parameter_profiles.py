@@ -0,0 +1,105 @@
+"""
+Parameter Profiles
+Tuned analyzer parameters per symbol class and timeframe, stored as JSON
+and applied to the analyzers before each analysis
+"""
+
+import os
+import json
+import logging
+from dataclasses import dataclass, asdict, fields
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PROFILES_FILE = "parameter_profiles.json"
+
+
+@dataclass
+class ParameterProfile:
+    """Tunable parameters (defaults are the analyzers' built-in values)"""
+    ict_lookback: int = 3
+    harmonic_lookback: int = 5
+    classic_tolerance: float = 0.02
+    harmonic_tolerance: float = 0.05
+    atr_stop: float = 1.5
+    atr_targets: Tuple[float, float, float] = (1.5, 2.5, 4.0)
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ParameterProfile':
+        known = {f.name for f in fields(cls)}
+        params = {k: v for k, v in data.items() if k in known}
+        if 'atr_targets' in params:
+            params['atr_targets'] = tuple(params['atr_targets'])
+        return cls(**params)
+    
+    def to_dict(self) -> Dict:
+        data = asdict(self)
+        data['atr_targets'] = list(self.atr_targets)
+        return data
+    
+    def apply(self, chart_drawer=None, classic=None, harmonic=None, ict=None):
+        """Set the parameters on whichever analyzers are given"""
+        if chart_drawer is not None:
+            chart_drawer.atr_stop_multiplier = self.atr_stop
+            chart_drawer.atr_target_multipliers = tuple(self.atr_targets)
+        if classic is not None:
+            classic.tolerance = self.classic_tolerance
+        if harmonic is not None:
+            harmonic.tolerance = self.harmonic_tolerance
+            harmonic.swing_lookback = self.harmonic_lookback
+        if ict is not None:
+            ict.swing_lookback = self.ict_lookback
+
+
+def symbol_class(symbol: str) -> str:
+    """Rough asset class from the Yahoo Finance symbol format"""
+    symbol = symbol.upper()
+    if symbol.endswith('=X'):
+        return 'forex'
+    if symbol.endswith('=F'):
+        return 'futures'
+    if symbol.startswith('^'):
+        return 'index'
+    if symbol.endswith(('-USD', '-USDT', '-EUR', '-BTC')):
+        return 'crypto'
+    return 'stock'
+
+
+def profile_key(cls: str, timeframe: str) -> str:
+    return f"{cls}/{timeframe}"
+
+
+def load_profiles(path: str = PROFILES_FILE) -> Dict[str, Dict]:
+    """{'stock/1d': {'params': {...}, 'score': ..., ...}}"""
+    try:
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                return json.load(f)
+    except Exception as e:
+        logger.error(f"Error loading parameter profiles: {e}")
+    return {}
+
+
+def save_profile(cls: str, timeframe: str, profile: ParameterProfile,
+                 stats: Optional[Dict] = None, path: str = PROFILES_FILE):
+    """Insert or replace one profile, keeping the others in the file"""
+    profiles = load_profiles(path)
+    entry = {'params': profile.to_dict(), 'updated': datetime.now().isoformat(timespec='seconds')}
+    entry.update(stats or {})
+    profiles[profile_key(cls, timeframe)] = entry
+    
+    try:
+        with open(path, 'w') as f:
+            json.dump(profiles, f, indent=2)
+    except Exception as e:
+        logger.error(f"Error saving parameter profiles: {e}")
+
+
+def get_profile(profiles: Dict[str, Dict], symbol: str, timeframe: str) -> ParameterProfile:
+    """Profile for the symbol's class and timeframe, or the built-in defaults"""
+    entry = profiles.get(profile_key(symbol_class(symbol), timeframe))
+    if entry is None:
+        return ParameterProfile()
+    return ParameterProfile.from_dict(entry.get('params', {}))
@@ -0,0 +1,152 @@
+"""
+Range Extremes Index
+Sparse table for O(1) range max/min (and position) queries over a price series
+Built once per series and shared by all window scans
+"""
+
+import numpy as np
+from typing import Optional
+
+
+class RangeExtremeIndex:
+    """Sparse table answering max/min/argmax/argmin over [i, j) in O(1)"""
+    
+    def __init__(self, values: np.ndarray):
+        self.values = np.asarray(values, dtype=float)
+        self.n = len(self.values)
+        self._tables = {}
+        self._log2 = np.zeros(self.n + 1, dtype=np.int64)
+        if self.n > 1:
+            self._log2[2:] = np.floor(np.log2(np.arange(2, self.n + 1))).astype(np.int64)
+    
+    def _build(self, kind: str) -> list:
+        """Build argmax ('max') or argmin ('min') levels, ties resolved to the leftmost position"""
+        if kind in self._tables:
+            return self._tables[kind]
+        
+        values = self.values
+        levels = [np.arange(self.n, dtype=np.int64)]
+        width = 1
+        
+        while width * 2 <= self.n:
+            prev = levels[-1]
+            left = prev[:self.n - 2 * width + 1]
+            right = prev[width:self.n - width + 1]
+            if kind == 'max':
+                take_left = values[left] >= values[right]
+            else:
+                take_left = values[left] <= values[right]
+            levels.append(np.where(take_left, left, right))
+            width *= 2
+        
+        self._tables[kind] = levels
+        return levels
+    
+    def _query(self, kind: str, start, end):
+        levels = self._build(kind)
+        start = np.asarray(start, dtype=np.int64)
+        end = np.asarray(end, dtype=np.int64)
+        
+        k = self._log2[end - start]
+        width = np.left_shift(1, k)
+        
+        if k.ndim == 0:
+            left = levels[int(k)][int(start)]
+            right = levels[int(k)][int(end - width)]
+        else:
+            left = np.empty(len(k), dtype=np.int64)
+            right = np.empty(len(k), dtype=np.int64)
+            for level in np.unique(k):
+                mask = k == level
+                left[mask] = levels[level][start[mask]]
+                right[mask] = levels[level][end[mask] - width[mask]]
+        
+        if kind == 'max':
+            take_left = self.values[left] >= self.values[right]
+        else:
+            take_left = self.values[left] <= self.values[right]
+        return np.where(take_left, left, right) if k.ndim else (left if take_left else right)
+    
+    def _bounds(self, start: int, end: Optional[int]):
+        if end is None:
+            end = self.n
+        if start < 0:
+            start += self.n
+        if end < 0:
+            end += self.n
+        start = max(0, start)
+        end = min(self.n, end)
+        if end <= start:
+            raise ValueError("empty range")
+        return start, end
+    
+    def argmax(self, start: int, end: Optional[int] = None) -> int:
+        """Position of the first maximum in values[start:end]"""
+        return int(self._query('max', *self._bounds(start, end)))
+    
+    def argmin(self, start: int, end: Optional[int] = None) -> int:
+        """Position of the first minimum in values[start:end]"""
+        return int(self._query('min', *self._bounds(start, end)))
+    
+    def max(self, start: int, end: Optional[int] = None) -> float:
+        return self.values[self.argmax(start, end)]
+    
+    def min(self, start: int, end: Optional[int] = None) -> float:
+        return self.values[self.argmin(start, end)]
+    
+    def argmax_many(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """Vectorized argmax for many non-empty [start, end) ranges"""
+        return self._query('max', starts, ends)
+    
+    def argmin_many(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """Vectorized argmin for many non-empty [start, end) ranges"""
+        return self._query('min', starts, ends)
+    
+    def max_many(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        return self.values[self.argmax_many(starts, ends)]
+    
+    def min_many(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        return self.values[self.argmin_many(starts, ends)]
+    
+    def _first_passage(self, kind: str, starts: np.ndarray, thresholds: np.ndarray,
+                       ends: Optional[np.ndarray] = None) -> np.ndarray:
+        """Binary search on the running extreme, all queries advanced together"""
+        starts = np.asarray(starts, dtype=np.int64)
+        thresholds = np.asarray(thresholds, dtype=float)
+        ends = np.full(len(starts), self.n, dtype=np.int64) if ends is None else \
+            np.minimum(np.asarray(ends, dtype=np.int64), self.n)
+        
+        def reached(lo, hi, thr):
+            pos = self._query(kind, lo, hi)
+            return self.values[pos] >= thr if kind == 'max' else self.values[pos] <= thr
+        
+        result = np.full(len(starts), -1, dtype=np.int64)
+        active = np.flatnonzero(starts < ends)
+        if len(active) == 0:
+            return result
+        
+        # Keep only queries that cross the threshold somewhere in [start, end)
+        active = active[reached(starts[active], ends[active], thresholds[active])]
+        lo = starts[active].copy()
+        hi = ends[active] - 1
+        thr = thresholds[active]
+        s = starts[active]
+        
+        while np.any(lo < hi):
+            mid = (lo + hi) // 2
+            hit = reached(s, mid + 1, thr)
+            hi = np.where(hit, mid, hi)
+            lo = np.where(hit, lo, mid + 1)
+        
+        result[active] = lo
+        return result
+    
+    def first_at_or_above(self, starts: np.ndarray, thresholds: np.ndarray,
+                          ends: Optional[np.ndarray] = None) -> np.ndarray:
+        """First position k in [start, end) with values[k] >= threshold, or -1"""
+        return self._first_passage('max', starts, thresholds, ends)
+    
+    def first_at_or_below(self, starts: np.ndarray, thresholds: np.ndarray,
+                          ends: Optional[np.ndarray] = None) -> np.ndarray:
+        """First position k in [start, end) with values[k] <= threshold, or -1"""
+        return self._first_passage('min', starts, thresholds, ends)
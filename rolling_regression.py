@@ -0,0 +1,77 @@
+"""
+Rolling Regression Engine
+Closed-form least squares (slope, intercept, R²) for every window in O(n)
+using cumulative sums of x, y, xy, x² and y²
+"""
+
+import numpy as np
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+
+@dataclass
+class RegressionSeries:
+    """Line fits for windows [starts[k], ends[k])"""
+    starts: np.ndarray
+    ends: np.ndarray
+    slope: np.ndarray
+    intercept: np.ndarray  # line value at x = 0 (same x coordinates as the input)
+    r2: np.ndarray
+
+
+class RollingRegression:
+    """Ordinary least squares over arbitrary contiguous windows of one series"""
+    
+    def __init__(self, y: np.ndarray, x: Optional[np.ndarray] = None):
+        y = np.asarray(y, dtype=float)
+        x = np.arange(len(y), dtype=float) if x is None else np.asarray(x, dtype=float)
+        
+        # Centering keeps the cumulative sums small and the differences accurate
+        self.x_mean = x.mean() if len(x) else 0.0
+        self.y_mean = y.mean() if len(y) else 0.0
+        xc = x - self.x_mean
+        yc = y - self.y_mean
+        
+        self.n = len(y)
+        self._sx = np.concatenate(([0.0], np.cumsum(xc)))
+        self._sy = np.concatenate(([0.0], np.cumsum(yc)))
+        self._sxx = np.concatenate(([0.0], np.cumsum(xc * xc)))
+        self._sxy = np.concatenate(([0.0], np.cumsum(xc * yc)))
+        self._syy = np.concatenate(([0.0], np.cumsum(yc * yc)))
+    
+    def fit_many(self, starts: np.ndarray, ends: np.ndarray) -> RegressionSeries:
+        """Fit every [start, end) window at once"""
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+        count = (ends - starts).astype(float)
+        
+        sx = self._sx[ends] - self._sx[starts]
+        sy = self._sy[ends] - self._sy[starts]
+        sxx = self._sxx[ends] - self._sxx[starts]
+        sxy = self._sxy[ends] - self._sxy[starts]
+        syy = self._syy[ends] - self._syy[starts]
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            var_x = sxx - sx * sx / count
+            var_y = syy - sy * sy / count
+            cov = sxy - sx * sy / count
+            
+            slope = cov / var_x
+            intercept = (sy - slope * sx) / count + self.y_mean - slope * self.x_mean
+            # A flat series is fitted perfectly by a flat line
+            r2 = np.where(var_y > 0, cov * cov / (var_x * var_y), 1.0)
+        
+        return RegressionSeries(starts=starts, ends=ends, slope=slope, intercept=intercept, r2=r2)
+    
+    def fit(self, window: int) -> RegressionSeries:
+        """Fit every consecutive window of the given length (element k covers [k, k + window))"""
+        starts = np.arange(max(0, self.n - window + 1))
+        return self.fit_many(starts, starts + window)
+    
+    def fit_range(self, start: int = 0, end: Optional[int] = None) -> Tuple[float, float, float]:
+        """Slope, intercept and R² for a single window"""
+        end = self.n if end is None else end
+        if start < 0:
+            start += self.n
+        series = self.fit_many(np.array([start]), np.array([end]))
+        return float(series.slope[0]), float(series.intercept[0]), float(series.r2[0])
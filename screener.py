@@ -0,0 +1,315 @@
+"""
+Universe Screener
+Runs the analysis engines over a symbol universe and ranks symbols by
+signal strength: classic buy/sell score, harmonic confidence, ICT structure
+and distance to the Fibonacci golden zone
+"""
+
+import io
+import os
+import re
+import csv
+import time
+import logging
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from classic_analysis import ClassicAnalyzer
+from harmonic_patterns import HarmonicAnalyzer, PatternDirection
+from ict_analysis import ICTAnalyzer, MarketStructure
+from fibonacci_analysis import FibonacciAnalyzer
+from range_extremes import RangeExtremeIndex
+from watchlist import BAR_SECONDS
+from bar_store import SharedBarStore, BarDescriptor, attach_bars
+from bars import BarsLike, as_bars
+
+logger = logging.getLogger(__name__)
+
+UNIVERSE_FILE = "universe.txt"
+UNIVERSE_DIR = "universes"  # named universes for /scan NAME
+UNIVERSE_EXTENSIONS = ('.txt', '.csv')
+
+# Yahoo symbols: AAPL, BRK-B, ^GSPC, EURUSD=X, BTC-USD
+SYMBOL_PATTERN = re.compile(r'^[A-Z0-9^][A-Z0-9.=\-]{0,19}$')
+SCAN_ENGINES = ('classic', 'harmonic', 'ict', 'fibonacci')
+SORT_KEYS = ('score', 'classic', 'harmonic', 'ict', 'fib')
+
+
+@dataclass
+class ScanResult:
+    symbol: str
+    price: float = 0.0
+    classic_score: int = 0  # buy score - sell score
+    classic_signal: str = ''
+    harmonic_pattern: str = ''
+    harmonic_confidence: float = 0.0  # signed: + bullish, - bearish
+    ict_structure: int = 0  # +1 bullish, -1 bearish, 0 ranging
+    fib_trend: str = ''
+    golden_zone_distance: float = 0.0  # % from price to the 0.382-0.618 zone, 0 inside
+    score: float = 0.0  # signed composite, |score| is the strength
+    bias: str = ''
+    error: str = ''
+
+
+def universe_path(name: Optional[str] = None) -> str:
+    """
+    File behind a universe name: the default universe, or a .txt / .csv file
+    directly inside UNIVERSE_DIR. Anything else raises ValueError.
+    """
+    if name is None:
+        return UNIVERSE_FILE
+    if name != os.path.basename(name) or name.startswith('.') or not name.lower().endswith(UNIVERSE_EXTENSIONS):
+        raise ValueError(f"Invalid universe name: {name}")
+    return os.path.join(UNIVERSE_DIR, name)
+
+
+def list_universes() -> List[str]:
+    try:
+        return sorted(f for f in os.listdir(UNIVERSE_DIR)
+                      if f.lower().endswith(UNIVERSE_EXTENSIONS) and not f.startswith('.'))
+    except OSError:
+        return []
+
+
+def load_universe(path: str = UNIVERSE_FILE) -> List[str]:
+    """
+    Symbols from a text file (one per line) or a CSV with a Symbol column
+    Entries that do not look like a ticker are dropped, never passed on
+    """
+    with open(path, 'r') as f:
+        text = f.read()
+    
+    lines = [line.strip() for line in text.splitlines() if line.strip() and not line.startswith('#')]
+    if lines and ',' in lines[0]:
+        rows = list(csv.DictReader(io.StringIO(text)))
+        column = next((c for c in rows[0] if c.strip().lower() in ('symbol', 'ticker')), None) if rows else None
+        symbols = [row[column] for row in rows] if column else [line.split(',')[0] for line in lines]
+    else:
+        symbols = lines
+    
+    # Yahoo uses '-' where index lists use '.' for share classes (BRK.B -> BRK-B)
+    seen = {}
+    for symbol in symbols:
+        symbol = symbol.strip().upper()
+        if '.' in symbol and len(symbol.split('.')[-1]) == 1:
+            symbol = symbol.replace('.', '-')
+        if SYMBOL_PATTERN.match(symbol):
+            seen.setdefault(symbol, None)
+    return list(seen)
+
+
+class BarCache:
+    """In-memory OHLCV frames per (symbol, timeframe), valid for one bar"""
+    
+    def __init__(self, min_ttl: int = 60):
+        self.min_ttl = min_ttl
+        self._frames: Dict[Tuple[str, str], Tuple[float, pd.DataFrame]] = {}
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, symbol: str, timeframe: str) -> Optional[pd.DataFrame]:
+        entry = self._frames.get((symbol, timeframe))
+        ttl = max(self.min_ttl, BAR_SECONDS.get(timeframe, 86400))
+        if entry is None or time.time() - entry[0] > ttl:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+    
+    def put(self, symbol: str, timeframe: str, df: pd.DataFrame):
+        self._frames[(symbol, timeframe)] = (time.time(), df)
+
+
+# ============================================
+# WORKER
+# ============================================
+
+_analyzers = {}
+
+
+def _get_analyzers() -> Dict:
+    """One set of analyzers per worker process"""
+    if not _analyzers:
+        _analyzers.update(classic=ClassicAnalyzer(), harmonic=HarmonicAnalyzer(),
+                          ict=ICTAnalyzer(), fibonacci=FibonacciAnalyzer())
+    return _analyzers
+
+
+def score_symbol(symbol: str, df: Optional[BarsLike], engines: Tuple[str, ...] = SCAN_ENGINES,
+                 recent_bars: int = 10) -> ScanResult:
+    """Score one symbol with the selected engines (runs inside pool workers)"""
+    result = ScanResult(symbol=symbol)
+    if df is None or len(df) < 30:
+        result.error = 'insufficient data'
+        return result
+    
+    analyzers = _get_analyzers()
+    bars = as_bars(df)
+    result.price = float(bars.close[-1])
+    high_index = RangeExtremeIndex(bars.high)
+    low_index = RangeExtremeIndex(bars.low)
+    score = 0.0
+    
+    try:
+        if 'classic' in engines:
+            classic = analyzers['classic']
+            trend, _ = classic.detect_trend(bars)
+            patterns = classic.detect_patterns(bars, high_index, low_index)
+            indicators = classic.calculate_indicators(bars)
+            buy, sell = classic.signal_scores(trend, patterns, indicators)
+            result.classic_score = buy - sell
+            result.classic_signal = classic._determine_signal(trend, patterns, indicators).name
+            score += result.classic_score
+        
+        if 'harmonic' in engines:
+            harmonic = analyzers['harmonic']
+            points = harmonic.find_swing_points(bars)
+            patterns = []
+            for detect in (harmonic.detect_abcd, harmonic.detect_gartley, harmonic.detect_butterfly,
+                           harmonic.detect_bat, harmonic.detect_crab):
+                patterns.extend(detect(points))
+            # Only patterns completing near the last bar are a current signal
+            patterns = [p for p in patterns if p.points['D'][0] >= len(bars) - recent_bars]
+            if patterns:
+                best = max(patterns, key=lambda p: p.confidence)
+                sign = 1 if best.direction == PatternDirection.BULLISH else -1
+                result.harmonic_pattern = best.pattern_type.name
+                result.harmonic_confidence = sign * best.confidence
+                score += result.harmonic_confidence / 25
+        
+        if 'ict' in engines:
+            ict = analyzers['ict']
+            swings = ict.identify_swing_points(bars, high_index=high_index, low_index=low_index)
+            structure, _, _ = ict.analyze_market_structure(swings)
+            result.ict_structure = {MarketStructure.BULLISH: 1, MarketStructure.BEARISH: -1}.get(structure, 0)
+            score += 2 * result.ict_structure
+        
+        if 'fibonacci' in engines:
+            fib = analyzers['fibonacci'].analyze(bars)
+            zone_low, zone_high = sorted((fib.retracement_levels['0.382'], fib.retracement_levels['0.618']))
+            price = result.price
+            distance = 0.0 if zone_low <= price <= zone_high else min(abs(price - zone_low), abs(price - zone_high))
+            result.fib_trend = fib.trend
+            result.golden_zone_distance = distance / price * 100
+            # Inside or close to the zone counts in the direction of the Fibonacci trend
+            sign = 1 if fib.trend == 'bullish' else -1
+            score += sign * max(0.0, 2 - result.golden_zone_distance)
+    except Exception as e:
+        result.error = str(e)
+    
+    result.score = round(score, 2)
+    result.bias = 'LONG' if score > 0 else 'SHORT' if score < 0 else 'NEUTRAL'
+    return result
+
+
+def _score_batch(batch: List[Tuple[str, pd.DataFrame]], engines: Tuple[str, ...]) -> List[ScanResult]:
+    return [score_symbol(symbol, df, engines) for symbol, df in batch]
+
+
+def _score_shared_batch(batch: List[Tuple[str, Optional[BarDescriptor]]],
+                        engines: Tuple[str, ...]) -> List[ScanResult]:
+    """_score_batch on bars mapped from the shared bar store"""
+    return [score_symbol(symbol, attach_bars(descriptor) if descriptor is not None else None, engines)
+            for symbol, descriptor in batch]
+
+
+# ============================================
+# SCREENER
+# ============================================
+
+class Screener:
+    """Batch fetch + cached bars + process pool over a symbol universe"""
+    
+    def __init__(self, fetch_many: Callable[[List[str], str], Dict[str, pd.DataFrame]],
+                 cache: Optional[BarCache] = None, workers: Optional[int] = None,
+                 fetch_chunk: int = 100):
+        self.fetch_many = fetch_many  # (symbols, timeframe) -> {symbol: DataFrame}
+        self.cache = cache or BarCache()
+        self.workers = workers
+        self.fetch_chunk = fetch_chunk
+        self.bars = SharedBarStore()  # frames handed to pool workers as descriptors
+    
+    def get_frames(self, symbols: List[str], timeframe: str) -> Dict[str, pd.DataFrame]:
+        frames = {}
+        missing = []
+        for symbol in symbols:
+            df = self.cache.get(symbol, timeframe)
+            if df is None:
+                missing.append(symbol)
+            else:
+                frames[symbol] = df
+        
+        for k in range(0, len(missing), self.fetch_chunk):
+            fetched = self.fetch_many(missing[k:k + self.fetch_chunk], timeframe)
+            for symbol, df in fetched.items():
+                if not df.empty:
+                    self.cache.put(symbol, timeframe, df)
+                    frames[symbol] = df
+        return frames
+    
+    def scan(self, symbols: List[str], timeframe: str = '1d', engines: Optional[Tuple[str, ...]] = None,
+             sort_by: str = 'score') -> List[ScanResult]:
+        """Score every symbol and sort strongest first"""
+        engines = tuple(engines or SCAN_ENGINES)
+        frames = self.get_frames(symbols, timeframe)
+        items = [(symbol, frames.get(symbol)) for symbol in symbols]
+        
+        # A handful of symbols per task keeps pickling overhead low
+        batch_size = max(1, len(items) // 32)
+        batches = [items[k:k + batch_size] for k in range(0, len(items), batch_size)]
+        
+        results = []
+        if len(batches) > 1:
+            descriptors = {}
+            for symbol, df in items:
+                if df is not None and symbol not in descriptors:
+                    descriptors[symbol] = self.bars.put((symbol, timeframe), df)
+            shared = [[(symbol, descriptors.get(symbol)) for symbol, _ in batch] for batch in batches]
+            try:
+                with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                    for batch_results in pool.map(_score_shared_batch, shared, [engines] * len(shared)):
+                        results.extend(batch_results)
+            finally:
+                for descriptor in descriptors.values():
+                    self.bars.release(descriptor)
+        else:
+            for batch in batches:
+                results.extend(_score_batch(batch, engines))
+        
+        return self.rank(results, sort_by)
+    
+    def rank(self, results: List[ScanResult], sort_by: str = 'score') -> List[ScanResult]:
+        keys = {
+            'score': lambda r: abs(r.score),
+            'classic': lambda r: abs(r.classic_score),
+            'harmonic': lambda r: abs(r.harmonic_confidence),
+            'ict': lambda r: (abs(r.ict_structure), abs(r.score)),
+            'fib': lambda r: -r.golden_zone_distance,
+        }
+        valid = [r for r in results if not r.error]
+        failed = [r for r in results if r.error]
+        return sorted(valid, key=keys.get(sort_by, keys['score']), reverse=True) + failed
+    
+    def to_csv(self, results: List[ScanResult]) -> str:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=list(asdict(ScanResult(symbol='')).keys()))
+        writer.writeheader()
+        for r in results:
+            writer.writerow(asdict(r))
+        return buffer.getvalue()
+    
+    def get_table_text(self, results: List[ScanResult], timeframe: str, top: int = 20) -> str:
+        """Compact monospace table of the strongest symbols"""
+        valid = [r for r in results if not r.error]
+        structure = {1: 'BULL', -1: 'BEAR', 0: 'RNG'}
+        
+        text = f"🔎 **SCAN** {timeframe} | {len(valid)}/{len(results)} symbols\n\n"
+        text += "```\n"
+        text += f"{'#':>2} {'Symbol':<8} {'Bias':<5} {'Score':>6} {'Cls':>4} {'Harm':>5} {'ICT':<4} {'Fib%':>5}\n"
+        for k, r in enumerate(valid[:top], 1):
+            text += (f"{k:>2} {r.symbol:<8.8} {r.bias[:5]:<5} {r.score:>+6.1f} {r.classic_score:>+4d} "
+                     f"{r.harmonic_confidence:>+5.0f} {structure[r.ict_structure]:<4} {r.golden_zone_distance:>5.1f}\n")
+        text += "```"
+        return text
@@ -0,0 +1,152 @@
+"""
+Sharded Workers
+BOT_SHARDS=N runs N bot worker processes behind one router: the router is the
+only getUpdates / webhook consumer and forwards each update to the worker
+that owns the user (user ID mod N), so a user's jobs always queue on one
+process. Sessions, access lists and the bars / analysis / chart caches live
+in the shared store, so any worker can serve any user after a restart.
+"""
+
+import os
+import signal
+import asyncio
+import logging
+import multiprocessing
+from typing import Dict, Iterable, List, Optional
+
+from telegram import Bot, Update
+from telegram.ext import Updater
+
+from shared_store import SharedStore, SharedSet, SHARED_STORE_FILE
+
+logger = logging.getLogger(__name__)
+
+# Seconds a worker gets to drain its chart jobs after the stop signal
+WORKER_STOP_TIMEOUT = 30
+
+
+def shard_for(update: Update, shards: int) -> int:
+    """User ID, else chat ID, modulo the worker count"""
+    if update.effective_user is not None:
+        key = update.effective_user.id
+    elif update.effective_chat is not None:
+        key = update.effective_chat.id
+    else:
+        key = update.update_id
+    return key % shards
+
+
+# ============================================
+# WORKER
+# ============================================
+
+async def serve_updates(app, updates: multiprocessing.Queue):
+    """Feed routed updates into the application until the router sends None"""
+    loop = asyncio.get_running_loop()
+    await app.initialize()
+    if app.post_init is not None:
+        await app.post_init(app)
+    await app.start()
+    try:
+        while True:
+            data = await loop.run_in_executor(None, updates.get)
+            if data is None:
+                break
+            await app.update_queue.put(Update.de_json(data, app.bot))
+    finally:
+        await app.stop()
+        if app.post_stop is not None:
+            await app.post_stop(app)
+        await app.shutdown()
+        if app.post_shutdown is not None:
+            await app.post_shutdown(app)
+
+
+def run_worker(index: int, shards: int, token: str, updates: multiprocessing.Queue, store_path: str):
+    """Process entry point: the full bot on shared state, without its own updater"""
+    # Ctrl+C reaches the whole process group; the router decides when workers stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logging.basicConfig(level=logging.INFO, format=f"[shard {index}] %(levelname)s:%(name)s:%(message)s")
+    
+    import bot
+    bot.use_shared_store(SharedStore(store_path))
+    
+    # Process pools split the cores between shards instead of each taking all of them
+    cores = max(1, (os.cpu_count() or 1) // shards)
+    bot.mtf_analyzer.workers = cores
+    bot.screener.workers = cores
+    
+    # One scanner for the deployment, or every alert would be sent N times
+    scanner = bot.build_scanner() if index == 0 else None
+    app = bot.build_application(token, scanner=scanner, updater=False)
+    asyncio.run(serve_updates(app, updates))
+
+
+# ============================================
+# ROUTER
+# ============================================
+
+async def forward_updates(update_queue: asyncio.Queue, queues: List[multiprocessing.Queue], counts: List[int]):
+    while True:
+        update = await update_queue.get()
+        shard = shard_for(update, len(queues))
+        queues[shard].put(update.to_dict())
+        counts[shard] += 1
+
+
+async def route(token: str, mode: str, queues: List[multiprocessing.Queue], webhook_config: Optional[Dict] = None):
+    """Receive updates (polling or webhook) until SIGINT / SIGTERM and hand them to the workers"""
+    loop = asyncio.get_running_loop()
+    stopping = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+    
+    update_queue = asyncio.Queue()
+    counts = [0] * len(queues)
+    updater = Updater(Bot(token), update_queue)
+    async with updater:
+        if mode == 'webhook':
+            await updater.start_webhook(drop_pending_updates=True, **(webhook_config or {}))
+        else:
+            await updater.start_polling(drop_pending_updates=True)
+        forwarder = asyncio.create_task(forward_updates(update_queue, queues, counts))
+        
+        await stopping.wait()
+        await updater.stop()
+        forwarder.cancel()
+        
+        # Updates already received still go to their workers
+        while not update_queue.empty():
+            update = update_queue.get_nowait()
+            queues[shard_for(update, len(queues))].put(update.to_dict())
+    
+    logger.info(f"Routed updates per shard: {counts}")
+
+
+def run_sharded(token: str, shards: int, mode: str = 'polling', webhook_config: Optional[Dict] = None,
+                store_path: str = SHARED_STORE_FILE, seed_users: Iterable[int] = ()):
+    """Start the workers, route until stopped, then let every worker drain and exit"""
+    store = SharedStore(store_path)
+    approved = SharedSet(store, 'approved')
+    approved |= set(seed_users)  # approvals from approved_users.json (single-process runs)
+    
+    # Spawned, not forked: the parent has imported the bot and may already hold thread pools
+    context = multiprocessing.get_context('spawn')
+    queues = [context.Queue() for _ in range(shards)]
+    workers = [
+        context.Process(target=run_worker, args=(k, shards, token, queues[k], store_path), name=f"bot-shard-{k}")
+        for k in range(shards)
+    ]
+    for worker in workers:
+        worker.start()
+    
+    try:
+        asyncio.run(route(token, mode, queues, webhook_config))
+    finally:
+        for q in queues:
+            q.put(None)
+        for worker in workers:
+            worker.join(WORKER_STOP_TIMEOUT)
+            if worker.is_alive():
+                logger.warning(f"{worker.name} did not stop in time, terminating")
+                worker.terminate()
@@ -0,0 +1,209 @@
+"""
+Shared Store
+Key/value tier in a local SQLite database (WAL mode) that every bot worker
+process on the host reads and writes: cached bars, analysis lines and
+rendered charts with a TTL, plus session state and the access lists.
+Values are pickled; the file is local to the host and written by the bot only.
+file_lock() serializes read-modify-write of the JSON files workers share.
+"""
+
+import os
+import json
+import time
+import fcntl
+import pickle
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from collections.abc import MutableMapping, MutableSet
+from typing import Any, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SHARED_STORE_FILE = "shared_store.db"
+
+# Expired rows are deleted every this many writes
+PURGE_EVERY = 200
+
+_MISSING = object()
+
+
+class SharedStore:
+    """
+    (namespace, key) -> value with an optional TTL in seconds
+    One connection per thread and process; WAL lets readers run while a worker writes
+    """
+    
+    def __init__(self, path: str = SHARED_STORE_FILE, timeout: float = 5.0):
+        self.path = path
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._local = threading.local()
+        db = self._db()
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS kv ("
+            " namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, expires REAL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        db.commit()
+    
+    def _db(self) -> sqlite3.Connection:
+        # Connections must not cross a fork, so they are also keyed by pid
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=self.timeout)
+            db.execute("PRAGMA synchronous=NORMAL")  # durable at checkpoints, enough for a cache
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+    
+    def __getstate__(self):
+        # Picklable for spawned workers: each process opens its own connections
+        return {'path': self.path, 'timeout': self.timeout}
+    
+    def __setstate__(self, state):
+        self.__init__(**state)
+    
+    # ---------- values ----------
+    
+    def fetch(self, namespace: str, key: str, default: Any = None) -> Any:
+        row = self._db().execute(
+            "SELECT value, expires FROM kv WHERE namespace = ? AND key = ?", (namespace, key)
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] < time.time()):
+            return default
+        return pickle.loads(row[0])
+    
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        """fetch() that counts cache hits and misses"""
+        value = self.fetch(namespace, key, _MISSING)
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+    
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None):
+        expires = time.time() + ttl if ttl is not None else None
+        db = self._db()
+        with db:
+            db.execute("INSERT OR REPLACE INTO kv (namespace, key, value, expires) VALUES (?, ?, ?, ?)",
+                       (namespace, key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), expires))
+        self._writes += 1
+        if self._writes % PURGE_EVERY == 0:
+            self.purge()
+    
+    def delete(self, namespace: str, key: str) -> bool:
+        db = self._db()
+        with db:
+            return db.execute("DELETE FROM kv WHERE namespace = ? AND key = ?", (namespace, key)).rowcount > 0
+    
+    def keys(self, namespace: str) -> List[str]:
+        rows = self._db().execute(
+            "SELECT key FROM kv WHERE namespace = ? AND (expires IS NULL OR expires >= ?)", (namespace, time.time())
+        ).fetchall()
+        return [row[0] for row in rows]
+    
+    def items(self, namespace: str) -> List[Tuple[str, Any]]:
+        rows = self._db().execute(
+            "SELECT key, value FROM kv WHERE namespace = ? AND (expires IS NULL OR expires >= ?)",
+            (namespace, time.time())
+        ).fetchall()
+        return [(key, pickle.loads(value)) for key, value in rows]
+    
+    def count(self, namespace: str) -> int:
+        return len(self.keys(namespace))
+    
+    def purge(self) -> int:
+        """Delete expired rows; returns how many"""
+        db = self._db()
+        with db:
+            return db.execute("DELETE FROM kv WHERE expires IS NOT NULL AND expires < ?", (time.time(),)).rowcount
+    
+    def clear(self, namespace: str):
+        db = self._db()
+        with db:
+            db.execute("DELETE FROM kv WHERE namespace = ?", (namespace,))
+
+
+# ============================================
+# DROP-IN CONTAINERS
+# ============================================
+
+class SharedDict(MutableMapping):
+    """
+    dict backed by one store namespace; keys are JSON-encoded so int user IDs survive
+    Values are copies: mutate, then assign back (state[uid] = value)
+    """
+    
+    def __init__(self, store: SharedStore, namespace: str):
+        self.store = store
+        self.namespace = namespace
+    
+    def __getitem__(self, key):
+        value = self.store.fetch(self.namespace, json.dumps(key), _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+    
+    def __setitem__(self, key, value):
+        self.store.set(self.namespace, json.dumps(key), value)
+    
+    def __delitem__(self, key):
+        if not self.store.delete(self.namespace, json.dumps(key)):
+            raise KeyError(key)
+    
+    def __iter__(self) -> Iterator:
+        return iter([json.loads(key) for key in self.store.keys(self.namespace)])
+    
+    def __len__(self) -> int:
+        return self.store.count(self.namespace)
+    
+    def items(self):
+        return [(json.loads(key), value) for key, value in self.store.items(self.namespace)]
+
+
+class SharedSet(MutableSet):
+    """set backed by one store namespace"""
+    
+    def __init__(self, store: SharedStore, namespace: str):
+        self.store = store
+        self.namespace = namespace
+    
+    def __contains__(self, item) -> bool:
+        return self.store.fetch(self.namespace, json.dumps(item), _MISSING) is not _MISSING
+    
+    def __iter__(self) -> Iterator:
+        return iter([json.loads(key) for key in self.store.keys(self.namespace)])
+    
+    def __len__(self) -> int:
+        return self.store.count(self.namespace)
+    
+    def add(self, item):
+        self.store.set(self.namespace, json.dumps(item), True)
+    
+    def discard(self, item):
+        self.store.delete(self.namespace, json.dumps(item))
+
+
+
+# ============================================
+# FILE LOCK
+# ============================================
+
+@contextmanager
+def file_lock(path: str):
+    """
+    Exclusive lock on `path`.lock, across worker processes and threads
+    Hold it from reloading `path` to saving it, so no other writer slips in between
+    """
+    with open(f"{path}.lock", 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
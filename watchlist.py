@@ -0,0 +1,370 @@
+"""
+Watchlists and Scheduled Alerts
+Per-user watchlists, a bar-close scheduler that batch-scans every watched
+symbol once, and push alerts only when something changed:
+new harmonic pattern, BOS/CHoCH break, TP/SL crossing
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+import pandas as pd
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from alert_rules import AlertRuleEngine
+from chart_drawer import ChartDrawer
+from harmonic_patterns import HarmonicAnalyzer
+from ict_analysis import ICTAnalyzer, BreakType
+from shared_store import file_lock
+
+logger = logging.getLogger(__name__)
+
+WATCHLISTS_FILE = "watchlists.json"
+
+# Bar length in seconds per bot timeframe ('7m' is served from 5m bars)
+BAR_SECONDS = {
+    '5m': 300, '7m': 300, '10m': 600, '15m': 900,
+    '30m': 1800, '1h': 3600, '4h': 14400, '1d': 86400,
+}
+SCAN_GRACE_SECONDS = 30  # give the data source time to publish the closed bar
+DAILY_SCAN_SECONDS = 3600  # daily bars close at midnight of their own timezone, not UTC: check hourly
+
+# Incremental scans re-analyze only the bars from this many swings back: harmonic patterns
+# span 5 alternating points, a BOS/CHoCH compares a swing with the previous one of its type
+HARMONIC_CONTEXT_POINTS = 6
+STRUCTURE_CONTEXT_SWINGS = 3
+TARGET_BARS = 51  # get_targets_text reads ATR over 14 bars and MAs up to 50
+
+BREAK_NAMES = {BreakType.BOS: 'BOS', BreakType.CHOCH: 'CHoCH'}
+
+
+class WatchlistManager:
+    """{user_id: {symbol: [timeframes]}} persisted as JSON"""
+    
+    def __init__(self, path: str = WATCHLISTS_FILE):
+        self.path = path
+        self._mtime: Optional[int] = None
+        self.watchlists: Dict[int, Dict[str, List[str]]] = self._load()
+    
+    def _load(self) -> Dict[int, Dict[str, List[str]]]:
+        try:
+            if os.path.exists(self.path):
+                self._mtime = os.stat(self.path).st_mtime_ns
+                with open(self.path, 'r') as f:
+                    return {int(uid): symbols for uid, symbols in json.load(f).items()}
+        except Exception as e:
+            logger.error(f"Error loading watchlists: {e}")
+        return {}
+    
+    def refresh(self, force: bool = False):
+        """Reload if another worker process saved since (sharded mode); force under file_lock"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        if force or mtime != self._mtime:
+            self.watchlists = self._load()
+    
+    def save(self):
+        try:
+            # Write then rename, so other processes never read a half-written file
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, 'w') as f:
+                json.dump({str(uid): symbols for uid, symbols in self.watchlists.items()}, f)
+            os.replace(tmp, self.path)
+            self._mtime = os.stat(self.path).st_mtime_ns
+        except Exception as e:
+            logger.error(f"Error saving watchlists: {e}")
+    
+    def add(self, user_id: int, symbol: str, timeframe: str) -> bool:
+        # Locked from reload to save: another worker's edit is never overwritten
+        with file_lock(self.path):
+            self.refresh(force=True)
+            timeframes = self.watchlists.setdefault(user_id, {}).setdefault(symbol, [])
+            if timeframe in timeframes:
+                return False
+            timeframes.append(timeframe)
+            self.save()
+            return True
+    
+    def remove(self, user_id: int, symbol: str, timeframe: Optional[str] = None) -> bool:
+        with file_lock(self.path):
+            self.refresh(force=True)
+            symbols = self.watchlists.get(user_id, {})
+            if symbol not in symbols or (timeframe and timeframe not in symbols[symbol]):
+                return False
+            
+            if timeframe:
+                symbols[symbol].remove(timeframe)
+            if not timeframe or not symbols[symbol]:
+                del symbols[symbol]
+            if not symbols:
+                self.watchlists.pop(user_id, None)
+            self.save()
+            return True
+    
+    def get(self, user_id: int) -> Dict[str, List[str]]:
+        self.refresh()
+        return self.watchlists.get(user_id, {})
+    
+    def subscribers(self, timeframe: str) -> Dict[str, Set[int]]:
+        """{symbol: users} for one timeframe - each symbol appears once however many watch it"""
+        self.refresh()
+        result = {}
+        for uid, symbols in self.watchlists.items():
+            for symbol, timeframes in symbols.items():
+                if timeframe in timeframes:
+                    result.setdefault(symbol, set()).add(uid)
+        return result
+    
+    def active_timeframes(self) -> Set[str]:
+        self.refresh()
+        return {tf for symbols in self.watchlists.values() for tfs in symbols.values() for tf in tfs}
+
+
+@dataclass
+class SymbolState:
+    """What the last scan of one symbol/timeframe saw"""
+    last_bar: Optional[pd.Timestamp] = None
+    harmonic_keys: Set[Tuple] = field(default_factory=set)
+    break_keys: Set[Tuple] = field(default_factory=set)
+    targets: Optional[Dict] = None
+    context_start: Optional[pd.Timestamp] = None  # first bar the next scan re-analyzes
+
+
+class WatchlistScanner:
+    """Scans all watched symbols of a timeframe in one batch and emits change-only alerts"""
+    
+    def __init__(self, watchlists: WatchlistManager,
+                 fetch_many: Callable[[List[str], str], Dict[str, pd.DataFrame]],
+                 timeframe_names: Optional[Dict[str, str]] = None,
+                 chart_drawer: Optional[ChartDrawer] = None,
+                 harmonic_analyzer: Optional[HarmonicAnalyzer] = None,
+                 ict_analyzer: Optional[ICTAnalyzer] = None,
+                 rule_engine: Optional[AlertRuleEngine] = None,
+                 poll_seconds: int = 15):
+        self.watchlists = watchlists
+        self.fetch_many = fetch_many  # (symbols, timeframe) -> {symbol: DataFrame}
+        self.timeframe_names = timeframe_names or {}
+        self.chart_drawer = chart_drawer or ChartDrawer()
+        self.harmonic_analyzer = harmonic_analyzer or HarmonicAnalyzer()
+        self.ict_analyzer = ict_analyzer or ICTAnalyzer()
+        self.rule_engine = rule_engine  # user alert rules, evaluated on the same batch
+        self.poll_seconds = poll_seconds
+        self.states: Dict[Tuple[str, str], SymbolState] = {}
+    
+    # ============================================
+    # CHANGE DETECTION
+    # ============================================
+    
+    def _bar_times(self, df: pd.DataFrame) -> pd.Series:
+        column = 'Datetime' if 'Datetime' in df.columns else 'Date'
+        return pd.to_datetime(df[column])
+    
+    def _completed_bars(self, df: pd.DataFrame, timeframe: str, now: float) -> pd.DataFrame:
+        """Drop the bar that is still forming"""
+        if df.empty:
+            return df
+        times = self._bar_times(df)
+        if times.dt.tz is None:
+            return df
+        if timeframe == '1d':
+            # A daily bar lasts its calendar day in the timezone it is stamped in: a UTC day
+            # for 24/7 symbols; for stocks the session ends earlier, so this errs late, never early
+            closes_at = times + pd.DateOffset(days=1)
+        else:
+            closes_at = times + pd.Timedelta(seconds=BAR_SECONDS.get(timeframe, 0))
+        return df[closes_at <= pd.Timestamp(now, unit='s', tz='UTC')]
+    
+    def _harmonic_events(self, points: List[Tuple], times: pd.Series) -> Dict[Tuple, str]:
+        analyzer = self.harmonic_analyzer
+        events = {}
+        for detect in (analyzer.detect_abcd, analyzer.detect_gartley, analyzer.detect_butterfly,
+                       analyzer.detect_bat, analyzer.detect_crab):
+            for p in detect(points):
+                d_idx, d_price = p.points['D']
+                key = (p.pattern_type.name, p.direction.name, times.iloc[d_idx])
+                events[key] = (f"🔷 New harmonic: {p.pattern_type.value} {p.direction.value} "
+                               f"(D ${d_price:.2f}, TP1 ${p.target_1:.2f}, SL ${p.stop_loss:.2f})")
+        return events
+    
+    def _break_events(self, swings: List[Dict], times: pd.Series) -> Dict[Tuple, str]:
+        _, _, breaks = self.ict_analyzer.analyze_market_structure(swings)
+        
+        events = {}
+        for brk in breaks:
+            key = (brk['type'].name, brk['direction'], times.iloc[brk['idx']])
+            events[key] = f"🎯 {BREAK_NAMES[brk['type']]} {brk['direction']} @ ${brk['price']:.2f}"
+        return events
+    
+    def _context_start(self, points: List[Tuple], swings: List[Dict], times: pd.Series) -> Optional[pd.Timestamp]:
+        """
+        Earliest bar the next scan needs: patterns and breaks that end on its new bars
+        come out exactly as from the full history. None when there are too few swings
+        """
+        anchors = []
+        if len(points) < HARMONIC_CONTEXT_POINTS:
+            return None
+        anchors.append(points[-HARMONIC_CONTEXT_POINTS][0])
+        for kind in ('high', 'low'):
+            idx = [s['idx'] for s in swings if s['type'] == kind]
+            if len(idx) < STRUCTURE_CONTEXT_SWINGS:
+                return None
+            anchors.append(idx[-STRUCTURE_CONTEXT_SWINGS])
+        
+        # A swing is confirmed by `lookback` bars on each side, the earliest one needs them too
+        lookback = max(self.harmonic_analyzer.swing_lookback, self.ict_analyzer.swing_lookback)
+        return times.iloc[max(min(anchors) - lookback, 0)]
+    
+    def _target_events(self, targets: Dict, new_bars: pd.DataFrame) -> List[str]:
+        """TP/SL levels from the previous scan crossed by the bars that closed since"""
+        if not targets or not targets['entry'] or new_bars.empty:
+            return []
+        
+        high = new_bars['High'].max()
+        low = new_bars['Low'].min()
+        if targets['is_bullish']:
+            reached = [k for k in (1, 2, 3) if high >= targets[f'target_{k}']]
+            stopped = low <= targets['stop_loss']
+        else:
+            reached = [k for k in (1, 2, 3) if low <= targets[f'target_{k}']]
+            stopped = high >= targets['stop_loss']
+        
+        events = []
+        if reached:
+            k = reached[-1]
+            events.append(f"✅ TP{k} reached (${targets[f'target_{k}']:.2f})")
+        if stopped:
+            events.append(f"🛑 Stop loss hit (${targets['stop_loss']:.2f})")
+        return events
+    
+    def analyze_symbol(self, symbol: str, timeframe: str, df: pd.DataFrame) -> List[str]:
+        """Update the stored state with newly closed bars and return what changed"""
+        state = self.states.setdefault((symbol, timeframe), SymbolState())
+        if df.empty or len(df) < 20:
+            return []
+        
+        times = self._bar_times(df)
+        last_bar = times.iloc[-1]
+        if state.last_bar is not None and last_bar <= state.last_bar:
+            return []  # no new bar since the last scan
+        
+        first_scan = state.last_bar is None
+        new_bars = df[times > state.last_bar] if not first_scan else df.iloc[0:0]
+        
+        # Incremental: only the bars from the context swings of the last scan on
+        # (the whole frame on the first scan or when the context left the fetched window)
+        start = int(times.searchsorted(state.context_start)) if state.context_start is not None else 0
+        tail, tail_times = df.iloc[start:], times.iloc[start:]
+        
+        points = self.harmonic_analyzer.find_swing_points(tail)
+        swings = self.ict_analyzer.identify_swing_points(tail)
+        harmonic = self._harmonic_events(points, tail_times)
+        breaks = self._break_events(swings, tail_times)
+        
+        # Swings the new bars could not have confirmed were reported by an earlier scan
+        lookback = max(self.harmonic_analyzer.swing_lookback, self.ict_analyzer.swing_lookback)
+        fresh = times.iloc[max(len(df) - len(new_bars) - lookback, 0)]
+        
+        events = self._target_events(state.targets, new_bars)
+        events += [text for key, text in harmonic.items() if key not in state.harmonic_keys and key[2] >= fresh]
+        events += [text for key, text in breaks.items() if key not in state.break_keys and key[2] >= fresh]
+        
+        # Keys before the analyzed bars are never compared again
+        state.harmonic_keys = set(harmonic)
+        state.break_keys = set(breaks)
+        state.targets = self.chart_drawer.get_targets_text(df.iloc[-TARGET_BARS:])
+        state.context_start = self._context_start(points, swings, tail_times)
+        state.last_bar = last_bar
+        
+        # The first scan only records the baseline
+        return [] if first_scan else events
+    
+    def active_timeframes(self) -> Set[str]:
+        timeframes = self.watchlists.active_timeframes()
+        if self.rule_engine is not None:
+            timeframes |= set(self.rule_engine.timeframes())
+        return timeframes
+    
+    def scan(self, timeframe: str, now: Optional[float] = None) -> List[Tuple[Set[int], str]]:
+        """Batch-fetch every symbol watched (or with alert rules) on this timeframe"""
+        now = time.time() if now is None else now
+        subscribers = self.watchlists.subscribers(timeframe)
+        rule_symbols = self.rule_engine.symbols(timeframe) if self.rule_engine is not None else []
+        symbols = sorted(set(subscribers) | set(rule_symbols))
+        if not symbols:
+            return []
+        
+        fetched = self.fetch_many(symbols, timeframe)
+        frames = {symbol: self._completed_bars(df, timeframe, now) for symbol, df in fetched.items()}
+        tf_name = self.timeframe_names.get(timeframe, timeframe)
+        
+        alerts = []
+        for symbol, users in subscribers.items():
+            df = frames.get(symbol)
+            if df is None:
+                continue
+            try:
+                events = self.analyze_symbol(symbol, timeframe, df)
+            except Exception as e:
+                logger.error(f"Watchlist scan error {symbol} {timeframe}: {e}")
+                continue
+            
+            if events:
+                price = df['Close'].iloc[-1]
+                text = f"🔔 **{symbol}** ({tf_name}) | ${price:.2f}\n\n" + "\n".join(events)
+                alerts.append((users, text))
+        
+        if rule_symbols:
+            rule_frames = {s: frames[s] for s in rule_symbols if s in frames and not frames[s].empty}
+            times = {s: self._bar_times(df) for s, df in rule_frames.items()}
+            for rule in self.rule_engine.on_bar_close(timeframe, rule_frames, times):
+                price = rule_frames[rule.symbol]['Close'].iloc[-1]
+                text = (f"🔔 **{rule.symbol}** ({tf_name}) | ${price:.2f}\n\n"
+                        f"⚡ Alert #{rule.rule_id}: `{rule.expression}`")
+                alerts.append(({rule.user_id}, text))
+        
+        return alerts
+    
+    # ============================================
+    # SCHEDULER
+    # ============================================
+    
+    def next_close(self, timeframe: str, now: float) -> float:
+        """
+        Epoch seconds of the next bar close (UTC-aligned) plus a publishing grace
+        Daily bars close at different UTC hours per exchange, so '1d' is checked every hour
+        """
+        period = DAILY_SCAN_SECONDS if timeframe == '1d' else BAR_SECONDS.get(timeframe, 86400)
+        return (now // period + 1) * period + SCAN_GRACE_SECONDS
+    
+    async def run(self, send: Callable[[int, str], Awaitable]):
+        """Background loop: scan each active timeframe at its bar close and push alerts"""
+        loop = asyncio.get_running_loop()
+        next_due: Dict[str, float] = {}
+        
+        while True:
+            now = time.time()
+            for timeframe in sorted(self.active_timeframes()):
+                due = next_due.setdefault(timeframe, self.next_close(timeframe, now))
+                if now < due:
+                    continue
+                next_due[timeframe] = self.next_close(timeframe, now)
+                
+                try:
+                    alerts = await loop.run_in_executor(None, self.scan, timeframe, now)
+                except Exception as e:
+                    logger.error(f"Watchlist scan failed for {timeframe}: {e}")
+                    continue
+                
+                for users, text in alerts:
+                    for uid in users:
+                        try:
+                            await send(uid, text)
+                        except Exception as e:
+                            logger.error(f"Alert to {uid} failed: {e}")
+            
+            await asyncio.sleep(self.poll_seconds)
@@ -0,0 +1,266 @@
+"""
+Webhook vs Polling Benchmark
+Runs the real Application (all handlers, bot.build_application) fully offline:
+Bot API calls are answered locally, synthetic updates are POSTed to the
+webhook endpoint on localhost - or served through getUpdates for polling -
+and the delay from sending an update to its handler starting is measured.
+A simulated network round trip to the Bot API (--rtt) delays each webhook
+POST by half of it and each getUpdates call by all of it, plus --poll-interval
+between polls, so long polling is not measured against an in-process queue.
+
+    python webhook_bench.py [--updates 300] [--rate 50] [--concurrency 32] [--modes webhook,polling]
+                            [--rtt 0.1] [--poll-interval 0.0]
+"""
+
+import json
+import time
+import socket
+import asyncio
+import logging
+import argparse
+import itertools
+import matplotlib
+matplotlib.use('Agg')
+import httpx
+from collections import Counter
+from typing import Dict, List, Optional
+
+from telegram import Update
+from telegram.ext import TypeHandler
+from telegram.request import BaseRequest
+
+import bot
+from loadtest import ReplayDataSource, SYMBOLS, USER_ID_BASE
+from metrics import LatencyHistogram
+
+OFFLINE_TOKEN = "123456:OFFLINE-BENCHMARK"
+SECRET = "offline-secret"
+BOT_USER = {'id': 123456, 'is_bot': True, 'first_name': 'Offline', 'username': 'offline_bot'}
+MESSAGE_METHODS = ('sendMessage', 'sendPhoto', 'sendDocument', 'editMessageText', 'editMessageCaption')
+
+
+class OfflineRequest(BaseRequest):
+    """
+    Answers every Bot API call locally instead of over HTTPS
+    getUpdates serves updates from `inbox` (long poll semantics), with `rtt`
+    seconds of simulated network: half on the way to the API, half on the way back
+    """
+    
+    def __init__(self, inbox: Optional[asyncio.Queue] = None, rtt: float = 0.0):
+        self.inbox = inbox
+        self.rtt = rtt
+        self.calls = Counter()
+        self._message_ids = itertools.count(1000)
+    
+    @property
+    def read_timeout(self) -> Optional[float]:
+        return None
+    
+    async def initialize(self):
+        pass
+    
+    async def shutdown(self):
+        pass
+    
+    async def do_request(self, url, method, request_data=None, read_timeout=None,
+                         write_timeout=None, connect_timeout=None, pool_timeout=None):
+        api_method = url.rsplit('/', 1)[-1]
+        self.calls[api_method] += 1
+        params = request_data.parameters if request_data is not None else {}
+        
+        if api_method == 'getMe':
+            result = BOT_USER
+        elif api_method == 'getUpdates':
+            result = await self._updates(params)
+        elif api_method in MESSAGE_METHODS:
+            result = {
+                'message_id': next(self._message_ids),
+                'date': int(time.time()),
+                'chat': {'id': params.get('chat_id', 0), 'type': 'private'},
+                'text': params.get('text', ''),
+            }
+        else:
+            result = True
+        return 200, json.dumps({'ok': True, 'result': result}).encode()
+    
+    async def _updates(self, params: dict) -> list:
+        if self.inbox is None:
+            return []
+        # Updates queued while the request travels are in its answer; the answer travels back too
+        await asyncio.sleep(self.rtt / 2)
+        updates = await self._take(params)
+        await asyncio.sleep(self.rtt / 2)
+        return updates
+    
+    async def _take(self, params: dict) -> list:
+        try:
+            first = await asyncio.wait_for(self.inbox.get(), timeout=float(params.get('timeout') or 0) or 0.01)
+        except asyncio.TimeoutError:
+            return []
+        updates = [first]
+        while not self.inbox.empty() and len(updates) < int(params.get('limit') or 100):
+            updates.append(self.inbox.get_nowait())
+        return updates
+
+
+# ============================================
+# SYNTHETIC UPDATES
+# ============================================
+
+def _user(user_id: int) -> dict:
+    return {'id': user_id, 'is_bot': False, 'first_name': 'Load', 'username': f"load{user_id}"}
+
+
+def _message(message_id: int, user_id: int, text: str) -> dict:
+    return {'message_id': message_id, 'date': int(time.time()), 'text': text,
+            'chat': {'id': user_id, 'type': 'private'}, 'from': _user(user_id)}
+
+
+def synthetic_updates(count: int, users: int = 20, mix: str = 'full') -> List[dict]:
+    """
+    Each user types a symbol, picks a timeframe and (mix='full') requests a chart
+    mix='light' stops at the timeframe menu, so no chart work competes with updates
+    """
+    steps = ('symbol', 'timeframe', 'chart') if mix == 'full' else ('symbol', 'timeframe')
+    updates = []
+    for update_id in range(1, count + 1):
+        k = update_id - 1
+        user_id = USER_ID_BASE + k % users
+        round_ = k // users
+        symbol = SYMBOLS[(user_id + round_ // len(steps)) % len(SYMBOLS)]
+        step = steps[round_ % len(steps)]
+        if step == 'symbol':
+            updates.append({'update_id': update_id, 'message': _message(update_id, user_id, symbol)})
+            continue
+        data = f"tf_1d_{symbol}" if step == 'timeframe' else f"chart_classic_{symbol}_1d"
+        updates.append({'update_id': update_id, 'callback_query': {
+            'id': str(update_id), 'from': _user(user_id), 'chat_instance': str(user_id),
+            'data': data, 'message': _message(update_id, user_id, 'Select:'),
+        }})
+    return updates
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+# ============================================
+# BENCHMARK
+# ============================================
+
+async def run_mode(mode: str, updates: List[dict], rate: float, concurrency: int,
+                   rtt: float = 0.0, poll_interval: float = 0.0) -> Dict:
+    """
+    Send `updates` at `rate` per second; latency = update created at the Bot API ->
+    first handler (group -1) starts, including the simulated network `rtt`
+    """
+    inbox = asyncio.Queue()
+    app = bot.build_application(OFFLINE_TOKEN, concurrency, request=OfflineRequest(),
+                                get_updates_request=OfflineRequest(inbox, rtt))
+    received: Dict[int, float] = {}
+    done = asyncio.Event()
+    
+    async def probe(update: Update, context):
+        received[update.update_id] = time.perf_counter()
+        if len(received) == len(updates):
+            done.set()
+    
+    app.add_handler(TypeHandler(Update, probe), group=-1)
+    
+    await app.initialize()
+    port = free_port()
+    if mode == 'webhook':
+        await app.updater.start_webhook(listen='127.0.0.1', port=port, url_path='hook', secret_token=SECRET,
+                                        webhook_url=f"http://127.0.0.1:{port}/hook")
+    else:
+        await app.updater.start_polling(poll_interval=poll_interval, timeout=10)
+    await app.start()
+    
+    sent: Dict[int, float] = {}
+    started = time.perf_counter()
+    async with httpx.AsyncClient() as client:
+        async def post(update: dict):
+            # The API reaches the webhook after half a round trip
+            await asyncio.sleep(rtt / 2)
+            await client.post(f"http://127.0.0.1:{port}/hook", json=update,
+                              headers={'X-Telegram-Bot-Api-Secret-Token': SECRET})
+        
+        posts = []
+        for k, update in enumerate(updates):
+            delay = started + k / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            sent[update['update_id']] = time.perf_counter()
+            if mode == 'webhook':
+                posts.append(asyncio.create_task(post(update)))
+            else:
+                inbox.put_nowait(update)
+        await asyncio.gather(*posts)
+        try:
+            await asyncio.wait_for(done.wait(), timeout=60)
+        except asyncio.TimeoutError:
+            pass
+    elapsed = time.perf_counter() - started
+    
+    await app.updater.stop()
+    await app.stop()
+    await bot.on_stop(app)  # drains chart jobs, as run_webhook / run_polling would
+    await app.shutdown()
+    
+    latency = LatencyHistogram()
+    for update_id, at in received.items():
+        latency.record(at - sent[update_id])
+    return {'mode': mode, 'sent': len(updates), 'received': len(received), 'elapsed': elapsed, 'latency': latency,
+            'rtt': rtt, 'poll_interval': poll_interval}
+
+
+def get_report_text(results: List[Dict]) -> str:
+    text = f"{'Mode':<8} {'Recv':>9} {'upd/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}\n"
+    for r in results:
+        h = r['latency']
+        text += (f"{r['mode']:<8} {r['received']:>4}/{r['sent']:<4} {r['received'] / r['elapsed']:>7.1f} "
+                 f"{h.percentile(50) * 1000:>8.2f} {h.percentile(95) * 1000:>8.2f} "
+                 f"{h.percentile(99) * 1000:>8.2f} {h.max * 1000:>8.2f}\n")
+    if results:
+        rtt = results[0]['rtt']
+        text += f"\nSimulated Bot API RTT {rtt * 1000:.0f} ms, poll interval {results[0]['poll_interval'] * 1000:.0f} ms"
+        if rtt == 0:
+            text += "\n(no network simulated: both numbers are lower bounds, polling is an in-process queue)"
+        text += "\n"
+    return text
+
+
+async def run_all(modes: List[str], updates: List[dict], rate: float, concurrency: int,
+                  rtt: float = 0.0, poll_interval: float = 0.0) -> List[Dict]:
+    return [await run_mode(mode, updates, rate, concurrency, rtt, poll_interval) for mode in modes]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline update-to-handler latency: webhook vs polling")
+    parser.add_argument('--updates', type=int, default=300)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--rate', type=float, default=50.0, help="updates per second")
+    parser.add_argument('--concurrency', type=int, default=bot.UPDATE_CONCURRENCY)
+    parser.add_argument('--modes', default='webhook,polling')
+    parser.add_argument('--mix', choices=('full', 'light'), default='full')
+    parser.add_argument('--latency', default='0.02,0.1', help="simulated data fetch latency range in seconds")
+    parser.add_argument('--rtt', type=float, default=0.1, help="simulated Bot API round trip in seconds")
+    parser.add_argument('--poll-interval', type=float, default=0.0, help="seconds between getUpdates calls")
+    args = parser.parse_args()
+    
+    logging.getLogger().setLevel(logging.WARNING)
+    source = ReplayDataSource(latency=tuple(float(x) for x in args.latency.split(',')))
+    bot.get_stock_data = source.get_stock_data
+    bot.get_stock_info = source.get_stock_info
+    bot.approved_users.update(USER_ID_BASE + k for k in range(args.users))
+    
+    updates = synthetic_updates(args.updates, args.users, args.mix)
+    results = asyncio.run(run_all(args.modes.split(','), updates, args.rate, args.concurrency,
+                                  args.rtt, args.poll_interval))
+    print(get_report_text(results))
+
+
+if __name__ == '__main__':
+    main()